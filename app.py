@@ -1,14 +1,45 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, send_file, g
 import os
-from werkzeug.security import generate_password_hash, check_password_hash
+import time
+from werkzeug.security import generate_password_hash
 from werkzeug.utils import secure_filename
 import json
+import gzip
 import uuid
 from flask_cors import CORS
-from datetime import datetime
-import firebase_admin
-from firebase_admin import credentials, firestore, storage
+from datetime import datetime, timedelta
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
 from dotenv import load_dotenv
+from utils.word_cache import WordCache
+from utils.seller_cache import SellerCache, UNKNOWN_SELLER, seller_info_from_dict
+from utils.catalog import BATCH_LIMIT, CATALOG_COLLECTION, delete_entry, rebuild_catalog, refresh_seller, set_entry
+from utils.response_cache import ResponseCache, uncacheable
+from utils.json_stream import stream_json_array
+from utils.audio_proxy import PASSTHROUGH_HEADERS, format_byte_range, parse_byte_range
+from utils.audio_cache import AudioDiskCache
+from utils.http_client import UpstreamClient
+from utils.jobs import FAILED, QUEUED, UNFINISHED, JobQueue, is_orphaned, public_state, run_as_leader
+from utils.resumable_upload import CHUNK_ALIGNMENT, UploadError, cancel_session, put_chunk, query_offset
+from utils.images import VARIANT_FORMATS, ImageProcessor
+from utils.content_store import IMMUTABLE_CACHE_CONTROL, is_hashed_name, store_existing, store_stream
+from utils.password_pool import HashPoolBusy, PasswordHasher
+from utils.bulk_import import BulkWordImporter, iter_rows
+from utils.word_search import normalize
+from utils.dictionary_pack import (DELETION_RETENTION, FullPackCache, build_delta, delta_margin, encode_pack,
+                                   from_version, utcnow)
+from utils.pagination import PAGE_CURSOR_KEYS, InvalidCursor, encode_cursor, page_args
+from utils.db_manager import Repositories, SQLiteReplica
+from utils.metrics import AppMetrics, InstrumentedBucket, InstrumentedFirestore, begin_request_reads, request_reads
+from utils.firebase_clients import FirebaseClients, LazyClient
+from utils.backfill import BackfillMarker
+from utils.signed_urls import SignedUrlCache
+from utils.product_query import PRODUCT_CATEGORIES, InvalidQuery, ProductQuery, empty_facets
+from utils.counters import (COUNTERS_COLLECTION, DEFAULT_SHARDS, PRODUCTS_COUNTER, SONGS_COUNTER, WORDS_COUNTER, CounterCache, combine,
+                            increment, product_counts, read_counter_values, reset_counter, seller_products_counter)
+
+# Start-up phases are timed and reported by warm_up()
+MODULE_STARTED = time.perf_counter()
 
 # Load environment variables first
 try:
@@ -29,24 +60,222 @@ if app.secret_key == 'development-key-only-change-in-production':
 # Configure upload folder
 app.config['UPLOAD_FOLDER'] = 'static/audio'
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Largest request body accepted (413 above it); bigger songs go through the chunked upload routes
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', str(256 * 1024 * 1024)))
 
-# Firebase initialization with better error handling
+# Prometheus-style metrics at /metrics; set METRICS_TOKEN to require a bearer token
+app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', '1') == '1'
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+metrics = AppMetrics()
+
+# Dictionary cache - reloaded when neither a reload nor a listener update happened within max staleness
+app.config['WORD_CACHE_MAX_STALENESS'] = int(os.getenv('WORD_CACHE_MAX_STALENESS', '300'))
+app.config['WORD_CACHE_LISTENER'] = os.getenv('WORD_CACHE_LISTENER', '1') == '1'
+word_cache = WordCache(
+    max_staleness=app.config['WORD_CACHE_MAX_STALENESS'],
+    use_listener=app.config['WORD_CACHE_LISTENER'],
+    metrics=metrics
+)
+
+# Cursor pagination - set API_PAGINATE_BY_DEFAULT=1 once all clients send ?cursor=
+app.config['API_PAGINATE_BY_DEFAULT'] = os.getenv('API_PAGINATE_BY_DEFAULT', '0') == '1'
+app.config['API_PAGE_SIZE'] = int(os.getenv('API_PAGE_SIZE', '50'))
+
+
+def get_page_args(cursor_keys=PAGE_CURSOR_KEYS):
+    return page_args(request.args, app.config['API_PAGINATE_BY_DEFAULT'], app.config['API_PAGE_SIZE'],
+                     cursor_keys=cursor_keys)
+
+
+# Streaming JSON for large collection responses (?stream=1, or on by default)
+app.config['STREAM_JSON_RESPONSES'] = os.getenv('STREAM_JSON_RESPONSES', '0') == '1'
+
+
+def wants_stream():
+    return request.args.get('stream', '1' if app.config['STREAM_JSON_RESPONSES'] else '0') == '1'
+
+
+# Seller info joined onto products, shared by the product list and details routes
+seller_cache = SellerCache(
+    maxsize=int(os.getenv('SELLER_CACHE_SIZE', '1024')),
+    ttl=int(os.getenv('SELLER_CACHE_TTL', '300'))
+)
+
+# Shop reads come from the denormalized `catalog` collection (see utils/catalog.py)
+# once `flask rebuild-catalog` has filled it. Turn off to keep joining
+# products and sellers at read time.
+app.config['CATALOG_READ_MODEL'] = os.getenv('CATALOG_READ_MODEL', '1') == '1'
+catalog_backfill = BackfillMarker(CATALOG_COLLECTION)
+
+
+def catalog_read_model():
+    return app.config['CATALOG_READ_MODEL'] and catalog_backfill.ready(db)
+
+# Serialized catalog responses with ETags, versioned by the write routes below
+response_cache = ResponseCache(
+    maxsize=int(os.getenv('RESPONSE_CACHE_SIZE', '512')),
+    ttl=int(os.getenv('RESPONSE_CACHE_TTL', '60'))
+)
+
+# Sharded counters for /api/stats, updated in the same batch as each write (see utils/counters.py)
+app.config['COUNTER_SHARDS'] = int(os.getenv('COUNTER_SHARDS', str(DEFAULT_SHARDS)))
+counter_cache = CounterCache(ttl=int(os.getenv('STATS_CACHE_TTL', '30')))
+# Written by `flask rebuild-counters`; until then counts come from count aggregations
+counters_backfill = BackfillMarker(COUNTERS_COLLECTION)
+
+
+def count_change(batch, name, deltas):
+    increment(batch, db, name, deltas, shards=app.config['COUNTER_SHARDS'])
+
+
+def count_documents(query):
+    # Billed as one read per 1000 matching index entries
+    return query.count(alias='count').get()[0][0].value
+
+
+def counter_values(name, recount):
+    return read_counter_values(counter_cache, db, name, counters_backfill, recount)
+
+
+# Song uploads are spooled locally and pushed to storage by a background worker pool
+app.config['SONG_INGEST_ASYNC'] = os.getenv('SONG_INGEST_ASYNC', '1') == '1'
+app.config['INGEST_SPOOL_DIR'] = os.getenv('INGEST_SPOOL_DIR', 'cache/ingest')
+os.makedirs(app.config['INGEST_SPOOL_DIR'], exist_ok=True)
+# Unfinished ingests owned by another host are taken over after this long
+app.config['INGEST_STALE_SECONDS'] = int(os.getenv('INGEST_STALE_SECONDS', '900'))
+
+# Chunked resumable song uploads (see /api/songs/uploads)
+app.config['SONG_MAX_BYTES'] = int(os.getenv('SONG_MAX_BYTES', str(200 * 1024 * 1024)))
+# Uploads untouched for this long are removed by `flask sweep-song-uploads`
+app.config['SONG_UPLOAD_EXPIRY_HOURS'] = int(os.getenv('SONG_UPLOAD_EXPIRY_HOURS', '24'))
+
+# Product image thumbnails are generated in a process pool on upload
+image_processor = ImageProcessor(
+    workers=int(os.getenv('IMAGE_WORKERS', '2')),
+    timeout=int(os.getenv('IMAGE_PROCESS_TIMEOUT', '30'))
+)
+
+# Password hashing runs in a bounded process pool; auth answers 503 when it is full
+password_hasher = PasswordHasher(
+    workers=int(os.getenv('HASH_WORKERS', '2')),
+    max_queue=int(os.getenv('HASH_MAX_QUEUE', '32')),
+    timeout=float(os.getenv('HASH_TIMEOUT', '10')),
+    metrics=metrics
+)
+
+# Pooled keep-alive client for fetching audio from storage
+upstream = UpstreamClient(
+    pool_size=int(os.getenv('UPSTREAM_POOL_SIZE', '32')),
+    connect_timeout=float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', '5')),
+    read_timeout=float(os.getenv('UPSTREAM_READ_TIMEOUT', '30')),
+    min_chunk=int(os.getenv('UPSTREAM_MIN_CHUNK', str(16 * 1024))),
+    max_chunk=int(os.getenv('UPSTREAM_MAX_CHUNK', str(1024 * 1024)))
+)
+
+# On-disk LRU cache of proxied song audio, shared by all workers on the host
+app.config['AUDIO_CACHE_DIR'] = os.getenv('AUDIO_CACHE_DIR', 'cache/audio')
+app.config['AUDIO_CACHE_MAX_BYTES'] = int(os.getenv('AUDIO_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+audio_cache = None
+if app.config['AUDIO_CACHE_MAX_BYTES'] > 0:
+    try:
+        audio_cache = AudioDiskCache(app.config['AUDIO_CACHE_DIR'], app.config['AUDIO_CACHE_MAX_BYTES'],
+                                     chunk_size=upstream.max_chunk,
+                                     fill_workers=int(os.getenv('AUDIO_CACHE_FILL_WORKERS', '4')))
+    except OSError as e:
+        print(f"Warning: Audio cache disabled - {e}")
+
+# Song playback: 'proxy' streams the audio through this server, 'redirect'
+# answers with a 302 to a short-lived signed URL so the bytes come straight
+# from Cloud Storage. In redirect mode new song objects are not made public;
+# switching back to proxy needs them public again.
+app.config['SONG_PLAYBACK_MODE'] = os.getenv('SONG_PLAYBACK_MODE', 'proxy')
+app.config['SIGNED_URL_TTL'] = int(os.getenv('SIGNED_URL_TTL', '900'))
+app.config['SIGNED_URL_REFRESH_MARGIN'] = int(os.getenv('SIGNED_URL_REFRESH_MARGIN', '120'))
+signed_urls = SignedUrlCache(ttl=app.config['SIGNED_URL_TTL'],
+                             refresh_margin=app.config['SIGNED_URL_REFRESH_MARGIN'])
+
+# Local SQLite read replica of songs, products, catalog and sellers (see utils/db_manager.py)
+app.config['READ_REPLICA'] = os.getenv('READ_REPLICA', '1') == '1'
+app.config['READ_REPLICA_PATH'] = os.getenv('READ_REPLICA_PATH', 'cache/replica.sqlite3')
+# Reads fall back to Firestore when the replica writer has been silent this long
+app.config['READ_REPLICA_MAX_LAG'] = int(os.getenv('READ_REPLICA_MAX_LAG', '60'))
+read_replica = None
+if app.config['READ_REPLICA']:
+    try:
+        read_replica = SQLiteReplica(app.config['READ_REPLICA_PATH'], max_lag=app.config['READ_REPLICA_MAX_LAG'])
+    except Exception as e:
+        print(f"Warning: Read replica disabled - {e}")
+
+
+def count_response_bytes(body, observe):
+    # Streamed bodies are measured as they are sent
+    size = 0
+    try:
+        for chunk in body:
+            size += len(chunk)
+            yield chunk
+    finally:
+        close = getattr(body, 'close', None)
+        if close is not None:
+            close()
+        observe(size)
+
+
+@app.before_request
+def start_request_metrics():
+    if not app.config['METRICS_ENABLED']:
+        return
+    g.metrics_started = time.perf_counter()
+    metrics.in_progress.inc()
+    begin_request_reads()
+
+
+@app.after_request
+def record_request_metrics(response):
+    if not app.config['METRICS_ENABLED'] or 'metrics_started' not in g:
+        return response
+
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    labels = {'method': request.method, 'route': route}
+    metrics.requests.inc(status=response.status_code, **labels)
+    metrics.request_duration.observe(time.perf_counter() - g.metrics_started, **labels)
+    metrics.request_documents.observe(request_reads(), **labels)
+
+    if response.content_length is not None:
+        metrics.response_size.observe(response.content_length, **labels)
+    elif response.is_streamed:
+        response.response = count_response_bytes(
+            response.response, lambda size: metrics.response_size.observe(size, **labels))
+    return response
+
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    if 'metrics_started' in g:
+        metrics.in_progress.dec()
+
+
+# Firebase clients are created on first use in each process (safe with gunicorn --preload)
+firebase_clients = FirebaseClients(os.getenv("FIREBASE_ADMIN_SDK_PATH"), os.getenv('FIREBASE_STORAGE_BUCKET'))
+db = LazyClient(firebase_clients.firestore)
+bucket = LazyClient(firebase_clients.bucket)
+if app.config['METRICS_ENABLED']:
+    db = InstrumentedFirestore(db, metrics)
+    bucket = InstrumentedBucket(bucket, metrics)
+# GET routes read through these: the read replica once synced, Firestore otherwise
+repositories = Repositories(db, read_replica)
 try:
-    firebase_admin_sdk_path = os.getenv("FIREBASE_ADMIN_SDK_PATH")
-    if not firebase_admin_sdk_path:
-        raise ValueError("FIREBASE_ADMIN_SDK_PATH not found in environment variables")
-
-    if not os.path.exists(firebase_admin_sdk_path):
-        raise FileNotFoundError(f"Firebase admin SDK file not found at {firebase_admin_sdk_path}")
-
-    cred = credentials.Certificate(firebase_admin_sdk_path)
-    firebase_admin.initialize_app(cred, {'storageBucket': os.getenv('FIREBASE_STORAGE_BUCKET')})
-    db = firestore.client()
-    bucket = storage.bucket()
-    print("Firebase initialized successfully")
+    firebase_clients.check()
+    print("Firebase configured, clients connect on first use")
 except Exception as e:
     print(f"ERROR: Firebase initialization failed - {e}")
 
+# Preload caches before a worker takes traffic (see warm_up() and gunicorn.conf.py)
+app.config['WARM_UP_ON_START'] = os.getenv('WARM_UP_ON_START', '1') == '1'
+app.config['WARM_UP_PATHS'] = [path for path in os.getenv(
+    'WARM_UP_PATHS', '/api/words,/api/songs,/api/products').split(',') if path]
+app.config['COLD_START'] = {}
+
 
 
 
@@ -145,7 +374,15 @@ def register():
             flash('Please fill all fields')
             return redirect(url_for('register'))
 
-        hashed_password = generate_password_hash(password)
+        try:
+            hashed_password = password_hasher.generate(password)
+        except HashPoolBusy as e:
+            flash(str(e))
+            return render_template('register.html'), 503
+        except Exception as e:
+            flash('Registration failed. Please try again.')
+            print(f"Registration error: {e}")
+            return redirect(url_for('register'))
 
         try:
             # Check if phone already exists
@@ -193,12 +430,15 @@ def login():
                 user_doc = doc
                 break
 
-            if user_doc and check_password_hash(user_doc.to_dict()['password'], password):
+            if user_doc and password_hasher.check(user_doc.to_dict()['password'], password):
                 session['user_id'] = user_doc.id
                 return redirect(url_for('dashboard'))
             else:
                 flash('Invalid credentials')
                 return redirect(url_for('login'))
+        except HashPoolBusy as e:
+            flash(str(e))
+            return render_template('login.html'), 503
         except Exception as e:
             flash('Login failed. Please try again.')
             print(f"Login error: {e}")
@@ -246,13 +486,16 @@ def admin_login():
 
             if admin_doc.exists:
                 admin_data = admin_doc.to_dict()
-                if admin_data['username'] == username and check_password_hash(admin_data['password'], password):
+                if admin_data['username'] == username and password_hasher.check(admin_data['password'], password):
                     session['admin_logged_in'] = True
                     return redirect(url_for('admin'))
                 else:
                     flash('Invalid credentials')
             else:
                 flash('Admin not found')
+        except HashPoolBusy as e:
+            flash(str(e))
+            return render_template('admin_login.html'), 503
         except Exception as e:
             flash('Login failed. Please try again.')
             print(f"Admin login error: {e}")
@@ -287,7 +530,7 @@ def seller_register():
             'full_name': data['fullName'],  # From the "Full Name" field
             'business_name': data['shopName'],  # From the "Shop Name" field
             'email': data['email'],
-            'password': generate_password_hash(data['password']),  # Securely hash the password
+            'password': password_hasher.generate(data['password']),  # Securely hash the password
             'phone': data['phone'],
             'whatsapp': data['whatsapp'],
             'created_at': datetime.now(),
@@ -296,9 +539,14 @@ def seller_register():
 
         # Add the new seller data to the 'sellers' collection in Firestore
         db.collection('sellers').document(seller_data['id']).set(seller_data)
+        seller_cache.invalidate(seller_data['id'])
+        refresh_seller(db, seller_data['id'], seller_data)
+        response_cache.bump('products')
 
         return jsonify({'success': True, 'message': 'Seller registered successfully'})
 
+    except HashPoolBusy as e:
+        return jsonify({'success': False, 'message': str(e)}), 503
     except Exception as e:
         # Return an error if something goes wrong
         print(f"Seller registration error: {e}")
@@ -323,7 +571,7 @@ def seller_login():
         seller['id'] = seller_doc.id  # Get the document ID
 
         # Check if the provided password matches the stored hashed password
-        if check_password_hash(seller['password'], data['password']):
+        if password_hasher.check(seller['password'], data['password']):
             # If login is successful, store seller info in the session
             session['seller_id'] = seller['id']
             session['seller_name'] = seller['business_name']
@@ -338,6 +586,8 @@ def seller_login():
             # If passwords do not match, return an error
             return jsonify({'success': False, 'message': 'Invalid email or password'})
 
+    except HashPoolBusy as e:
+        return jsonify({'success': False, 'message': str(e)}), 503
     except Exception as e:
         print(f"Seller login error: {e}")
         return jsonify({'success': False, 'message': str(e)})
@@ -363,19 +613,26 @@ def add_product():
             'seller_id': session['seller_id'],
             'name': data['name'],
             'description': data['description'],
-            'category': data['category'],
+            'category': normalize(data['category']),
             'price': float(data['price']),
             'original_price': float(data.get('originalPrice', data['price'])),
             'sizes': data.get('sizes', []),
             'images': data.get('images', []),
+            'image_variants': clean_image_variants(data.get('imageVariants', [])),
             'stock_quantity': int(data.get('stockQuantity', 0)),
             'status': 'active',
             'created_at': datetime.now(),
             'updated_at': datetime.now()
         }
 
-        # Add to Firestore
-        db.collection('products').document(product_data['id']).set(product_data)
+        # Add to Firestore, together with its catalog entry
+        batch = db.batch()
+        batch.set(db.collection('products').document(product_data['id']), product_data)
+        set_entry(batch, db, product_data['id'], product_data, seller_cache.get(db, product_data['seller_id']))
+        count_change(batch, PRODUCTS_COUNTER, product_counts(product_data))
+        count_change(batch, seller_products_counter(product_data['seller_id']), {'total': 1})
+        batch.commit()
+        response_cache.bump('products')
 
         return jsonify({'success': True, 'message': 'Product added successfully'})
 
@@ -384,48 +641,119 @@ def add_product():
         return jsonify({'success': False, 'message': str(e)})
 
 
+def product_repository():
+    return repositories.catalog if catalog_read_model() else repositories.products
+
+
+def join_seller_info(product_list):
+    # Get seller info for all products with one batched read
+    try:
+        seller_ids = [p.get('seller_id') for p in product_list]
+        replica = repositories.sellers.local()
+        if replica is not None:
+            sellers = {seller_id: seller_info_from_dict(seller_data)
+                       for seller_id, seller_data in replica.get_many('sellers', seller_ids).items()}
+        else:
+            sellers = seller_cache.get_many(db, seller_ids)
+    except Exception as seller_error:
+        print(f"Error getting seller info: {seller_error}")
+        sellers = {}
+
+    for product_data in product_list:
+        product_data['seller_info'] = dict(sellers.get(product_data.get('seller_id')) or UNKNOWN_SELLER)
+
+
+def iter_products(products, read_model, join_batch=200):
+    # Yields products as they arrive; without the read model sellers are
+    # joined per batch of products instead of for the whole collection
+    pending = []
+    for product_data in products:
+        if read_model:
+            yield product_data
+            continue
+        pending.append(product_data)
+        if len(pending) == join_batch:
+            join_seller_info(pending)
+            yield from pending
+            pending = []
+    if pending:
+        join_seller_info(pending)
+        yield from pending
+
+
 @app.route('/api/products', methods=['GET'])
+@response_cache.conditional('products', lambda: (response_cache.version('products'),
+                                                 product_repository().version()))
 def get_products():
+    # ?category=&min_price=&max_price=&q=&sort= are executed here, so the
+    # shop only downloads the products it shows
     try:
-        products_ref = db.collection('products')
-        products = list(products_ref.where('status', '==', 'active').stream())
+        product_query = ProductQuery.from_args(request.args)
+        paginate, limit, cursor = get_page_args()
+    except (InvalidQuery, InvalidCursor) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    try:
+        read_model = catalog_read_model()
+        repository = product_repository()
+        predicate = product_query.predicate()
+
+        replica = repository.local()
+        backend = replica or repository.firestore
+        if replica is not None:
+            # Facets ignore the category filter so every category keeps its count
+            facets = empty_facets()
+            facets.update(replica.facet_counts(
+                repository.collection, 'category', where=product_query.where(include_category=False),
+                ranges=product_query.ranges(), predicate=predicate
+            ))
+        else:
+            facets = firestore_facets(db.collection(repository.collection), product_query)
+
+        filters = {
+            'where': product_query.where(),
+            'ranges': product_query.ranges(),
+            'order_field': product_query.order_field,
+            'descending': product_query.descending,
+            'predicate': predicate
+        }
 
-        product_list = []
-        for product_doc in products:
-            product_data = product_doc.to_dict()
-            product_data['id'] = product_doc.id
+        if not paginate and wants_stream():
+            return stream_json_array(iter_products(backend.scan(repository.collection, **filters), read_model),
+                                     key='products', extra={'success': True, 'facets': facets})
 
-            # Get seller info
-            try:
-                seller_doc = db.collection('sellers').document(product_data['seller_id']).get()
-                if seller_doc.exists:
-                    seller_data = seller_doc.to_dict()
-                    product_data['seller_info'] = {
-                        'business_name': seller_data.get('business_name', 'Unknown Seller'),
-                        'whatsapp': seller_data.get('whatsapp', ''),
-                        'phone': seller_data.get('phone', '')
-                    }
-                else:
-                    product_data['seller_info'] = {
-                        'business_name': 'Unknown Seller',
-                        'whatsapp': '',
-                        'phone': ''
-                    }
-            except Exception as seller_error:
-                print(f"Error getting seller info: {seller_error}")
-                product_data['seller_info'] = {
-                    'business_name': 'Unknown Seller',
-                    'whatsapp': '',
-                    'phone': ''
-                }
-
-            product_list.append(product_data)
-
-        return jsonify({'success': True, 'products': product_list})
+        product_list, next_cursor = backend.query(
+            repository.collection, limit=limit if paginate else None, cursor=cursor, **filters
+        )
+
+        if not read_model:
+            join_seller_info(product_list)
+
+        if paginate:
+            return jsonify({'success': True, 'products': product_list, 'facets': facets,
+                            'next_cursor': next_cursor})
+        return jsonify({'success': True, 'products': product_list, 'facets': facets})
 
     except Exception as e:
         print(f"Get products error: {e}")
-        return jsonify({'success': False, 'message': str(e)})
+        return uncacheable(jsonify({'success': False, 'message': str(e)}))
+
+
+def firestore_facets(products_ref, product_query):
+    """Active products per category, from the counters or count aggregations.
+
+    Each count is billed as one read per 1000 matching index entries. Text
+    search can't be counted server-side, so with ?q= facets are None here
+    (the read replica counts them).
+    """
+    if product_query.q:
+        return None
+    if not product_query.has_price_range and counters_backfill.ready(db):
+        # Plain category counts are kept by the products counter
+        return dict(empty_facets(), **counter_cache.get(db, PRODUCTS_COUNTER).get('by_category', {}))
+    query = product_query.firestore_query(products_ref, include_category=False)
+    return {category: count_documents(query.where('category', '==', category))
+            for category in PRODUCT_CATEGORIES}
 
 
 @app.route('/api/seller/products', methods=['GET'])
@@ -434,16 +762,12 @@ def get_seller_products():
         if 'seller_id' not in session:
             return jsonify({'success': False, 'message': 'Please login first'})
 
-        products_ref = db.collection('products')
-        products = list(products_ref.where('seller_id', '==', session['seller_id']).stream())
+        products = repositories.products.scan(where={'seller_id': session['seller_id']})
 
-        product_list = []
-        for product_doc in products:
-            product_data = product_doc.to_dict()
-            product_data['id'] = product_doc.id
-            product_list.append(product_data)
+        if wants_stream():
+            return stream_json_array(products, key='products', extra={'success': True})
 
-        return jsonify({'success': True, 'products': product_list})
+        return jsonify({'success': True, 'products': list(products)})
 
     except Exception as e:
         print(f"Get seller products error: {e}")
@@ -470,11 +794,21 @@ def delete_product(product_id):
         if product_data['seller_id'] != session['seller_id']:
             return jsonify({'success': False, 'message': 'Unauthorized. You can only delete your own products.'}), 403
 
-        # If all checks pass, delete the product
-        product_ref.delete()
+        # If all checks pass, delete the product and its catalog entry. The
+        # precondition fails the whole batch if the product changed since it
+        # was read, so the counters are never decremented twice.
+        batch = db.batch()
+        batch.delete(product_ref, option=db.write_option(last_update_time=product_doc.update_time))
+        delete_entry(batch, db, product_id)
+        count_change(batch, PRODUCTS_COUNTER, combine(product_counts(product_data), sign=-1))
+        count_change(batch, seller_products_counter(product_data['seller_id']), {'total': -1})
+        batch.commit()
+        response_cache.bump('products')
 
         return jsonify({'success': True, 'message': 'Product deleted successfully'})
 
+    except FailedPrecondition:
+        return jsonify({'success': False, 'message': 'Product was changed meanwhile, please retry.'}), 409
     except Exception as e:
         print(f"Delete product error: {e}")
         return jsonify({'success': False, 'message': 'A server error occurred.'}), 500
@@ -507,89 +841,241 @@ def upload_image():
 
         # Generate unique filename
         filename = secure_filename(file.filename)
-        unique_filename = f"products/{uuid.uuid4()}_{filename}"
+        image_id = uuid.uuid4()
+        unique_filename = f"products/{image_id}_{filename}"
+        image_bytes = file.read()
 
         # Upload to Firebase Storage
         blob = bucket.blob(unique_filename)
-        blob.upload_from_file(
-            file,
+        blob.upload_from_string(
+            image_bytes,
             content_type=file.content_type
         )
         blob.make_public()
 
+        # Resized thumbnail/medium variants for the product grid
+        try:
+            variants = upload_image_variants(image_id, image_bytes)
+        except Exception as variant_error:
+            print(f"Image variant error: {variant_error}")
+            variants = None
+
         return jsonify({
             'success': True,
-            'imageUrl': blob.public_url
+            'imageUrl': blob.public_url,
+            'variants': variants
         })
 
     except Exception as e:
         print(f"Image upload error: {e}")
         return jsonify({'success': False, 'message': str(e)})
 
+
+def upload_image_variants(image_id, image_bytes):
+    generated = image_processor.variants(image_bytes)
+    if not generated:
+        return None
+
+    variants = {}
+    for name, variant in generated.items():
+        variants[name] = {'width': variant['width'], 'height': variant['height']}
+        for fmt, (_, content_type) in VARIANT_FORMATS.items():
+            variant_blob = bucket.blob(f"products/variants/{image_id}_{name}.{fmt}")
+            # Paths are unique per upload, so the files can be cached forever
+            variant_blob.cache_control = 'public, max-age=31536000, immutable'
+            variant_blob.upload_from_string(variant[fmt], content_type=content_type)
+            variant_blob.make_public()
+            variants[name][fmt] = variant_blob.public_url
+    return variants
+
+
+def clean_image_variants(image_variants):
+    # Only keep variant URLs that point at our own bucket
+    prefix = f"https://storage.googleapis.com/{bucket.name}/products/variants/"
+    cleaned = []
+    for entry in image_variants if isinstance(image_variants, list) else []:
+        if not isinstance(entry, dict):
+            cleaned.append(None)
+            continue
+        variant_set = {}
+        for name, variant in entry.items():
+            if not isinstance(variant, dict):
+                continue
+            urls = {fmt: variant[fmt] for fmt in VARIANT_FORMATS
+                    if isinstance(variant.get(fmt), str) and variant[fmt].startswith(prefix)}
+            if urls:
+                urls['width'] = variant.get('width')
+                urls['height'] = variant.get('height')
+                variant_set[name] = urls
+        cleaned.append(variant_set or None)
+    return cleaned
+
+
 # API Routes
 @app.route('/api/words')
+@response_cache.conditional('words', lambda: word_cache.generation(db.collection('words')))
 def get_words():
     search = request.args.get('search', '')
     sort_by = request.args.get('sort_by', 'tai_khamyang')
+    limit = request.args.get('limit', type=int)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    if limit is not None:
+        limit = max(limit, 0)
+
+    if sort_by not in ['tai_khamyang', 'english', 'assamese']:
+        sort_by = 'tai_khamyang'
 
+    # Search pages by rank offset, listing by (sort value, id); a cursor is
+    # only valid for the mode and sort it was issued for
+    mode = 'search' if search else f'sort:{sort_by}'
     try:
-        words_ref = db.collection('words')
-        words = []
+        paginate, page_limit, cursor = get_page_args(cursor_keys=('m',))
+        if cursor and (cursor.get('m') != mode or
+                       not (isinstance(cursor.get('o'), int) if search else 'id' in cursor and 'v' in cursor)):
+            raise InvalidCursor('Cursor does not match this search or sort order')
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
 
-        for doc in words_ref.stream():
-            word_data = doc.to_dict()
-            word_data['id'] = doc.id
+    try:
+        # Served from the in-process snapshot, no Firestore reads on a cache hit
+        words_ref = db.collection('words')
 
-            # Client-side search filtering
+        if paginate:
+            # Same (sort value, id) ordering as a Firestore order_by + start_after
+            # walk, but served from the cached snapshot
             if search:
-                search_lower = search.lower()
-                if (search_lower in word_data.get('tai_khamyang', '').lower() or
-                        search_lower in word_data.get('english', '').lower() or
-                        search_lower in word_data.get('assamese', '').lower()):
-                    words.append(word_data)
+                start = max((cursor or {}).get('o', 0), 0)
+                total, words = word_cache.search(words_ref, search, sort_by, limit=page_limit, offset=start)
+                next_cursor = (encode_cursor({'m': mode, 'o': start + page_limit})
+                               if start + page_limit < total else None)
             else:
-                words.append(word_data)
-
-        # Client-side sorting
-        if sort_by in ['tai_khamyang', 'english', 'assamese']:
-            words.sort(key=lambda x: x.get(sort_by, '').lower())
+                after = (cursor['v'], cursor['id']) if cursor else None
+                words, last = word_cache.page(words_ref, sort_by, page_limit, after)
+                next_cursor = encode_cursor({'m': mode, 'v': last[0], 'id': last[1]}) if last else None
+            return jsonify({'words': words, 'next_cursor': next_cursor})
+
+        if search:
+            # Ranked n-gram index lookup: exact > prefix > substring
+            total, words = word_cache.search(words_ref, search, sort_by, limit=limit, offset=offset)
+        else:
+            all_words = word_cache.sorted_words(words_ref, sort_by)
+            total = len(all_words)
+            words = all_words[offset:offset + limit] if limit is not None else all_words[offset:]
 
-        return jsonify(words)
+        response = stream_json_array(words) if wants_stream() else jsonify(words)
+        response.headers['X-Total-Count'] = str(total)
+        return response
     except Exception as e:
         print(f"Error getting words: {e}")
-        return jsonify([])
+        return uncacheable(jsonify([]))
+
+
+@app.route('/api/stats')
+def get_stats():
+    # Sums a few counter shards instead of scanning words, songs and products
+    try:
+        products_ref = db.collection('products')
+        products = counter_values(PRODUCTS_COUNTER, lambda: {
+            'total': count_documents(products_ref),
+            'active': count_documents(products_ref.where('status', '==', 'active')),
+            'by_category': firestore_facets(products_ref, ProductQuery())
+        })
+        stats = {
+            'success': True,
+            'words': counter_values(WORDS_COUNTER, lambda: {'total': count_documents(db.collection('words'))})
+            .get('total', 0),
+            'songs': counter_values(SONGS_COUNTER, lambda: {'total': count_documents(db.collection('songs'))})
+            .get('total', 0),
+            'products': {
+                'total': products.get('total', 0),
+                'active': products.get('active', 0),
+                'by_category': dict(empty_facets(), **products.get('by_category', {}))
+            }
+        }
+        if 'seller_id' in session:
+            seller_id = session['seller_id']
+            stats['seller_products'] = counter_values(
+                seller_products_counter(seller_id),
+                lambda: {'total': count_documents(products_ref.where('seller_id', '==', seller_id))}
+            ).get('total', 0)
+        return jsonify(stats)
+    except Exception as e:
+        print(f"Get stats error: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Unauthorized'}), 401
+    return app.response_class(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    return jsonify({
+        'words': word_cache.stats(),
+        'sellers': seller_cache.stats(),
+        'responses': response_cache.stats(),
+        'read_replica': read_replica.stats() if read_replica is not None else None,
+        'password_hashing': password_hasher.stats(),
+        'signed_urls': signed_urls.stats(),
+        'counters': counter_cache.stats(),
+        'cold_start': app.config['COLD_START']
+    })
+
+
+def with_audio_info(song_data):
+    # Ensure we have a working URL
+    if 'signed_url' in song_data and song_data['signed_url']:
+        # Prefer signed URL as it's more reliable
+        song_data['file_url'] = song_data['signed_url']
+
+    # Add debug info
+    song_data['has_audio'] = bool(song_data.get('file_url'))
+    song_data['content_type'] = song_data.get('content_type', 'audio/mpeg')
+    return song_data
 
 
 @app.route('/api/songs')
+@response_cache.conditional('songs', lambda: (response_cache.version('songs'), repositories.songs.version()))
 def get_songs():
     search = request.args.get('search', '')
     sort_by = request.args.get('sort_by', 'title')
+    search_lower = search.lower()
+
+    def matches_search(song_data):
+        return (search_lower in (song_data.get('title') or '').lower() or
+                search_lower in (song_data.get('description') or '').lower())
 
     try:
-        songs_ref = db.collection('songs')
-        songs = []
+        paginate, limit, cursor = get_page_args()
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
 
-        for doc in songs_ref.stream():
-            song_data = doc.to_dict()
-            song_data['id'] = doc.id
+    try:
+        predicate = matches_search if search else None
 
-            # Ensure we have a working URL
-            if 'signed_url' in song_data and song_data['signed_url']:
-                # Prefer signed URL as it's more reliable
-                song_data['file_url'] = song_data['signed_url']
+        if paginate:
+            order_field = sort_by if sort_by in ['title', 'description'] else 'title'
+            songs, next_cursor = repositories.songs.query(
+                order_field=order_field, limit=limit, cursor=cursor, predicate=predicate
+            )
+            return jsonify({'songs': [with_audio_info(song_data) for song_data in songs],
+                            'next_cursor': next_cursor})
 
-            # Add debug info
-            song_data['has_audio'] = bool(song_data.get('file_url'))
-            song_data['content_type'] = song_data.get('content_type', 'audio/mpeg')
+        if wants_stream():
+            # Let the backend do the ordering so songs can be sent as they arrive
+            order_field = sort_by if sort_by in ['title', 'description'] else None
+            songs = repositories.songs.scan(order_field=order_field, predicate=predicate)
+            return stream_json_array(with_audio_info(song_data) for song_data in songs)
 
-            # Client-side search filtering
-            if search:
-                search_lower = search.lower()
-                if (search_lower in song_data.get('title', '').lower() or
-                        search_lower in song_data.get('description', '').lower()):
-                    songs.append(song_data)
-            else:
-                songs.append(song_data)
+        songs, _ = repositories.songs.query(predicate=predicate)
+        songs = [with_audio_info(song_data) for song_data in songs]
 
         # Client-side sorting
         if sort_by in ['title', 'description']:
@@ -598,49 +1084,127 @@ def get_songs():
         return jsonify(songs)
     except Exception as e:
         print(f"Error getting songs: {e}")
-        return jsonify([])
+        return uncacheable(jsonify([]))
+
+
+def publish_song_blob(blob):
+    # With redirect playback a public object would outlive the signed URLs' expiry
+    if app.config['SONG_PLAYBACK_MODE'] != 'redirect':
+        blob.make_public()
+
 
+def playback_url(song_data):
+    """Short-lived signed URL for redirect playback, or None to proxy the song."""
+    if app.config['SONG_PLAYBACK_MODE'] != 'redirect' or not song_data.get('file_path'):
+        # Songs without a storage path (e.g. sample data) are proxied from their URL
+        return None
+    return signed_urls.get(bucket, song_data['file_path'], song_data.get('generation'))
 
-@app.route('/api/songs/<song_id>/stream')
+
+# The signed URL outlives this, so players may reuse the redirect for a minute
+PLAYBACK_REDIRECT_HEADERS = {
+    'Cache-Control': 'private, max-age=60',
+    'Access-Control-Allow-Origin': '*'
+}
+
+
+@app.route('/api/songs/<song_id>/stream', methods=['GET', 'HEAD'])
 def stream_audio(song_id):
     try:
-        song_ref = db.collection('songs').document(song_id)
-        song = song_ref.get()
+        song_data = repositories.songs.get(song_id)
 
-        if not song.exists:
+        if song_data is None:
             return "Song not found", 404
 
-        song_data = song.to_dict()
+        signed_url = playback_url(song_data)
+        if signed_url:
+            response = redirect(signed_url, code=302)
+            response.headers.update(PLAYBACK_REDIRECT_HEADERS)
+            return response
+
         file_url = song_data.get('signed_url') or song_data.get('file_url')
 
         if not file_url:
             return "No audio file available", 404
 
+        content_type = song_data.get('content_type', 'audio/mpeg')
+
+        # Serve from the local disk cache (ranges and HEAD handled by send_file)
+        if audio_cache is not None:
+            # generation is set on upload; file paths are unique per upload otherwise
+            version = song_data.get('generation') or song_data.get('file_path') or song_data.get('file_url')
+            cached_path = audio_cache.get(song_id, version)
+            if cached_path is None and request.method == 'GET':
+                # Fill the cache in the background and proxy this request, so the
+                # first byte never waits for the whole song
+                audio_cache.prefetch(song_id, version, lambda: upstream.get(file_url))
+            if cached_path:
+                response = send_file(cached_path, mimetype=content_type, conditional=True,
+                                     etag=audio_cache.etag_for(song_id, version), max_age=3600)
+                response.headers['Access-Control-Allow-Origin'] = '*'
+                return response
+
+        # Forward a single byte range upstream so seeking only fetches what is played
+        byte_range = parse_byte_range(request.headers.get('Range'))
+        upstream_headers = {'Range': format_byte_range(byte_range)} if byte_range else {}
+
         # Proxy the audio file
-        import requests
-        response = requests.get(file_url, stream=True)
+        if request.method == 'HEAD':
+            response = upstream.head(file_url, headers=upstream_headers)
+        else:
+            response = upstream.get(file_url, headers=upstream_headers)
 
-        def generate():
-            for chunk in response.iter_content(chunk_size=1024):
-                if chunk:
-                    yield chunk
+        headers = {
+            'Accept-Ranges': 'bytes',
+            'Cache-Control': 'public, max-age=3600',
+            'Access-Control-Allow-Origin': '*'
+        }
+        for name in PASSTHROUGH_HEADERS:
+            if name in response.headers:
+                headers[name] = response.headers[name]
 
-        content_type = song_data.get('content_type', 'audio/mpeg')
+        if response.status_code == 416:
+            response.close()
+            return app.response_class(status=416, headers=headers)
+
+        if response.status_code not in (200, 206):
+            response.close()
+            print(f"Stream audio upstream error: {response.status_code}")
+            return "Audio file unavailable", 502
+
+        # 206 only if upstream actually honoured the range
+        status = 206 if byte_range and response.status_code == 206 else 200
+
+        if request.method == 'HEAD':
+            response.close()
+            return app.response_class(status=status, mimetype=content_type, headers=headers)
 
         return app.response_class(
-            generate(),
+            upstream.iter_chunks(response),
+            status=status,
             mimetype=content_type,
-            headers={
-                'Accept-Ranges': 'bytes',
-                'Cache-Control': 'public, max-age=3600',
-                'Access-Control-Allow-Origin': '*'
-            }
+            headers=headers
         )
 
     except Exception as e:
         print(f"Stream audio error: {e}")
         return f"Streaming error: {str(e)}", 500
 
+
+def save_pronunciation(audio_file):
+    # Stored under the hash of its content, identical clips share one file
+    return store_stream(audio_file.stream, app.config['UPLOAD_FOLDER'], secure_filename(audio_file.filename))
+
+
+@app.after_request
+def cache_pronunciation_audio(response):
+    # Content-addressed clips never change, let browsers keep them for a year
+    if request.path.startswith('/static/audio/') and response.status_code in (200, 206, 304) \
+            and is_hashed_name(request.path.rsplit('/', 1)[-1]):
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
 @app.route('/api/words', methods=['POST'])
 def add_word():
     if 'admin_logged_in' not in session:
@@ -662,29 +1226,40 @@ def add_word():
             audio_file = request.files.get('audio')
             audio_path = None
             if audio_file:
-                filename = secure_filename(audio_file.filename)
-                audio_path = filename
-                audio_file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+                audio_path = save_pronunciation(audio_file)
 
         word_data = {
             'tai_khamyang': tai_khamyang,
             'english': english,
-            'assamese': assamese
+            'assamese': assamese,
+            'updated_at': utcnow()  # drives the offline pack delta sync
         }
 
         if audio_path:
             word_data['audio_path'] = audio_path
 
-        words_ref = db.collection('words')
-        doc_ref = words_ref.add(word_data)
+        word_ref = db.collection('words').document()
+        batch = db.batch()
+        batch.create(word_ref, word_data)
+        count_change(batch, WORDS_COUNTER, {'total': 1})
+        batch.commit()
+        word_cache.upsert(word_ref.id, word_data)
 
-        return jsonify({'success': True, 'id': doc_ref[1].id})
+        return jsonify({'success': True, 'id': word_ref.id})
 
     except Exception as e:
         print(f"Error adding word: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+def update_word_fields(batch, word_id, fields):
+    # Every edit bumps updated_at, which drives the offline pack delta sync;
+    # returns the fields written
+    fields = dict(fields, updated_at=utcnow())
+    batch.update(db.collection('words').document(word_id), fields)
+    return fields
+
+
 @app.route('/api/words/<word_id>', methods=['PUT'])
 def update_word(word_id):
     if 'admin_logged_in' not in session:
@@ -707,9 +1282,7 @@ def update_word(word_id):
             audio_file = request.files.get('audio')
             audio_path = None
             if audio_file:
-                filename = secure_filename(audio_file.filename)
-                audio_path = filename
-                audio_file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+                audio_path = save_pronunciation(audio_file)
 
         # Validate required fields
         if not all([tai_khamyang, english, assamese]):
@@ -724,8 +1297,10 @@ def update_word(word_id):
         if audio_path:
             word_data['audio_path'] = audio_path
 
-        word_ref = db.collection('words').document(word_id)
-        word_ref.update(word_data)
+        batch = db.batch()
+        word_data = update_word_fields(batch, word_id, word_data)
+        batch.commit()
+        word_cache.upsert(word_id, word_data, merge=True)
 
         return jsonify({'message': 'Word updated successfully'})
 
@@ -741,12 +1316,158 @@ def delete_word(word_id):
 
     try:
         word_ref = db.collection('words').document(word_id)
-        word_ref.delete()
+
+        # Tombstone for offline packs and the count, written together with
+        # the delete; the batch fails as a whole if the word is already gone
+        batch = db.batch()
+        batch.delete(word_ref, option=db.write_option(exists=True))
+        batch.set(db.collection('word_deletions').document(word_id), {
+            'word_id': word_id,
+            'deleted_at': utcnow()
+        })
+        count_change(batch, WORDS_COUNTER, {'total': -1})
+        try:
+            batch.commit()
+        except NotFound:
+            pass
+
+        word_cache.remove(word_id)
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+full_pack_cache = FullPackCache()
+# Deltas re-send enough history to cover the word cache's staleness
+app.config['DICTIONARY_DELTA_MARGIN'] = delta_margin(app.config['WORD_CACHE_MAX_STALENESS'])
+
+
+@app.route('/api/words/pack')
+def dictionary_pack():
+    # Compact offline dictionary: gzip-compressed msgpack, full or ?since=<version>
+    since = request.args.get('since', type=int)
+
+    try:
+        snapshot = word_cache.get(db.collection('words'))
+
+        if not since or since <= 0:
+            body, version = full_pack_cache.get(snapshot['generation'], snapshot['words'])
+        else:
+            try:
+                since_time = from_version(since)
+            except OverflowError:
+                return jsonify({'error': 'since is not a valid dictionary version'}), 400
+            if utcnow() - since_time > DELETION_RETENTION:
+                return jsonify({'error': 'Version too old, download the full pack'}), 410
+
+            cutoff = since_time - app.config['DICTIONARY_DELTA_MARGIN']
+            deletions = [d.to_dict() for d in
+                         db.collection('word_deletions').where('deleted_at', '>', cutoff).stream()]
+
+            changed, deleted_ids, version = build_delta(snapshot['words'], deletions, since, cutoff)
+            body = encode_pack(changed, deleted_ids, version, since=since)
+
+        # The body is gzip or plain depending on Accept-Encoding, so caches must key on it
+        headers = {'X-Dictionary-Version': str(version), 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if 'gzip' in request.accept_encodings:
+            headers['Content-Encoding'] = 'gzip'
+        else:
+            body = gzip.decompress(body)
+        return app.response_class(body, mimetype='application/x-msgpack', headers=headers)
+
+    except Exception as e:
+        print(f"Dictionary pack error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/words/import', methods=['POST'])
+def import_words():
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    # Raw CSV/JSONL body, or a multipart upload in the 'file' field
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        if not upload:
+            return jsonify({'error': 'No file provided'}), 400
+        stream, filename = upload.stream, upload.filename or ''
+    else:
+        stream, filename = request.stream, ''
+
+    fmt = request.args.get('format')
+    if not fmt:
+        hint = f"{request.mimetype} {filename}".lower()
+        fmt = 'csv' if 'csv' in hint else 'jsonl' if ('json' in hint or 'ndjson' in hint) else None
+    if fmt not in ('csv', 'jsonl'):
+        return jsonify({'error': 'Specify format=csv or format=jsonl'}), 400
+
+    import_id = request.args.get('import_id') or str(uuid.uuid4())
+    progress_ref = db.collection('import_jobs').document(import_id)
+
+    def record_progress(summary):
+        progress_ref.set({
+            'status': 'running',
+            'rows': summary['rows'],
+            'created': summary['created'],
+            'updated': summary['updated'],
+            'failed': summary['failed'],
+            'updated_at': firestore.SERVER_TIMESTAMP
+        })
+
+    try:
+        # Upsert key -> document id, from the in-memory dictionary snapshot
+        snapshot = word_cache.get(db.collection('words'))
+        existing = {normalize(w.get('tai_khamyang')): w['id'] for w in snapshot['words'] if w.get('tai_khamyang')}
+
+        importer = BulkWordImporter(
+            db, existing,
+            concurrency=int(os.getenv('IMPORT_CONCURRENCY', '4')),
+            counter_shards=app.config['COUNTER_SHARDS'],
+            on_progress=record_progress
+        )
+        summary = importer.run(iter_rows(stream, fmt))
+    except Exception as e:
+        print(f"Word import error: {e}")
+        progress_ref.set({'status': 'failed', 'error': str(e), 'updated_at': firestore.SERVER_TIMESTAMP}, merge=True)
+        return jsonify({'error': str(e), 'import_id': import_id}), 500
+
+    # Thousands of changed words, reload the snapshot once instead of per word
+    word_cache.invalidate()
+
+    if summary['stopped_at']:
+        # Rows before the unreadable one are already written; report them with the failing row
+        error = summary['stopped_at']['error']
+        progress_ref.set({'status': 'failed', 'error': error, 'updated_at': firestore.SERVER_TIMESTAMP}, merge=True)
+        return jsonify(dict(summary, success=False, error=error, import_id=import_id)), 400
+
+    progress_ref.set({'status': 'done', 'updated_at': firestore.SERVER_TIMESTAMP}, merge=True)
+    return jsonify(dict(summary, success=summary['failed'] == 0, import_id=import_id))
+
+
+@app.route('/api/words/import/<import_id>')
+def import_words_status(import_id):
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        progress_doc = db.collection('import_jobs').document(import_id).get()
+        if not progress_doc.exists:
+            return jsonify({'error': 'Import not found'}), 404
+        return jsonify(progress_doc.to_dict())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# Song file extensions accepted by the upload routes and their content types
+SONG_CONTENT_TYPES = {
+    'mp3': 'audio/mpeg',
+    'wav': 'audio/wav',
+    'ogg': 'audio/ogg',
+    'm4a': 'audio/mp4',
+    'aac': 'audio/aac'
+}
+
+
 @app.route('/api/songs', methods=['POST'])
 def add_song():
     if 'admin_logged_in' not in session or not session['admin_logged_in']:
@@ -754,9 +1475,6 @@ def add_song():
         return jsonify({'error': 'Unauthorized - Please login as admin'}), 401
 
     try:
-        print("[DEBUG] Request headers:", request.headers)
-        print("[DEBUG] Request content type:", request.content_type)
-
         if 'multipart/form-data' not in request.content_type:
             return jsonify({'error': 'Content-Type must be multipart/form-data'}), 400
 
@@ -764,119 +1482,431 @@ def add_song():
         description = request.form.get('description', '')
         audio_file = request.files.get('audio')
 
-        print("[DEBUG] Received title:", title)
-        print("[DEBUG] Received description:", description)
-        print("[DEBUG] Audio file received:", bool(audio_file))
-
         if not title:
             return jsonify({'error': 'Song title is required'}), 400
 
         if not audio_file or audio_file.filename == '':
             return jsonify({'error': 'Audio file is required'}), 400
 
-        # Enhanced file validation
-        allowed_extensions = {'mp3', 'wav', 'ogg', 'm4a', 'aac'}
         file_ext = audio_file.filename.rsplit('.', 1)[1].lower() if '.' in audio_file.filename else ''
 
-        if file_ext not in allowed_extensions:
+        if file_ext not in SONG_CONTENT_TYPES:
             return jsonify({
-                'error': f'Invalid file type. Allowed: {", ".join(allowed_extensions)}'
+                'error': f'Invalid file type. Allowed: {", ".join(SONG_CONTENT_TYPES)}'
             }), 400
 
         # Generate unique filename
         filename = secure_filename(audio_file.filename)
         unique_filename = f"songs/{uuid.uuid4()}_{filename}"
-        print("[DEBUG] Generated storage path:", unique_filename)
 
-        # Upload to Firebase Storage with proper settings
-        try:
-            blob = bucket.blob(unique_filename)
+        # Keep the received bytes locally; storage and Firestore work happens in ingest_song
+        spool_path = os.path.join(app.config['INGEST_SPOOL_DIR'], f"{uuid.uuid4()}.{file_ext}")
+        audio_file.save(spool_path)
 
-            # Set proper content type based on file extension
-            content_type_mapping = {
-                'mp3': 'audio/mpeg',
-                'wav': 'audio/wav',
-                'ogg': 'audio/ogg',
-                'm4a': 'audio/mp4',
-                'aac': 'audio/aac'
-            }
-            content_type = content_type_mapping.get(file_ext, 'audio/mpeg')
+        ingest_data = {
+            'song_id': db.collection('songs').document().id,
+            'title': title,
+            'description': description,
+            'file_path': unique_filename,
+            'file_extension': file_ext,
+            'content_type': SONG_CONTENT_TYPES[file_ext],
+            'spool_path': spool_path
+        }
 
-            # Upload with proper metadata
-            blob.upload_from_file(
-                audio_file,
-                content_type=content_type
-            )
+        if app.config['SONG_INGEST_ASYNC']:
+            job_id = ingest_queue.submit(ingest_song, ingest_data)
+            return jsonify({
+                'success': True,
+                'id': ingest_data['song_id'],
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': url_for('song_ingest_status', job_id=job_id)
+            }), 202
 
-            # Make public and set proper cache control
-            blob.make_public()
+        job = {'data': ingest_data, 'done': []}
+        try:
+            result = ingest_song(job)
+        except Exception as ingest_error:
+            print("[ERROR] Song ingest failed:", str(ingest_error))
+            cleanup_failed_ingest(job)
+            return jsonify({
+                'error': f'Song upload failed: {str(ingest_error)}'
+            }), 500
 
-            # Set CORS-friendly metadata
-            blob.metadata = {
-                'firebaseStorageDownloadTokens': str(uuid.uuid4())
-            }
-            blob.patch()
+        return jsonify(dict(result, success=True))
 
-            # Generate proper download URL
-            file_url = blob.public_url
+    except Exception as e:
+        print("[CRITICAL] Unexpected error:", str(e))
+        return jsonify({
+            'error': f'Unexpected server error: {str(e)}'
+        }), 500
 
-            # Alternative: Generate signed URL for better compatibility
-            from datetime import timedelta
-            signed_url = blob.generate_signed_url(
-                expiration=datetime.now() + timedelta(days=365),
-                method='GET'
-            )
 
-            print("[SUCCESS] File uploaded to:", file_url)
-            print("[SUCCESS] Signed URL:", signed_url)
+def ingest_song(job):
+    # Each step is recorded in job['done'] so a retry resumes where it failed
+    data = job['data']
+    done = job['done']
+    blob = bucket.blob(data['file_path'])
+
+    if 'upload' not in done:
+        blob.upload_from_filename(data['spool_path'], content_type=data['content_type'])
+        data['generation'] = blob.generation
+        done.append('upload')
+    elif data.get('generation') is None:
+        # Uploaded through a resumable session, fetch the object metadata
+        blob.reload()
+        data['generation'] = blob.generation
+
+    if 'make_public' not in done:
+        publish_song_blob(blob)
+        done.append('make_public')
+
+    if 'metadata' not in done:
+        # Set CORS-friendly metadata
+        blob.metadata = {
+            'firebaseStorageDownloadTokens': str(uuid.uuid4())
+        }
+        blob.patch()
+        done.append('metadata')
 
-        except Exception as upload_error:
-            print("[ERROR] Firebase upload failed:", str(upload_error))
-            return jsonify({
-                'error': f'File upload failed: {str(upload_error)}'
-            }), 500
+    file_url = blob.public_url
+    # No long-lived signed URL is stored; redirect playback mints short-lived ones
+    data['signed_url'] = None
 
+    if 'firestore' not in done:
         # Save to Firestore with both URLs
         song_data = {
-            'title': title,
-            'description': description,
+            'title': data['title'],
+            'description': data['description'],
             'file_url': file_url,
-            'signed_url': signed_url,  # Backup URL
-            'content_type': content_type,
-            'file_extension': file_ext,
+            'signed_url': data['signed_url'],  # Backup URL
+            'content_type': data['content_type'],
+            'file_extension': data['file_extension'],
             'created_at': firestore.SERVER_TIMESTAMP,
-            'file_path': unique_filename
+            'file_path': data['file_path'],
+            'generation': data.get('generation')
         }
+        batch = db.batch()
+        batch.create(db.collection('songs').document(data['song_id']), song_data)
+        count_change(batch, SONGS_COUNTER, {'total': 1})
+        try:
+            batch.commit()
+        except AlreadyExists:
+            # Committed by an earlier attempt whose response was lost
+            pass
+        response_cache.bump('songs')
+        done.append('firestore')
+        print("[SUCCESS] Song saved with ID:", data['song_id'])
+
+    remove_spool_file(data['spool_path'])
+    return {
+        'id': data['song_id'],
+        'file_url': file_url,
+        'signed_url': data['signed_url']
+    }
+
+
+def cleanup_failed_ingest(job):
+    data = job['data']
+    if 'upload' in job['done'] and 'firestore' not in job['done']:
+        try:
+            bucket.blob(data['file_path']).delete()
+            print("[CLEANUP] Deleted orphaned audio file")
+        except Exception as delete_error:
+            print("[ERROR] Failed to cleanup orphaned file:", str(delete_error))
+    remove_spool_file(data['spool_path'])
 
+
+def remove_spool_file(path):
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def record_ingest_job(state):
+    db.collection('ingest_jobs').document(state['id']).set(state)
+
+
+ingest_queue = JobQueue(
+    'song-ingest',
+    workers=int(os.getenv('INGEST_WORKERS', '2')),
+    max_attempts=int(os.getenv('INGEST_MAX_ATTEMPTS', '5')),
+    on_update=record_ingest_job,
+    on_failure=cleanup_failed_ingest
+)
+
+
+def recover_ingest_jobs():
+    """Resume ingests whose worker exited (restart, redeploy) before they
+    finished, or mark them failed when their audio is gone.
+
+    Runs in one process per host (see run_as_leader), when it starts and
+    whenever it takes over from a leader that exited.
+    """
+    resumed = failed = 0
+    jobs = db.collection('ingest_jobs').where('status', 'in', list(UNFINISHED)).stream()
+    for job_doc in jobs:
+        state = job_doc.to_dict()
+        if not is_orphaned(state, app.config['INGEST_STALE_SECONDS']):
+            continue
+        data = state.get('data')
+        done = state.get('done') or []
+        can_resume = data and ('upload' in done or (data.get('spool_path') and os.path.exists(data['spool_path'])))
         try:
-            doc_ref = db.collection('songs').document()
-            doc_ref.set(song_data)
-            print("[SUCCESS] Song saved with ID:", doc_ref.id)
+            # Claim the job first, so two hosts never take over the same one
+            claim = {'status': QUEUED if can_resume else FAILED, 'updated_at': time.time()}
+            if not can_resume:
+                claim['error'] = 'Ingest was interrupted and its audio is no longer available'
+            job_doc.reference.update(claim, option=db.write_option(last_update_time=job_doc.update_time))
+        except FailedPrecondition:
+            continue
+
+        if can_resume:
+            ingest_queue.resume(ingest_song, state)
+            resumed += 1
+        else:
+            if data:
+                cleanup_failed_ingest({'data': data, 'done': done})
+            failed += 1
+    if resumed or failed:
+        print(f"Ingest recovery: {resumed} jobs resumed, {failed} marked failed")
 
-            return jsonify({
-                'success': True,
-                'id': doc_ref.id,
-                'file_url': file_url,
-                'signed_url': signed_url
-            })
 
-        except Exception as firestore_error:
-            print("[ERROR] Firestore save failed:", str(firestore_error))
-            try:
-                blob.delete()
-                print("[CLEANUP] Deleted orphaned audio file")
-            except Exception as delete_error:
-                print("[ERROR] Failed to cleanup orphaned file:", str(delete_error))
+_ingest_recovery_pid = None
+
+
+def start_ingest_recovery():
+    """Start recover_ingest_jobs() once per process (after fork)."""
+    global _ingest_recovery_pid
+    if _ingest_recovery_pid == os.getpid():
+        return
+    _ingest_recovery_pid = os.getpid()
+    run_as_leader(os.path.join(app.config['INGEST_SPOOL_DIR'], 'recovery.lock'),
+                  recover_ingest_jobs, 'ingest-recovery')
+
+
+@app.route('/api/songs/jobs/<job_id>')
+def song_ingest_status(job_id):
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
 
+    try:
+        # Jobs run in the process that accepted the upload; other workers read the stored state
+        state = ingest_queue.get(job_id)
+        if state is None:
+            job_doc = db.collection('ingest_jobs').document(job_id).get()
+            if not job_doc.exists:
+                return jsonify({'error': 'Job not found'}), 404
+            state = public_state(job_doc.to_dict())
+        return jsonify(state)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# ============= CHUNKED SONG UPLOADS =============
+# init -> PUT chunks at an offset -> finalize. Each chunk is streamed straight
+# into a Cloud Storage resumable upload session, so nothing is buffered here
+# and an interrupted upload resumes from the last committed offset.
+
+@app.route('/api/songs/uploads', methods=['POST'])
+def init_song_upload():
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        data = request.get_json() or {}
+        filename = secure_filename(data.get('filename', ''))
+        size = int(data.get('size', 0))
+        song_id = data.get('song_id')
+
+        file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        if file_ext not in SONG_CONTENT_TYPES:
             return jsonify({
-                'error': f'Database save failed: {str(firestore_error)}'
-            }), 500
+                'error': f'Invalid file type. Allowed: {", ".join(SONG_CONTENT_TYPES)}'
+            }), 400
+        if size <= 0 or size > app.config['SONG_MAX_BYTES']:
+            return jsonify({'error': f"File size must be between 1 and {app.config['SONG_MAX_BYTES']} bytes"}), 400
+
+        if song_id:
+            # Replacing the audio of an existing song
+            if not db.collection('songs').document(song_id).get().exists:
+                return jsonify({'error': 'Song not found'}), 404
+        elif not data.get('title'):
+            return jsonify({'error': 'Song title is required'}), 400
+
+        content_type = SONG_CONTENT_TYPES[file_ext]
+        file_path = f"songs/{uuid.uuid4()}_{filename}"
+        session_url = bucket.blob(file_path).create_resumable_upload_session(
+            content_type=content_type,
+            size=size,
+            checksum=None
+        )
+
+        upload_ref = db.collection('song_uploads').document()
+        upload_ref.set({
+            'session_url': session_url,
+            'file_path': file_path,
+            'file_extension': file_ext,
+            'content_type': content_type,
+            'size': size,
+            'offset': 0,
+            'complete': False,
+            'song_id': song_id,
+            'title': data.get('title'),
+            'description': data.get('description', ''),
+            'created_at': firestore.SERVER_TIMESTAMP,
+            'updated_at': firestore.SERVER_TIMESTAMP
+        })
+
+        return jsonify({
+            'success': True,
+            'upload_id': upload_ref.id,
+            'offset': 0,
+            'size': size,
+            'chunk_alignment': CHUNK_ALIGNMENT
+        }), 201
 
     except Exception as e:
-        print("[CRITICAL] Unexpected error:", str(e))
+        print(f"Init song upload error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/songs/uploads/<upload_id>', methods=['GET'])
+def song_upload_status(upload_id):
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        upload_ref = db.collection('song_uploads').document(upload_id)
+        upload_doc = upload_ref.get()
+        if not upload_doc.exists:
+            return jsonify({'error': 'Upload not found'}), 404
+        upload = upload_doc.to_dict()
+
+        # Storage is the source of truth for how much actually arrived
+        offset, complete = query_offset(upstream.session, upload['session_url'], upload['size'],
+                                        timeout=upstream.timeout)
+        if offset != upload['offset'] or complete != upload['complete']:
+            upload_ref.update({'offset': offset, 'complete': complete, 'updated_at': firestore.SERVER_TIMESTAMP})
+
+        return jsonify({'upload_id': upload_id, 'offset': offset, 'size': upload['size'], 'complete': complete})
+
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        print(f"Song upload status error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/songs/uploads/<upload_id>', methods=['PUT'])
+def put_song_upload_chunk(upload_id):
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        offset = request.args.get('offset', type=int)
+        length = request.content_length
+        if offset is None or not length:
+            return jsonify({'error': 'offset and a Content-Length are required'}), 400
+
+        upload_ref = db.collection('song_uploads').document(upload_id)
+        upload_doc = upload_ref.get()
+        if not upload_doc.exists:
+            return jsonify({'error': 'Upload not found'}), 404
+        upload = upload_doc.to_dict()
+
+        if upload['complete']:
+            return jsonify({'offset': upload['size'], 'complete': True})
+        if offset != upload['offset']:
+            return jsonify({'error': 'Offset mismatch', 'offset': upload['offset']}), 409
+
+        committed, complete = put_chunk(upstream.session, upload['session_url'], request.stream,
+                                        offset, length, upload['size'], timeout=upstream.timeout)
+        upload_ref.update({'offset': committed, 'complete': complete, 'updated_at': firestore.SERVER_TIMESTAMP})
+
+        return jsonify({'offset': committed, 'complete': complete})
+
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        print(f"Song upload chunk error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/songs/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_song_upload(upload_id):
+    if 'admin_logged_in' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        upload_ref = db.collection('song_uploads').document(upload_id)
+        upload_doc = upload_ref.get()
+        if not upload_doc.exists:
+            return jsonify({'error': 'Upload not found'}), 404
+        upload = upload_doc.to_dict()
+
+        if not upload['complete']:
+            return jsonify({'error': 'Upload is not complete', 'offset': upload['offset']}), 409
+
+        if upload.get('song_id'):
+            # Swap the audio of an existing song
+            song_ref = db.collection('songs').document(upload['song_id'])
+            song = song_ref.get()
+            if not song.exists:
+                return jsonify({'error': 'Song not found'}), 404
+            old_path = song.to_dict().get('file_path')
+
+            blob = bucket.blob(upload['file_path'])
+            publish_song_blob(blob)
+            blob.reload()
+            song_ref.update({
+                'file_url': blob.public_url,
+                'file_path': upload['file_path'],
+                'generation': blob.generation,
+                'content_type': upload['content_type'],
+                'file_extension': upload['file_extension'],
+                # The old signed URL points at the replaced file
+                'signed_url': None,
+                'updated_at': firestore.SERVER_TIMESTAMP
+            })
+            response_cache.bump('songs')
+            upload_ref.delete()
+
+            if old_path and old_path != upload['file_path']:
+                try:
+                    bucket.blob(old_path).delete()
+                except Exception as e:
+                    print(f"Warning: Could not delete old audio file - {e}")
+
+            return jsonify({'success': True, 'id': upload['song_id'], 'file_url': blob.public_url})
+
+        # New song: the bytes are in storage already, the rest goes through the ingest queue
+        ingest_data = {
+            'song_id': db.collection('songs').document().id,
+            'title': upload['title'],
+            'description': upload['description'],
+            'file_path': upload['file_path'],
+            'file_extension': upload['file_extension'],
+            'content_type': upload['content_type'],
+            'spool_path': None
+        }
+        job_id = ingest_queue.submit(ingest_song, ingest_data, done=['upload'])
+        upload_ref.delete()
+
         return jsonify({
-            'error': f'Unexpected server error: {str(e)}'
-        }), 500
+            'success': True,
+            'id': ingest_data['song_id'],
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': url_for('song_ingest_status', job_id=job_id)
+        }), 202
+
+    except Exception as e:
+        print(f"Finalize song upload error: {e}")
+        return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/songs/<song_id>/test-audio')
@@ -895,10 +1925,9 @@ def test_audio_url(song_id):
         if not file_url:
             return jsonify({'error': 'No audio URL found'}), 404
 
-        # Try to access the URL
-        import requests
+        # Try to access the URL (a signed one when song objects aren't public)
         try:
-            response = requests.head(file_url, timeout=10)
+            response = upstream.head(playback_url(song_data) or file_url)
             url_accessible = response.status_code == 200
             content_type = response.headers.get('content-type', 'unknown')
             content_length = response.headers.get('content-length', 'unknown')
@@ -959,8 +1988,12 @@ def update_song(song_id):
                 audio_file,
                 content_type=audio_file.content_type
             )
-            blob.make_public()
+            publish_song_blob(blob)
             file_url = blob.public_url
+            # The old signed URL points at the deleted file, fall back to the public URL
+            new_file = {'file_path': unique_filename, 'generation': blob.generation, 'signed_url': None}
+        else:
+            new_file = {}
 
         # Prepare update data
         update_data = {
@@ -971,8 +2004,10 @@ def update_song(song_id):
 
         if file_url:
             update_data['file_url'] = file_url
+        update_data.update(new_file)
 
         song_ref.update(update_data)
+        response_cache.bump('songs')
 
         return jsonify({
             'success': True,
@@ -1011,8 +2046,14 @@ def delete_song(song_id):
             except Exception as e:
                 print(f"Warning: Could not delete audio file - {e}")
 
-        song_ref.delete()
+        batch = db.batch()
+        batch.delete(song_ref, option=db.write_option(last_update_time=song.update_time))
+        count_change(batch, SONGS_COUNTER, {'total': -1})
+        batch.commit()
+        response_cache.bump('songs')
         return jsonify({'success': True})
+    except FailedPrecondition:
+        return jsonify({'error': 'Song was changed meanwhile, please retry'}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1021,22 +2062,19 @@ def delete_song(song_id):
 @app.route('/api/products/<product_id>', methods=['GET'])
 def get_product_details(product_id):
     try:
-        product_doc = db.collection('products').document(product_id).get()
-        if not product_doc.exists:
+        read_model = catalog_read_model()
+        product_data = product_repository().get(product_id)
+
+        # Not in the catalog yet (e.g. before the first rebuild-catalog run)
+        if product_data is None and read_model:
+            read_model = False
+            product_data = repositories.products.get(product_id)
+
+        if product_data is None:
             return jsonify({'success': False, 'message': 'Product not found'})
 
-        product_data = product_doc.to_dict()
-        product_data['id'] = product_doc.id
-
-        # Get seller info
-        seller_doc = db.collection('sellers').document(product_data['seller_id']).get()
-        if seller_doc.exists:
-            seller_data = seller_doc.to_dict()
-            product_data['seller_info'] = {
-                'business_name': seller_data['business_name'],
-                'whatsapp': seller_data['whatsapp'],
-                'phone': seller_data['phone']
-            }
+        if not read_model:
+            join_seller_info([product_data])
 
         return jsonify({'success': True, 'product': product_data})
 
@@ -1066,25 +2104,240 @@ def update_product(product_id):
         update_data = {
             'name': data['name'],
             'description': data['description'],
-            'category': data['category'],
+            'category': normalize(data['category']),
             'price': float(data['price']),
             'original_price': float(data.get('originalPrice', data['price'])),
             'stock_quantity': int(data.get('stockQuantity', 0)),
             'updated_at': datetime.now()
         }
 
-        # Update in Firestore
-        db.collection('products').document(product_id).update(update_data)
+        # Update in Firestore, together with its catalog entry and the
+        # category counts (only if nothing else changed the product meanwhile)
+        updated_product = dict(product_data, **update_data)
+        batch = db.batch()
+        batch.update(db.collection('products').document(product_id), update_data,
+                     option=db.write_option(last_update_time=product_doc.update_time))
+        set_entry(batch, db, product_id, updated_product, seller_cache.get(db, product_data['seller_id']))
+        count_change(batch, PRODUCTS_COUNTER,
+                     combine(product_counts(updated_product), combine(product_counts(product_data), sign=-1)))
+        batch.commit()
+        response_cache.bump('products')
 
         return jsonify({'success': True, 'message': 'Product updated successfully'})
 
+    except FailedPrecondition:
+        return jsonify({'success': False, 'message': 'Product was changed meanwhile, please retry.'}), 409
     except Exception as e:
         print(f"Update product error: {e}")
         return jsonify({'success': False, 'message': str(e)})
 
 
+@app.cli.command('migrate-word-audio')
+def migrate_word_audio_command():
+    """Move pronunciation clips to content-addressed names and update the words."""
+    upload_folder = app.config['UPLOAD_FOLDER']
+    migrated = 0
+    batch = db.batch()
+    pending = 0
+    for doc in db.collection('words').stream():
+        audio_path = doc.to_dict().get('audio_path')
+        if not audio_path or is_hashed_name(audio_path):
+            continue
+        source = os.path.join(upload_folder, audio_path)
+        if not os.path.exists(source):
+            print(f"Missing audio file for word {doc.id}: {audio_path}")
+            continue
+        # Same write as update_word, so offline packs pick up the new path
+        update_word_fields(batch, doc.id, {'audio_path': store_existing(source, upload_folder)})
+        migrated += 1
+        pending += 1
+        if pending == BATCH_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+    # Originals are left in place for clients still holding the old names
+    print(f"Migrated audio for {migrated} words")
+
+
+@app.cli.command('init-firestore')
+def init_firestore_command():
+    """Create the default admin and sample data if missing (run once per deployment)."""
+    init_firestore()
+
+
+@app.cli.command('prune-word-deletions')
+def prune_word_deletions_command():
+    """Drop dictionary tombstones older than the offline pack retention."""
+    cutoff = utcnow() - DELETION_RETENTION
+    pruned = 0
+    for doc in db.collection('word_deletions').where('deleted_at', '<', cutoff).stream():
+        doc.reference.delete()
+        pruned += 1
+    print(f"Pruned {pruned} word deletion records")
+
+
+@app.cli.command('sweep-song-uploads')
+def sweep_song_uploads_command():
+    """Remove chunked song uploads abandoned before finalize (run daily)."""
+    cutoff = utcnow() - timedelta(hours=app.config['SONG_UPLOAD_EXPIRY_HOURS'])
+    removed = 0
+    for doc in db.collection('song_uploads').where('updated_at', '<', cutoff).stream():
+        upload = doc.to_dict()
+        try:
+            # Skipped if a chunk or finalize touched it since the query
+            doc.reference.delete(option=db.write_option(last_update_time=doc.update_time))
+        except FailedPrecondition:
+            continue
+        if not cancel_session(upstream.session, upload['session_url'], timeout=upstream.timeout):
+            print(f"Warning: Could not cancel upload session of {doc.id}")
+        try:
+            # Present when every byte arrived but the upload was never finalized
+            bucket.blob(upload['file_path']).delete()
+        except NotFound:
+            pass
+        removed += 1
+    print(f"Removed {removed} abandoned song uploads")
+
+
+@app.cli.command('clear-song-signed-urls')
+def clear_song_signed_urls_command():
+    """Remove the long-lived signed URLs stored on songs by earlier uploads."""
+    cleared = 0
+    for doc in db.collection('songs').where('signed_url', '!=', None).stream():
+        doc.reference.update({'signed_url': None, 'updated_at': firestore.SERVER_TIMESTAMP})
+        cleared += 1
+    response_cache.bump('songs')
+    print(f"Cleared signed URLs from {cleared} songs")
+
+
+@app.cli.command('rebuild-counters')
+def rebuild_counters_command():
+    """Recount words, songs and products into the sharded counters.
+
+    Needed once for data written before the counters existed. Run it while
+    no writes are happening, increments made during the recount are lost.
+    """
+    words = sum(1 for _ in db.collection('words').select([]).stream())
+    songs = sum(1 for _ in db.collection('songs').select([]).stream())
+    by_seller = {seller.id: 0 for seller in db.collection('sellers').select([]).stream()}
+    product_docs = []
+    for doc in db.collection('products').select(['status', 'category', 'seller_id']).stream():
+        product_data = doc.to_dict()
+        product_docs.append(product_counts(product_data))
+        if product_data.get('seller_id'):
+            by_seller[product_data['seller_id']] = by_seller.get(product_data['seller_id'], 0) + 1
+    products = combine(*product_docs)
+    reset_counter(db, WORDS_COUNTER, {'total': words})
+    reset_counter(db, SONGS_COUNTER, {'total': songs})
+    reset_counter(db, PRODUCTS_COUNTER, dict({'total': 0, 'active': 0}, **products))
+    for seller_id, count in by_seller.items():
+        reset_counter(db, seller_products_counter(seller_id), {'total': count})
+    # Stats and facets switch from count aggregations to the counters
+    counters_backfill.mark(db)
+    print(f"Counters rebuilt: {words} words, {songs} songs, {products.get('total', 0)} products")
+
+
+@app.cli.command('normalize-product-categories')
+def normalize_product_categories_command():
+    """Store product categories in the casefolded form ?category= matches.
+
+    Categories are normalized on write; this rewrites products stored before
+    that, moves their category counts, and then rebuilds the catalog.
+    """
+    updated = 0
+    for doc in db.collection('products').stream():
+        product_data = doc.to_dict()
+        category = normalize(product_data.get('category'))
+        if not product_data.get('category') or product_data['category'] == category:
+            continue
+        normalized = dict(product_data, category=category)
+        batch = db.batch()
+        batch.update(doc.reference, {'category': category},
+                     option=db.write_option(last_update_time=doc.update_time))
+        count_change(batch, PRODUCTS_COUNTER,
+                     combine(product_counts(normalized), combine(product_counts(product_data), sign=-1)))
+        try:
+            batch.commit()
+        except FailedPrecondition:
+            print(f"Product {doc.id} changed meanwhile, run the command again")
+            continue
+        updated += 1
+    written, _ = rebuild_catalog(db)
+    response_cache.bump('products')
+    print(f"Normalized the category of {updated} products, {written} catalog entries rewritten")
+
+
+@app.cli.command('rebuild-catalog')
+def rebuild_catalog_command():
+    """Rebuild the denormalized shop catalog from products and sellers."""
+    written, removed = rebuild_catalog(db)
+    # Shop reads switch to the catalog from now on
+    catalog_backfill.mark(db)
+    print(f"Catalog rebuilt: {written} products written, {removed} stale entries removed")
+
+
+def warm_up():
+    """Load the dictionary, songs and catalog caches before serving traffic.
+
+    Runs the configured GET routes through the test client so the word cache,
+    read replica and response cache are filled exactly as a real request
+    would fill them. Timings are printed and exposed in /api/cache/stats
+    and /metrics.
+    """
+    started = time.perf_counter()
+    phases = {}
+    client = app.test_client()
+    for path in app.config['WARM_UP_PATHS']:
+        path_started = time.perf_counter()
+        try:
+            response = client.get(path)
+            response.get_data()
+            response.close()
+            if response.status_code != 200:
+                print(f"Warm-up of {path} returned {response.status_code}")
+        except Exception as e:
+            print(f"Warm-up of {path} failed: {e}")
+        phases[path] = round(time.perf_counter() - path_started, 3)
+
+    cold_start = app.config['COLD_START']
+    cold_start['pid'] = os.getpid()
+    cold_start['warm_up_seconds'] = round(time.perf_counter() - started, 3)
+    cold_start['warm_up_paths'] = phases
+    metrics.cold_start.set(cold_start['warm_up_seconds'], phase='warm_up')
+    print(f"Worker {os.getpid()} warmed up in {cold_start['warm_up_seconds']}s {phases}")
+
+
+def start_worker(warm=None):
+    """Per-process start-up: ingest job recovery and the cache warm-up."""
+    if warm is None:
+        warm = app.config['WARM_UP_ON_START']
+    start_ingest_recovery()
+    if warm:
+        warm_up()
+
+
+def create_app(warm=None, start=True):
+    """Application factory for WSGI servers, e.g. gunicorn 'app:create_app()'.
+
+    Routes are registered on the module-level app, so this only performs the
+    per-process start-up. Firebase clients are created lazily, so the app can
+    be loaded in a pre-forking master with start=False; gunicorn.conf.py then
+    runs start_worker() in each worker after fork instead of here.
+    """
+    if start:
+        start_worker(warm)
+    return app
+
+
+app.config['COLD_START']['module_seconds'] = round(time.perf_counter() - MODULE_STARTED, 3)
+metrics.cold_start.set(app.config['COLD_START']['module_seconds'], phase='module')
+
+
 if __name__ == '__main__':
     print("Starting initialization...")  # Add debug print
     init_firestore()
+    create_app()
     print("Initialization complete, starting server...")  # Add debug print
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
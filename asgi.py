@@ -0,0 +1,240 @@
+"""ASGI entry point.
+
+    uvicorn asgi:application --workers 2
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:application
+
+Song streaming and product details are served natively async, with the
+Firestore AsyncClient and an httpx AsyncClient, so a listener no longer
+holds a thread for the length of a song. Every other route, including the
+word/song/product lists which read the local caches, runs the Flask app in
+a bounded thread pool and behaves exactly as under gunicorn's sync workers.
+"""
+import os
+import re
+import time
+
+import anyio
+import httpx
+
+from app import (PLAYBACK_REDIRECT_HEADERS, app, audio_cache, catalog_read_model, firebase_clients, metrics,
+                 playback_url, product_repository, repositories, start_worker, upstream)
+from utils.asgi import WsgiBridge, encode_headers, request_headers, send_file, send_response
+from utils.audio_proxy import PASSTHROUGH_HEADERS, format_byte_range, parse_byte_range
+from utils.seller_cache import seller_info_from_dict
+
+WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', '40'))
+ASYNC_UPSTREAM_POOL_SIZE = int(os.getenv('ASYNC_UPSTREAM_POOL_SIZE', '256'))
+
+bridge = WsgiBridge(app, max_threads=WSGI_THREADS, max_body=app.config['MAX_CONTENT_LENGTH'])
+
+_http_client = None
+_http_client_pid = None
+
+
+def http_client():
+    # One pooled client per process, created inside the running event loop
+    global _http_client, _http_client_pid
+    if _http_client is None or _http_client_pid != os.getpid():
+        connect_timeout, read_timeout = upstream.timeout
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=ASYNC_UPSTREAM_POOL_SIZE,
+                                max_keepalive_connections=ASYNC_UPSTREAM_POOL_SIZE),
+            follow_redirects=True
+        )
+        _http_client_pid = os.getpid()
+    return _http_client
+
+
+async def get_document(collection, doc_id):
+    started = time.perf_counter()
+    error = False
+    doc = None
+    try:
+        doc = await firebase_clients.async_firestore().collection(collection).document(doc_id).get()
+    except Exception:
+        error = True
+        raise
+    finally:
+        found = 1 if doc is not None and doc.exists else 0
+        metrics.observe_firestore(collection, 'get', time.perf_counter() - started, found, error)
+    if not doc.exists:
+        return None
+    data = doc.to_dict()
+    data['id'] = doc.id
+    return data
+
+
+async def send_json(send, data, status=200):
+    body = app.json.dumps(data).encode('utf-8')
+    await send_response(send, status, body, headers={'Access-Control-Allow-Origin': '*'},
+                        content_type='application/json')
+
+
+async def stream_audio(scope, receive, send, song_id):
+    cors = {'Access-Control-Allow-Origin': '*'}
+    replica = repositories.songs.local()
+    song_data = replica.get('songs', song_id) if replica is not None else None
+    if song_data is None:
+        # Not replicated (yet), e.g. a song added moments ago
+        song_data = await get_document('songs', song_id)
+    if song_data is None:
+        return await send_response(send, 404, b'Song not found', headers=cors)
+
+    # Signing may call out to IAM on a cache miss, so it runs off the event loop
+    signed_url = await anyio.to_thread.run_sync(playback_url, song_data)
+    if signed_url:
+        return await send_response(send, 302, headers={'Location': signed_url, **PLAYBACK_REDIRECT_HEADERS})
+
+    file_url = song_data.get('signed_url') or song_data.get('file_url')
+    if not file_url:
+        return await send_response(send, 404, b'No audio file available', headers=cors)
+
+    content_type = song_data.get('content_type', 'audio/mpeg')
+
+    # Served from the shared disk cache; a miss is proxied while the cache fills in the background
+    if audio_cache is not None:
+        version = song_data.get('generation') or song_data.get('file_path') or song_data.get('file_url')
+        cached_path = audio_cache.get(song_id, version)
+        if cached_path is None and scope['method'] == 'GET':
+            audio_cache.prefetch(song_id, version, lambda: upstream.get(file_url))
+        if cached_path:
+            return await send_file(scope, send, cached_path, content_type,
+                                   audio_cache.etag_for(song_id, version), headers=cors)
+
+    byte_range = parse_byte_range(request_headers(scope).get('range'))
+    upstream_headers = {'Range': format_byte_range(byte_range)} if byte_range else {}
+
+    client = http_client()
+    response = await client.send(client.build_request(scope['method'], file_url, headers=upstream_headers),
+                                 stream=True)
+    try:
+        headers = {'Accept-Ranges': 'bytes', 'Cache-Control': 'public, max-age=3600', **cors}
+        for name in PASSTHROUGH_HEADERS:
+            if name in response.headers:
+                headers[name] = response.headers[name]
+
+        if response.status_code == 416:
+            headers.pop('Content-Length', None)
+            return await send_response(send, 416, headers=headers)
+
+        if response.status_code not in (200, 206):
+            print(f"Stream audio upstream error: {response.status_code}")
+            return await send_response(send, 502, b'Audio file unavailable', headers=cors)
+
+        # 206 only if upstream actually honoured the range
+        status = 206 if byte_range and response.status_code == 206 else 200
+        headers['Content-Type'] = content_type
+        await send({'type': 'http.response.start', 'status': status, 'headers': encode_headers(headers)})
+        if scope['method'] != 'HEAD':
+            async for chunk in response.aiter_bytes():
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        await response.aclose()
+
+
+async def product_details(scope, receive, send, product_id):
+    try:
+        read_model = catalog_read_model()
+        repository = product_repository()
+        replica = repository.local()
+        product_data = replica.get(repository.collection, product_id) if replica is not None else None
+
+        if product_data is None and read_model:
+            product_data = await get_document(repository.collection, product_id)
+
+        # Not in the catalog yet (e.g. before the first rebuild-catalog run)
+        if product_data is None:
+            read_model = False
+            product_data = await get_document('products', product_id)
+            if product_data is None:
+                return await send_json(send, {'success': False, 'message': 'Product not found'})
+
+        if not read_model:
+            sellers = repositories.sellers.local()
+            if sellers is not None:
+                seller_data = sellers.get('sellers', product_data['seller_id'])
+            else:
+                seller_data = await get_document('sellers', product_data['seller_id'])
+            if seller_data:
+                product_data['seller_info'] = seller_info_from_dict(seller_data)
+
+        await send_json(send, {'success': True, 'product': product_data})
+
+    except Exception as e:
+        print(f"Get product details error: {e}")
+        await send_json(send, {'success': False, 'message': str(e)})
+
+
+# (pattern, methods, Flask rule used as the metrics label, handler)
+ASYNC_ROUTES = [
+    (re.compile(r'^/api/songs/(?P<song_id>[^/]+)/stream$'), ('GET', 'HEAD'),
+     '/api/songs/<song_id>/stream', stream_audio),
+    (re.compile(r'^/api/products/(?P<product_id>[^/]+)$'), ('GET',),
+     '/api/products/<product_id>', product_details),
+]
+
+
+async def run_async_route(scope, receive, send, rule, handler, params):
+    started = time.perf_counter()
+    state = {'status': None, 'bytes': 0, 'observed': False}
+    labels = {'method': scope['method'], 'route': rule}
+
+    async def tracked_send(message):
+        if message['type'] == 'http.response.start':
+            state['status'] = message['status']
+            # Same as the Flask hooks: latency is the time until the response starts
+            metrics.request_duration.observe(time.perf_counter() - started, **labels)
+            state['observed'] = True
+        elif message['type'] == 'http.response.body':
+            state['bytes'] += len(message.get('body', b''))
+        await send(message)
+
+    metrics.in_progress.inc()
+    try:
+        await handler(scope, receive, tracked_send, **params)
+    except Exception as e:
+        print(f"Async route error on {scope['path']}: {e}")
+        if state['status'] is None:
+            await tracked_send({'type': 'http.response.start', 'status': 500,
+                                'headers': encode_headers({'Content-Type': 'text/plain; charset=utf-8'})})
+            await tracked_send({'type': 'http.response.body', 'body': f'Streaming error: {e}'.encode('utf-8')})
+    finally:
+        metrics.in_progress.dec()
+        if not state['observed']:
+            metrics.request_duration.observe(time.perf_counter() - started, **labels)
+        metrics.requests.inc(status=state['status'] or 500, **labels)
+        metrics.response_size.observe(state['bytes'], **labels)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                # Already warmed by gunicorn's post_fork hook in this process?
+                warm = app.config['WARM_UP_ON_START'] and app.config['COLD_START'].get('pid') != os.getpid()
+                await anyio.to_thread.run_sync(start_worker, warm)
+                await send({'type': 'lifespan.startup.complete'})
+            except Exception as e:
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+        elif message['type'] == 'lifespan.shutdown':
+            if _http_client is not None:
+                await _http_client.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    for pattern, methods, rule, handler in ASYNC_ROUTES:
+        match = pattern.match(scope['path'])
+        if match and scope['method'] in methods:
+            return await run_async_route(scope, receive, send, rule, handler, match.groupdict())
+
+    await bridge(scope, receive, send)
@@ -0,0 +1,71 @@
+"""Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare OLD.json NEW.json [--threshold 10]
+
+Exits with status 1 when a scenario's p95 or p99 got slower, or its
+throughput dropped, by more than the threshold percentage.
+"""
+import argparse
+import json
+import sys
+
+# (metric, True if higher is better)
+METRICS = [
+    ('throughput_rps', True),
+    ('p50_ms', False),
+    ('p95_ms', False),
+    ('p99_ms', False),
+    ('documents_read_per_request', False)
+]
+
+GATED = ('throughput_rps', 'p95_ms', 'p99_ms')
+
+
+def change(old, new):
+    if not old:
+        return 0.0 if not new else float('inf')
+    return (new - old) / old * 100.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=10.0, help='allowed regression in percent')
+    args = parser.parse_args(argv)
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    for key in ('scale', 'latency_ms', 'per_doc_us', 'concurrency', 'replica'):
+        if old['meta'].get(key) != new['meta'].get(key):
+            print(f"Warning: runs differ in {key}: {old['meta'].get(key)} vs {new['meta'].get(key)}")
+
+    print(f"{old['meta']['revision']} -> {new['meta']['revision']}")
+    regressions = []
+    for name, new_result in new['scenarios'].items():
+        old_result = old['scenarios'].get(name)
+        if old_result is None:
+            print(f"\n{name}: new scenario")
+            continue
+        print(f"\n{name}")
+        for metric, higher_is_better in METRICS:
+            before, after = old_result.get(metric, 0), new_result.get(metric, 0)
+            delta = change(before, after)
+            worse = -delta if higher_is_better else delta
+            flag = ''
+            if metric in GATED and worse > args.threshold:
+                flag = '  REGRESSION'
+                regressions.append(f'{name}.{metric}')
+            print(f"  {metric:<28} {before:>12} -> {after:>12}  ({delta:+.1f}%){flag}")
+
+    if regressions:
+        print(f"\nRegressions over {args.threshold}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,652 @@
+"""In-memory Firestore and Storage stand-ins for benchmarking app.py.
+
+Only the client surface the app actually uses is implemented. Every call
+that would be a network round-trip sleeps for `latency` seconds (plus
+`per_doc` seconds per document returned), so the cost of a route's
+Firestore access pattern shows up in the timings, and every call is
+counted per collection and operation so the driver can report reads per
+request. Storage objects, including resumable upload sessions, are served
+over HTTP by StorageAdapter.
+"""
+import io
+import random
+import string
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import requests
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore import SERVER_TIMESTAMP, Increment
+from requests.adapters import BaseAdapter
+from urllib3 import HTTPResponse
+
+DOCUMENT_ID = '__name__'
+STORAGE_HOST = 'fake-storage.local'
+
+
+def _new_id():
+    return ''.join(random.choices(string.ascii_letters + string.digits, k=20))
+
+
+def _copy(value):
+    # Documents are handed out as copies, like a real client deserializing them
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _resolve(old, value, merge):
+    # Applies write transforms the app uses, and merges maps like set(merge=True)
+    if isinstance(value, Increment):
+        return (old if isinstance(old, (int, float)) else 0) + value.value
+    if value is SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if merge and isinstance(value, dict):
+        merged = dict(old) if isinstance(old, dict) else {}
+        for key, item in value.items():
+            merged[key] = _resolve(merged.get(key), item, merge)
+        return merged
+    if isinstance(value, dict):
+        return {key: _resolve(None, item, False) for key, item in value.items()}
+    return _copy(value)
+
+
+def _order_key(value):
+    # Firestore's cross-type ordering: null < bool < number < timestamp < string
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return (3, value.timestamp())
+    if isinstance(value, str):
+        return (4, value)
+    return (5, str(value))
+
+
+_MISSING = object()
+
+
+def _field(data, doc_id, path):
+    if path == DOCUMENT_ID:
+        return doc_id
+    value = data
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _matches(value, op, expected):
+    if value is _MISSING:
+        return False
+    if op == '==':
+        return value == expected
+    if op == '!=':
+        return value != expected
+    if op == 'in':
+        return value in expected
+    if op == 'not-in':
+        return value not in expected
+    if op == 'array_contains':
+        return isinstance(value, list) and expected in value
+    if op == 'array_contains_any':
+        return isinstance(value, list) and any(v in value for v in expected)
+    left, right = _order_key(value), _order_key(expected)
+    if left[0] != right[0]:
+        return False
+    return {'<': left < right, '<=': left <= right, '>': left > right, '>=': left >= right}[op]
+
+
+class CallStats:
+    """Counts and timings of fake RPCs, keyed by (collection, operation)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = defaultdict(int)
+        self.documents = defaultdict(int)
+
+    def record(self, collection, operation, documents=0):
+        with self._lock:
+            self.calls[(collection, operation)] += 1
+            self.documents[(collection, operation)] += documents
+
+    def snapshot(self):
+        with self._lock:
+            return {'calls': dict(self.calls), 'documents': dict(self.documents)}
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.documents.clear()
+
+
+class _ChangeType:
+    def __init__(self, name):
+        self.name = name
+
+
+class _Change:
+    def __init__(self, name, document):
+        self.type = _ChangeType(name)
+        self.document = document
+
+
+class Watch:
+    def __init__(self, collection, callback):
+        self.collection = collection
+        self.callback = callback
+
+    def unsubscribe(self):
+        self.collection._client._unwatch(self.collection.id, self)
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return _copy(self._data) if self._data is not None else None
+
+    def get(self, field_path):
+        value = _field(self._data or {}, self.id, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return _copy(value)
+
+
+class DocumentReference:
+    def __init__(self, client, collection_id, doc_id):
+        self._client = client
+        self.collection_id = collection_id
+        self.id = doc_id
+        self.path = f'{collection_id}/{doc_id}'
+
+    def get(self, field_paths=None):
+        self._client._rpc(self.collection_id, 'get', 1)
+        return self._client._snapshot(self, field_paths)
+
+    def set(self, data, merge=False):
+        self._client._rpc(self.collection_id, 'set')
+        self._client._write([('set', self, data, merge)])
+
+    def create(self, data):
+        self._client._rpc(self.collection_id, 'create')
+        self._client._write([('create', self, data, False)])
+
+    def update(self, data):
+        self._client._rpc(self.collection_id, 'update')
+        self._client._write([('update', self, data, True)])
+
+    def delete(self):
+        self._client._rpc(self.collection_id, 'delete')
+        self._client._write([('delete', self, None, False)])
+
+    def collection(self, collection_id):
+        # Subcollections are stored as collections named by their full path
+        return CollectionReference(self._client, f'{self.path}/{collection_id}')
+
+
+class Query:
+    def __init__(self, collection, filters=(), orders=(), limit_count=None, start=None):
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit_count
+        self._start = start
+
+    def _with(self, **changes):
+        state = {'filters': self._filters, 'orders': self._orders,
+                 'limit_count': self._limit, 'start': self._start}
+        state.update(changes)
+        return Query(self._collection, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._with(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction='ASCENDING'):
+        return self._with(orders=self._orders + ((field_path, direction == 'DESCENDING'),))
+
+    def limit(self, count):
+        return self._with(limit_count=count)
+
+    def start_after(self, values):
+        if isinstance(values, DocumentSnapshot):
+            values = {path: values.id if path == DOCUMENT_ID else values.get(path)
+                      for path, _ in self._orders}
+        values = {path: (v.id if isinstance(v, DocumentReference) else v) for path, v in values.items()}
+        return self._with(start=values)
+
+    def _sort_key(self, doc_id, data):
+        return [_order_key(_field(data, doc_id, path)) for path, _ in self._orders]
+
+    def _run(self):
+        client = self._collection._client
+        with client._lock:
+            docs = list(client._data.get(self._collection.id, {}).items())
+
+        results = []
+        for doc_id, data in docs:
+            if not all(_matches(_field(data, doc_id, f), op, v) for f, op, v in self._filters):
+                continue
+            # Ordering by a field leaves out documents that don't have it
+            if any(_field(data, doc_id, path) is _MISSING for path, _ in self._orders):
+                continue
+            results.append((doc_id, data))
+
+        orders = list(self._orders)
+        if not any(path == DOCUMENT_ID for path, _ in orders):
+            orders.append((DOCUMENT_ID, orders[-1][1] if orders else False))
+        for path, descending in reversed(orders):
+            results.sort(key=lambda item, p=path: _order_key(_field(item[1], item[0], p)), reverse=descending)
+
+        if self._start:
+            def after_start(item):
+                for path, descending in orders:
+                    if path not in self._start:
+                        continue
+                    left = _order_key(_field(item[1], item[0], path))
+                    right = _order_key(self._start[path])
+                    if left != right:
+                        return left < right if descending else left > right
+                return False
+            results = [item for item in results if after_start(item)]
+
+        if self._limit is not None:
+            results = results[:self._limit]
+        return results
+
+    def stream(self):
+        results = self._run()
+        self._collection._client._rpc(self._collection.id, 'stream', len(results))
+        for doc_id, data in results:
+            yield DocumentSnapshot(self._collection.document(doc_id), _copy(data))
+
+    def get(self):
+        return list(self.stream())
+
+    def count(self, alias=None):
+        return AggregationQuery(self, alias or 'count')
+
+
+class AggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+
+class AggregationQuery:
+    def __init__(self, query, alias):
+        self._query = query
+        self._alias = alias
+
+    def get(self):
+        count = len(self._query._run())
+        # Billed as one read per 1000 index entries, at least one
+        self._query._collection._client._rpc(self._query._collection.id, 'count', max(1, -(-count // 1000)))
+        return [[AggregationResult(self._alias, count)]]
+
+
+class CollectionReference(Query):
+    def __init__(self, client, collection_id):
+        self._client = client
+        self.id = collection_id
+        super().__init__(self)
+
+    def document(self, document_id=None):
+        return DocumentReference(self._client, self.id, document_id or _new_id())
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return datetime.now(timezone.utc), ref
+
+    def on_snapshot(self, callback):
+        return self._client._watch(self, callback)
+
+
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append(('set', reference, data, merge))
+
+    def create(self, reference, data):
+        self._writes.append(('create', reference, data, False))
+
+    def update(self, reference, data):
+        self._writes.append(('update', reference, data, True))
+
+    def delete(self, reference):
+        self._writes.append(('delete', reference, None, False))
+
+    def commit(self):
+        collection = self._writes[0][1].collection_id if self._writes else ''
+        self._client._rpc(collection, 'commit')
+        self._client._write(self._writes)
+        self._writes = []
+
+
+class FakeFirestore:
+    """Thread-safe in-memory Firestore client."""
+
+    def __init__(self, latency=0.0, per_doc=0.0):
+        self.latency = latency
+        self.per_doc = per_doc
+        self.stats = CallStats()
+        self._data = {}
+        self._watches = defaultdict(list)
+        self._lock = threading.RLock()
+
+    def _rpc(self, collection, operation, documents=0):
+        self.stats.record(collection, operation, documents)
+        delay = self.latency + self.per_doc * documents
+        if delay > 0:
+            time.sleep(delay)
+
+    def collection(self, collection_id):
+        return CollectionReference(self, collection_id)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def get_all(self, references, field_paths=None):
+        references = list(references)
+        if references:
+            self._rpc(references[0].collection_id, 'get_all', len(references))
+        for reference in references:
+            yield self._snapshot(reference, field_paths)
+
+    def _snapshot(self, reference, field_paths=None):
+        with self._lock:
+            data = self._data.get(reference.collection_id, {}).get(reference.id)
+        if data is not None and field_paths:
+            data = {k: v for k, v in data.items() if k in field_paths}
+        return DocumentSnapshot(reference, _copy(data) if data is not None else None)
+
+    def load(self, collection_id, documents):
+        """Bulk insert {doc_id: data} without latency (used by the seeders)."""
+        with self._lock:
+            self._data.setdefault(collection_id, {}).update(documents)
+
+    def _write(self, writes):
+        changes = defaultdict(list)
+        with self._lock:
+            # Preconditions are checked up front so a failing batch writes nothing
+            for kind, reference, _, _ in writes:
+                existed = reference.id in self._data.get(reference.collection_id, {})
+                if kind == 'create' and existed:
+                    raise AlreadyExists(f'Document already exists: {reference.path}')
+                if kind == 'update' and not existed:
+                    raise KeyError(f'No document to update: {reference.path}')
+            for kind, reference, data, merge in writes:
+                docs = self._data.setdefault(reference.collection_id, {})
+                existed = reference.id in docs
+                if kind == 'delete':
+                    if docs.pop(reference.id, None) is not None:
+                        changes[reference.collection_id].append(('REMOVED', reference, None))
+                    continue
+                current = dict(docs.get(reference.id, {})) if merge else {}
+                for key, value in data.items():
+                    if '.' in key and kind == 'update':
+                        target = current
+                        parts = key.split('.')
+                        for part in parts[:-1]:
+                            target = target.setdefault(part, {})
+                        target[parts[-1]] = _resolve(target.get(parts[-1]), value, False)
+                    else:
+                        current[key] = _resolve(current.get(key), value, merge and kind == 'set')
+                docs[reference.id] = current
+                changes[reference.collection_id].append(('MODIFIED' if existed else 'ADDED', reference, current))
+            watches = {cid: list(self._watches.get(cid, ())) for cid in changes}
+
+        for collection_id, collection_changes in changes.items():
+            for watch in watches[collection_id]:
+                self._notify(watch, collection_changes)
+
+    def _watch(self, collection, callback):
+        watch = Watch(collection, callback)
+        with self._lock:
+            self._watches[collection.id].append(watch)
+            docs = [DocumentSnapshot(collection.document(doc_id), _copy(data))
+                    for doc_id, data in self._data.get(collection.id, {}).items()]
+
+        def initial():
+            self._rpc(collection.id, 'listen', len(docs))
+            callback(docs, [_Change('ADDED', doc) for doc in docs], datetime.now(timezone.utc))
+
+        threading.Thread(target=initial, daemon=True).start()
+        return watch
+
+    def _notify(self, watch, changes):
+        docs = [DocumentSnapshot(reference, _copy(data)) for _, reference, data in changes]
+        watch.callback(docs, [_Change(name, doc) for (name, _, _), doc in zip(changes, docs)],
+                       datetime.now(timezone.utc))
+
+    def _unwatch(self, collection_id, watch):
+        with self._lock:
+            if watch in self._watches[collection_id]:
+                self._watches[collection_id].remove(watch)
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.content_type = None
+        self.cache_control = None
+        self.metadata = None
+        self.generation = None
+        self.size = None
+
+    @property
+    def public_url(self):
+        return f'http://{STORAGE_HOST}/{self.bucket.name}/{self.name}'
+
+    def generate_signed_url(self, **kwargs):
+        return f'{self.public_url}?signature=fake'
+
+    def upload_from_string(self, data, content_type=None):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.bucket._put(self, bytes(data), content_type)
+
+    def upload_from_file(self, file_obj, content_type=None, **kwargs):
+        self.bucket._put(self, file_obj.read(), content_type)
+
+    def upload_from_filename(self, filename, content_type=None, **kwargs):
+        with open(filename, 'rb') as f:
+            self.bucket._put(self, f.read(), content_type)
+
+    def create_resumable_upload_session(self, content_type=None, size=None, **kwargs):
+        return self.bucket._create_session(self.name, content_type, size)
+
+    def make_public(self):
+        self.bucket._rpc('make_public')
+
+    def reload(self):
+        self.bucket._rpc('reload')
+        stored = self.bucket._objects.get(self.name)
+        if stored is not None:
+            self.generation, self.size = stored['generation'], len(stored['data'])
+            self.content_type = stored['content_type']
+
+    def patch(self):
+        self.bucket._rpc('patch')
+
+    def exists(self):
+        self.bucket._rpc('exists')
+        return self.name in self.bucket._objects
+
+    def delete(self):
+        self.bucket._rpc('delete')
+        if self.bucket._objects.pop(self.name, None) is None:
+            raise NotFound(f'No such object: {self.bucket.name}/{self.name}')
+
+
+class FakeBucket:
+    """In-memory Storage bucket; objects are served over HTTP by StorageAdapter."""
+
+    def __init__(self, name='bench-bucket', latency=0.0, stats=None):
+        self.name = name
+        self.latency = latency
+        self.stats = stats or CallStats()
+        self._objects = {}
+        self._sessions = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _rpc(self, operation):
+        self.stats.record('storage', operation)
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def _put(self, blob, data, content_type):
+        self._rpc('upload')
+        with self._lock:
+            self._generation += 1
+            self._objects[blob.name] = {'data': data, 'content_type': content_type or 'application/octet-stream',
+                                        'generation': self._generation}
+        blob.generation, blob.size, blob.content_type = self._generation, len(data), content_type
+
+    def _create_session(self, name, content_type, size):
+        self._rpc('create_upload_session')
+        upload_id = _new_id()
+        with self._lock:
+            self._sessions[upload_id] = {'name': name, 'content_type': content_type,
+                                         'size': size, 'data': bytearray()}
+        return f'http://{STORAGE_HOST}/upload/{self.name}?upload_id={upload_id}'
+
+    def load(self, name, data, content_type='audio/mpeg'):
+        """Store an object without latency (used by the seeders)."""
+        with self._lock:
+            self._generation += 1
+            self._objects[name] = {'data': data, 'content_type': content_type, 'generation': self._generation}
+        return self._generation
+
+
+class StorageAdapter(BaseAdapter):
+    """requests transport adapter serving FakeBucket objects, with Range support.
+
+    Mounted on the app's upstream session for http://fake-storage.local/ so the
+    audio proxy runs its real HTTP code path against in-memory objects, and
+    the chunked song upload routes talk to resumable upload sessions the way
+    Cloud Storage answers them (308 + Range while incomplete, 200 once the
+    declared size has arrived, 499 on cancel, 404 for an unknown session).
+    """
+
+    def __init__(self, bucket):
+        super().__init__()
+        self.bucket = bucket
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        url = urlsplit(request.url)
+        path = unquote(url.path).lstrip('/')
+        if path.startswith('upload/'):
+            upload_id = parse_qs(url.query).get('upload_id', [''])[0]
+            status, headers = self._upload(request, upload_id)
+            return self._response(request, status, headers, b'')
+
+        self.bucket._rpc('download' if request.method == 'GET' else 'head')
+        _, _, name = path.partition('/')
+        stored = self.bucket._objects.get(name)
+
+        headers = {'Accept-Ranges': 'bytes'}
+        if stored is None:
+            status, body = 404, b''
+        else:
+            data = stored['data']
+            headers['Content-Type'] = stored['content_type']
+            status, body = 200, data
+            range_header = request.headers.get('Range')
+            if range_header and range_header.startswith('bytes='):
+                start, _, end = range_header[6:].partition('-')
+                if start:
+                    first, last = int(start), int(end) if end else len(data) - 1
+                else:
+                    first, last = max(len(data) - int(end), 0), len(data) - 1
+                last = min(last, len(data) - 1)
+                if first >= len(data):
+                    status, body = 416, b''
+                    headers['Content-Range'] = f'bytes */{len(data)}'
+                else:
+                    status, body = 206, data[first:last + 1]
+                    headers['Content-Range'] = f'bytes {first}-{last}/{len(data)}'
+        headers['Content-Length'] = str(len(body))
+        if request.method == 'HEAD':
+            body = b''
+        return self._response(request, status, headers, body)
+
+    def _upload(self, request, upload_id):
+        self.bucket._rpc('upload_chunk' if request.method == 'PUT' else 'cancel_upload')
+        with self.bucket._lock:
+            upload = self.bucket._sessions.get(upload_id)
+            if upload is None:
+                return 404, {}
+            if request.method == 'DELETE':
+                del self.bucket._sessions[upload_id]
+                return 499, {}
+
+            content_range = request.headers.get('Content-Range', '')
+            span, _, total = content_range[len('bytes '):].partition('/')
+            if span != '*':
+                first, _, last = span.partition('-')
+                first, last = int(first), int(last)
+                body = request.body
+                chunk = body.read(last - first + 1) if hasattr(body, 'read') else bytes(body or b'')
+                received = len(upload['data'])
+                # Bytes already persisted are skipped; a gap is not accepted
+                if first <= received < first + len(chunk):
+                    upload['data'] += chunk[received - first:]
+
+            received = len(upload['data'])
+            if total != '*' and received >= int(total):
+                del self.bucket._sessions[upload_id]
+                self._store_upload(upload)
+                return 200, {}
+            return 308, {'Range': f'bytes=0-{received - 1}'} if received else {}
+
+    def _store_upload(self, upload):
+        # Called with the bucket lock held, like a finished upload becoming visible
+        self.bucket._generation += 1
+        self.bucket._objects[upload['name']] = {
+            'data': bytes(upload['data']),
+            'content_type': upload['content_type'] or 'application/octet-stream',
+            'generation': self.bucket._generation
+        }
+
+    def _response(self, request, status, headers, body):
+        headers.setdefault('Content-Length', str(len(body)))
+        raw = HTTPResponse(body=io.BytesIO(body), headers=headers, status=status,
+                           preload_content=False, decode_content=False)
+        response = requests.Response()
+        response.status_code = status
+        response.headers = requests.structures.CaseInsensitiveDict(headers)
+        response.raw = raw
+        response.url = request.url
+        response.request = request
+        response.encoding = None
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,316 @@
+"""Benchmark driver for the API routes.
+
+Runs app.py in-process against the in-memory Firestore/Storage fake, so no
+Firebase project is needed, and reports throughput plus p50/p95/p99 latency
+per scenario. Results are written as JSON for benchmarks/compare.py.
+
+    python -m benchmarks.run --scale 10k --latency-ms 20 --concurrency 8
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Run from the repository root with the app's requirements installed.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from benchmarks.fake_firebase import STORAGE_HOST, FakeBucket, FakeFirestore, StorageAdapter
+from benchmarks.seed import BENCH_PASSWORD, BENCH_SELLER_EMAIL, BENCH_USER_PHONE, ENGLISH, SCALES, seed
+from utils.product_query import PRODUCT_CATEGORIES
+from utils.resumable_upload import CHUNK_ALIGNMENT
+
+SEARCH_TERMS = ENGLISH + ['kha', 'mang', 'tai', 'lung', 'nam']
+
+# Two full chunks and a short last one, so alignment and completion are both exercised
+UPLOAD_BYTES = 2 * CHUNK_ALIGNMENT + 4096
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def git_revision():
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return rev + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def load_app(args, workdir):
+    """Import app.py with its Firebase clients swapped for the fake."""
+    # Must be set before the import, app.py reads its config at module level
+    os.environ.pop('FIREBASE_ADMIN_SDK_PATH', None)
+    os.environ.setdefault('FLASK_SECRET_KEY', 'benchmark')
+    os.environ['AUDIO_CACHE_DIR'] = os.path.join(workdir, 'audio')
+    os.environ['AUDIO_CACHE_MAX_BYTES'] = str(args.audio_cache_bytes)
+    os.environ['INGEST_SPOOL_DIR'] = os.path.join(workdir, 'ingest')
+    os.environ['READ_REPLICA'] = '1' if args.replica else '0'
+    os.environ['READ_REPLICA_PATH'] = os.path.join(workdir, 'replica.sqlite3')
+    os.environ.setdefault('WORD_CACHE_LISTENER', '1')
+
+    db = FakeFirestore(latency=args.latency_ms / 1000.0, per_doc=args.per_doc_us / 1e6)
+    bucket = FakeBucket(latency=args.storage_latency_ms / 1000.0, stats=db.stats)
+    counts = seed(db, bucket, SCALES[args.scale])
+
+    import app as app_module
+    app_module.db = db
+    app_module.bucket = bucket
+    app_module.upstream.session.mount(f'http://{STORAGE_HOST}/', StorageAdapter(bucket))
+    app_module.app.testing = True
+    return app_module, db, counts
+
+
+def build_scenarios(counts):
+    song_count = counts['songs']
+
+    def words(client, rng):
+        return client.get('/api/words')
+
+    def words_search(client, rng):
+        return client.get(f'/api/words?search={rng.choice(SEARCH_TERMS)}')
+
+    def words_page(client, rng):
+        return client.get('/api/words?cursor=&limit=50')
+
+    def products(client, rng):
+        return client.get('/api/products')
+
+    def products_page(client, rng):
+        return client.get('/api/products?cursor=&limit=50&sort_by=price')
+
+    def products_filtered(client, rng):
+        category = rng.choice(PRODUCT_CATEGORIES)
+        return client.get(f'/api/products?category={category}&min_price=500&max_price=2500&sort=price&limit=24')
+
+    def stats(client, rng):
+        return client.get('/api/stats')
+
+    def song_stream(client, rng):
+        return client.get(f'/api/songs/song{rng.randrange(song_count):06d}/stream')
+
+    def song_stream_range(client, rng):
+        return client.get(f'/api/songs/song{rng.randrange(song_count):06d}/stream',
+                          headers={'Range': 'bytes=0-65535'})
+
+    def login(client, rng):
+        return client.post('/login', data={'phone': BENCH_USER_PHONE, 'password': BENCH_PASSWORD})
+
+    def seller_login(client, rng):
+        return client.post('/api/seller/login', json={'email': BENCH_SELLER_EMAIL, 'password': BENCH_PASSWORD})
+
+    upload_payload = bytes(i % 251 for i in range(UPLOAD_BYTES))
+
+    def song_upload(client, rng):
+        # init -> chunks -> finalize against the fake resumable upload sessions
+        with client.session_transaction() as sess:
+            sess['admin_logged_in'] = True
+        response = client.post('/api/songs/uploads', json={
+            'filename': 'bench.mp3', 'size': UPLOAD_BYTES, 'title': f'Bench upload {rng.random()}'})
+        if response.status_code != 201:
+            return response
+        upload_id = response.get_json()['upload_id']
+        offset = 0
+        while offset < UPLOAD_BYTES:
+            chunk = upload_payload[offset:offset + CHUNK_ALIGNMENT]
+            response = client.put(f'/api/songs/uploads/{upload_id}?offset={offset}', data=chunk)
+            if response.status_code != 200:
+                return response
+            offset = response.get_json()['offset']
+        return client.post(f'/api/songs/uploads/{upload_id}/finalize')
+
+    return {
+        'words': words,
+        'words_search': words_search,
+        'words_page': words_page,
+        'products': products,
+        'products_page': products_page,
+        'products_filtered': products_filtered,
+        'stats': stats,
+        'song_stream': song_stream,
+        'song_stream_range': song_stream_range,
+        'login': login,
+        'seller_login': seller_login,
+        'song_upload': song_upload
+    }
+
+
+def failure_reason(response, body):
+    """Why a response counts as failed, or None.
+
+    Many routes report errors as 200 with {'success': False} or {'error': ...},
+    so JSON bodies are checked as well as the status.
+    """
+    if response.status_code >= 400:
+        return str(response.status_code)
+    if response.mimetype != 'application/json':
+        return None
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return 'invalid JSON'
+    if isinstance(data, dict):
+        if data.get('success') is False:
+            return f"{response.status_code} success=false"
+        if 'error' in data:
+            return f"{response.status_code} error"
+    return None
+
+
+def run_scenario(flask_app, db, request_fn, total, concurrency, warmup):
+    timings = []
+    failures = []
+    response_bytes = [0]
+    sizes = []
+    error_sample = []
+    lock = threading.Lock()
+    remaining = [total]
+
+    def call(client, rng):
+        started = time.perf_counter()
+        response = request_fn(client, rng)
+        body = response.get_data()  # drains streamed bodies too
+        elapsed = time.perf_counter() - started
+        # Checked after timing, so parsing the body isn't measured
+        reason = failure_reason(response, body)
+        response.close()
+        return elapsed, reason, body
+
+    # First request on a cold process (cache loads, listener start) is reported separately
+    first_ms, _, _ = call(flask_app.test_client(), random.Random(0))
+    for i in range(warmup):
+        call(flask_app.test_client(), random.Random(i))
+
+    db.stats.reset()
+
+    def worker(worker_id):
+        client = flask_app.test_client()
+        rng = random.Random(worker_id)
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            elapsed, reason, body = call(client, rng)
+            with lock:
+                timings.append(elapsed)
+                response_bytes[0] += len(body)
+                sizes.append(len(body))
+                if reason:
+                    failures.append(reason)
+                    if not error_sample:
+                        error_sample.append(body[:500].decode('utf-8', 'replace'))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    calls = db.stats.snapshot()
+    timings.sort()
+    count = len(timings)
+    ms = [t * 1000 for t in timings]
+    return {
+        'requests': count,
+        'errors': len(failures),
+        'error_statuses': sorted(set(failures)),
+        'error_sample': error_sample[0] if error_sample else None,
+        'throughput_rps': round(count / wall, 2) if wall else 0.0,
+        'first_request_ms': round(first_ms * 1000, 3),
+        'mean_ms': round(sum(ms) / count, 3) if count else 0.0,
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p95_ms': round(percentile(ms, 95), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'max_ms': round(ms[-1], 3) if ms else 0.0,
+        'avg_response_bytes': round(response_bytes[0] / count) if count else 0,
+        'min_response_bytes': min(sizes) if sizes else 0,
+        'max_response_bytes': max(sizes) if sizes else 0,
+        'backend_calls_per_request': round(sum(calls['calls'].values()) / count, 3) if count else 0.0,
+        'documents_read_per_request': round(sum(calls['documents'].values()) / count, 3) if count else 0.0,
+        'backend_calls': {f'{collection}.{op}': n for (collection, op), n in sorted(calls['calls'].items())}
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--scenarios', default='all',
+                        help='comma separated scenario names, or "all"')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='injected Firestore latency per call')
+    parser.add_argument('--per-doc-us', type=float, default=0.0, help='extra Firestore latency per document')
+    parser.add_argument('--storage-latency-ms', type=float, default=0.0, help='injected Storage latency per call')
+    parser.add_argument('--audio-cache-bytes', type=int, default=512 * 1024 * 1024,
+                        help='0 disables the audio disk cache so every stream is proxied')
+    parser.add_argument('--replica', action='store_true', help='serve reads from the SQLite read replica')
+    parser.add_argument('--output', help='result file (default benchmarks/results/<rev>-<scale>.json)')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='tk-bench-')
+    app_module, db, counts = load_app(args, workdir)
+    scenarios = build_scenarios(counts)
+    names = list(scenarios) if args.scenarios == 'all' else [s.strip() for s in args.scenarios.split(',')]
+    unknown = [name for name in names if name not in scenarios]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    revision = git_revision()
+    results = {
+        'meta': {
+            'revision': revision,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scale': args.scale,
+            'documents': counts,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'latency_ms': args.latency_ms,
+            'per_doc_us': args.per_doc_us,
+            'storage_latency_ms': args.storage_latency_ms,
+            'audio_cache_bytes': args.audio_cache_bytes,
+            'replica': args.replica
+        },
+        'scenarios': {}
+    }
+
+    for name in names:
+        print(f"Running {name} ({args.requests} requests, concurrency {args.concurrency})...")
+        result = run_scenario(app_module.app, db, scenarios[name], args.requests, args.concurrency, args.warmup)
+        results['scenarios'][name] = result
+        print(f"  {result['throughput_rps']} req/s  p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  "
+              f"p99 {result['p99_ms']} ms  errors {result['errors']}")
+        print(f"  body bytes avg {result['avg_response_bytes']}  min {result['min_response_bytes']}  "
+              f"max {result['max_response_bytes']}")
+        if result['errors']:
+            print(f"  failures {', '.join(result['error_statuses'])}: {result['error_sample']}")
+
+    output = args.output or os.path.join('benchmarks', 'results', f'{revision}-{args.scale}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Deterministic seed data for the benchmark fake.
+
+`seed(db, bucket, scale)` loads `scale` words and products, scale // 10 songs
+and scale // 100 sellers (at least 10 of each), plus one user and one seller
+with known credentials for the login routes.
+"""
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from werkzeug.security import generate_password_hash
+
+from utils.backfill import BACKFILLS_COLLECTION
+from utils.catalog import CATALOG_COLLECTION, catalog_entry
+from utils.counters import (COUNTERS_COLLECTION, PRODUCTS_COUNTER, SHARDS_COLLECTION, SONGS_COUNTER, WORDS_COUNTER,
+                            combine, product_counts, seller_products_counter)
+from utils.product_query import PRODUCT_CATEGORIES
+from utils.seller_cache import seller_info_from_dict
+
+SCALES = {'1k': 1000, '10k': 10000, '100k': 100000}
+
+BENCH_USER_PHONE = '9000000000'
+BENCH_SELLER_EMAIL = 'bench-seller@example.com'
+BENCH_PASSWORD = 'bench-password'
+
+# Shared by every song object, the fake stores references not copies
+AUDIO_BYTES = 256 * 1024
+
+SYLLABLES = ['kha', 'mang', 'tai', 'lung', 'phi', 'nam', 'soi', 'khun', 'ma', 'ngoen',
+             'hong', 'pai', 'lao', 'mu', 'kham', 'yang', 'sen', 'tong', 'wan', 'chai']
+ENGLISH = ['water', 'house', 'river', 'mountain', 'rice', 'village', 'sun', 'moon', 'tree',
+           'fire', 'child', 'mother', 'road', 'song', 'market', 'friend', 'rain', 'bird']
+# Two values the shop doesn't offer, so facets also see unknown categories
+CATEGORIES = list(PRODUCT_CATEGORIES) + ['handicraft', 'books']
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _word(rng, i):
+    # Index suffix keeps every headword unique at any scale
+    tai = ''.join(rng.choices(SYLLABLES, k=rng.randint(1, 3))) + str(i)
+    english = ' '.join(rng.choices(ENGLISH, k=rng.randint(1, 2)))
+    return {
+        'tai_khamyang': tai,
+        'english': f'{english} {i}',
+        'assamese': f'অসমীয়া {i}',
+        'updated_at': EPOCH + timedelta(seconds=i)
+    }
+
+
+def seed(db, bucket, scale, rng_seed=42):
+    rng = random.Random(rng_seed)
+    counts = {
+        'words': scale,
+        'products': scale,
+        'songs': max(scale // 10, 10),
+        'sellers': max(scale // 100, 10)
+    }
+
+    db.load('words', {f'w{i:07d}': _word(rng, i) for i in range(counts['words'])})
+
+    sellers = {}
+    for i in range(counts['sellers']):
+        sellers[f's{i:06d}'] = {
+            'id': f's{i:06d}',
+            'full_name': f'Seller {i}',
+            'business_name': f'Shop {i}',
+            'email': f'seller{i}@example.com',
+            'password': 'pbkdf2:sha256:1$unused$0',
+            'phone': f'98{i:08d}',
+            'whatsapp': f'98{i:08d}',
+            'created_at': EPOCH,
+            'status': 'active'
+        }
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    sellers['s000000'].update({'email': BENCH_SELLER_EMAIL, 'password': password_hash})
+    db.load('sellers', sellers)
+
+    seller_ids = list(sellers)
+    products = {}
+    for i in range(counts['products']):
+        price = round(rng.uniform(50, 5000), 2)
+        products[f'p{i:07d}'] = {
+            'id': f'p{i:07d}',
+            'seller_id': rng.choice(seller_ids),
+            'name': f'{rng.choice(ENGLISH).title()} {rng.choice(CATEGORIES)} {i}',
+            'description': 'Benchmark product',
+            'category': rng.choice(CATEGORIES),
+            'price': price,
+            'original_price': price,
+            'sizes': ['S', 'M', 'L'],
+            'images': [f'https://example.com/images/{i}.jpg'],
+            'image_variants': [],
+            'stock_quantity': rng.randint(0, 50),
+            'status': 'active' if rng.random() < 0.9 else 'inactive',
+            'created_at': EPOCH + timedelta(minutes=i),
+            'updated_at': EPOCH + timedelta(minutes=i)
+        }
+    db.load('products', products)
+    db.load(CATALOG_COLLECTION, {
+        product_id: catalog_entry(product_id, product, seller_info_from_dict(sellers[product['seller_id']]))
+        for product_id, product in products.items()
+    })
+    db.load(BACKFILLS_COLLECTION, {CATALOG_COLLECTION: {'completed_at': EPOCH}})
+
+    audio = bytes(rng.getrandbits(8) for _ in range(AUDIO_BYTES))
+    songs = {}
+    for i in range(counts['songs']):
+        file_path = f'songs/bench-{i}.mp3'
+        generation = bucket.load(file_path, audio)
+        songs[f'song{i:06d}'] = {
+            'title': f'{rng.choice(ENGLISH).title()} Song {i}',
+            'description': f'{rng.choice(ENGLISH)} {rng.choice(ENGLISH)}',
+            'file_path': file_path,
+            'file_url': bucket.blob(file_path).public_url,
+            'signed_url': None,
+            'generation': generation,
+            'content_type': 'audio/mpeg'
+        }
+    db.load('songs', songs)
+
+    # Counters as `flask rebuild-counters` would leave them
+    for name, values in ((WORDS_COUNTER, {'total': counts['words']}),
+                         (SONGS_COUNTER, {'total': counts['songs']}),
+                         (PRODUCTS_COUNTER, combine(*map(product_counts, products.values())))):
+        db.load(f'{COUNTERS_COLLECTION}/{name}/{SHARDS_COLLECTION}', {'0': values})
+    seller_totals = Counter(product['seller_id'] for product in products.values())
+    for seller_id in seller_ids:
+        db.load(f'{COUNTERS_COLLECTION}/{seller_products_counter(seller_id)}/{SHARDS_COLLECTION}',
+                {'0': {'total': seller_totals[seller_id]}})
+    db.load(BACKFILLS_COLLECTION, {COUNTERS_COLLECTION: {'completed_at': EPOCH}})
+
+    db.load('users', {'bench-user': {
+        'name': 'Bench User',
+        'phone': BENCH_USER_PHONE,
+        'address': 'Benchmark',
+        'password': password_hash,
+        'registered_at': EPOCH
+    }})
+    return counts
@@ -0,0 +1,41 @@
+# gunicorn -c gunicorn.conf.py
+#
+# The app is imported once in the master (--preload) and forked into the
+# workers. Firebase clients are created lazily in each worker, the one-off
+# Firestore bootstrap runs once per deployment in a separate process, and
+# each worker starts ingest recovery and warms its caches before it accepts
+# connections (for up to WARM_UP_DEADLINE seconds).
+import os
+import subprocess
+import sys
+import threading
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+preload_app = True
+wsgi_app = 'app:create_app(start=False)'
+
+# How long a worker waits for its warm-up before taking traffic anyway
+WARM_UP_DEADLINE = int(os.getenv('WARM_UP_DEADLINE', str(timeout // 2)))
+
+
+def on_starting(server):
+    if os.getenv('BOOTSTRAP_ON_START', '1') != '1':
+        return
+    # A separate process, so the master never opens a gRPC channel before forking
+    result = subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-firestore'])
+    if result.returncode != 0:
+        server.log.warning(f"Firestore bootstrap exited with {result.returncode}")
+
+
+def post_fork(server, worker):
+    import app
+    # In a thread, so a slow Firestore can't keep the worker booting past
+    # gunicorn's timeout (which would kill and restart it in a loop)
+    thread = threading.Thread(target=app.start_worker, name='warm-up', daemon=True)
+    thread.start()
+    thread.join(WARM_UP_DEADLINE)
+    if thread.is_alive():
+        server.log.warning(f"Worker {worker.pid} warm-up exceeded {WARM_UP_DEADLINE}s, serving while it finishes")
@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from utils.audio_cache import AudioDiskCache
+
+
+class CountingUpstream:
+    """Streaming response factory that counts how often it is opened."""
+
+    def __init__(self, data, delay=0.05, status_code=200):
+        self.data = data
+        self.delay = delay
+        self.status_code = status_code
+        self.opened = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.opened += 1
+        return _Response(self)
+
+
+class _Response:
+    def __init__(self, upstream):
+        self.upstream = upstream
+        self.status_code = upstream.status_code
+        self.headers = {'Content-Length': str(len(upstream.data))}
+
+    def iter_content(self, chunk_size):
+        data = self.upstream.data
+        for start in range(0, len(data), chunk_size):
+            # Slow enough that concurrent callers overlap with the download
+            time.sleep(self.upstream.delay)
+            yield data[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class AudioDiskCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = AudioDiskCache(self.directory, max_bytes=10 * 1024 * 1024, chunk_size=1024)
+        self.data = os.urandom(8 * 1024)
+
+    def test_concurrent_misses_share_one_download(self):
+        upstream = CountingUpstream(self.data)
+        paths = []
+
+        def fetch():
+            paths.append(self.cache.fetch('song1', 7, upstream))
+
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(upstream.opened, 1)
+        self.assertEqual(len(set(paths)), 1)
+        with open(paths[0], 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_hit_does_not_open_upstream(self):
+        upstream = CountingUpstream(self.data, delay=0)
+        self.cache.fetch('song1', 7, upstream)
+        self.assertIsNotNone(self.cache.get('song1', 7))
+        self.cache.fetch('song1', 7, upstream)
+        self.assertEqual(upstream.opened, 1)
+
+    def test_failed_download_is_not_cached(self):
+        upstream = CountingUpstream(self.data, delay=0, status_code=404)
+        self.assertIsNone(self.cache.fetch('song1', 7, upstream))
+        self.assertIsNone(self.cache.get('song1', 7))
+        self.assertEqual([name for name in os.listdir(self.directory) if name != 'locks'], [])
+
+    def test_prefetch_fills_in_background(self):
+        upstream = CountingUpstream(self.data, delay=0.01)
+        for _ in range(5):
+            self.cache.prefetch('song1', 7, upstream)
+        deadline = time.time() + 5
+        while self.cache.get('song1', 7) is None and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertIsNotNone(self.cache.get('song1', 7))
+        self.assertEqual(upstream.opened, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
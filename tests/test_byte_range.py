@@ -0,0 +1,65 @@
+import unittest
+
+from utils.asgi import resolve_range
+from utils.audio_proxy import format_byte_range, parse_byte_range
+
+
+class ParseByteRangeTest(unittest.TestCase):
+    def test_closed_range(self):
+        self.assertEqual(parse_byte_range('bytes=0-499'), (0, 499))
+        self.assertEqual(parse_byte_range('bytes=500-500'), (500, 500))
+
+    def test_open_ended_range(self):
+        self.assertEqual(parse_byte_range('bytes=500-'), (500, None))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_byte_range('bytes=-500'), (None, 500))
+        self.assertEqual(parse_byte_range('bytes=-0'), (None, 0))
+
+    def test_whitespace_and_case(self):
+        self.assertEqual(parse_byte_range(' Bytes = 10 - 20 '), (10, 20))
+
+    def test_multi_range_is_ignored(self):
+        self.assertIsNone(parse_byte_range('bytes=0-99,200-299'))
+        self.assertIsNone(parse_byte_range('bytes=0-99, -50'))
+
+    def test_malformed(self):
+        for header in (None, '', 'bytes=', 'bytes=-', 'bytes=a-b', 'bytes=1-2-3', 'items=0-10',
+                       'bytes 0-10', 'bytes=-10-', 'bytes=500-499'):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_byte_range(header))
+
+
+class FormatByteRangeTest(unittest.TestCase):
+    def test_round_trips(self):
+        for header in ('bytes=0-499', 'bytes=500-', 'bytes=-500'):
+            with self.subTest(header=header):
+                self.assertEqual(format_byte_range(parse_byte_range(header)), header)
+
+
+class ResolveRangeTest(unittest.TestCase):
+    def test_closed_range(self):
+        self.assertEqual(resolve_range((0, 499), 1000), (0, 499))
+
+    def test_end_is_clamped_to_the_file(self):
+        self.assertEqual(resolve_range((900, 5000), 1000), (900, 999))
+        self.assertEqual(resolve_range((900, None), 1000), (900, 999))
+
+    def test_suffix_range(self):
+        self.assertEqual(resolve_range((None, 100), 1000), (900, 999))
+        # A suffix longer than the file is the whole file
+        self.assertEqual(resolve_range((None, 5000), 1000), (0, 999))
+
+    def test_unsatisfiable(self):
+        self.assertIsNone(resolve_range((1000, None), 1000))
+        self.assertIsNone(resolve_range((1000, 1200), 1000))
+        self.assertIsNone(resolve_range((None, 0), 1000))
+
+    def test_zero_length_file(self):
+        for byte_range in ((0, None), (0, 0), (None, 10), (None, 0)):
+            with self.subTest(byte_range=byte_range):
+                self.assertIsNone(resolve_range(byte_range, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
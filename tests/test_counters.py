@@ -0,0 +1,134 @@
+import random
+import unittest
+
+from benchmarks.fake_firebase import FakeFirestore
+from utils.backfill import BackfillMarker
+from utils.counters import (COUNTERS_COLLECTION, PRODUCTS_COUNTER, SHARDS_COLLECTION, CounterCache, combine,
+                            increment, product_counts, read_counter, read_counter_values, reset_counter,
+                            seller_products_counter)
+
+
+def product(category='men', status='active', seller_id='s1'):
+    return {'category': category, 'status': status, 'seller_id': seller_id}
+
+
+def count_documents(query):
+    return query.count(alias='count').get()[0][0].value
+
+
+class CombineTest(unittest.TestCase):
+    def test_sums_nested_maps(self):
+        self.assertEqual(
+            combine({'total': 1, 'by_category': {'men': 1}}, {'total': 2, 'by_category': {'men': 1, 'women': 3}}),
+            {'total': 3, 'by_category': {'men': 2, 'women': 3}})
+
+    def test_change_from_old_to_new(self):
+        old = product_counts(product('men'))
+        new = product_counts(product('women'))
+        self.assertEqual(combine(new, combine(old, sign=-1)),
+                         {'total': 0, 'active': 0, 'by_category': {'women': 1, 'men': -1}})
+
+    def test_product_counts(self):
+        self.assertEqual(product_counts(product('men')), {'total': 1, 'active': 1, 'by_category': {'men': 1}})
+        # Only active products are listed by the shop, so only they count per category
+        self.assertEqual(product_counts(product('men', status='inactive')), {'total': 1, 'active': 0})
+        self.assertEqual(product_counts(product(None)), {'total': 1, 'active': 1})
+
+
+class ShardedCounterTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(3)
+        self.db = FakeFirestore()
+
+    def apply(self, name, deltas, shards=4):
+        batch = self.db.batch()
+        queued = increment(batch, self.db, name, deltas, shards=shards)
+        batch.commit()
+        return queued
+
+    def shard_ids(self, name):
+        return {doc.id for doc in self.db.collection(COUNTERS_COLLECTION).document(name)
+                .collection(SHARDS_COLLECTION).stream()}
+
+    def test_increments_are_summed_over_shards(self):
+        for _ in range(40):
+            self.apply(PRODUCTS_COUNTER, product_counts(product('men')))
+        for _ in range(5):
+            self.apply(PRODUCTS_COUNTER, product_counts(product('women', status='inactive')))
+        self.assertEqual(read_counter(self.db, PRODUCTS_COUNTER),
+                         {'total': 45, 'active': 40, 'by_category': {'men': 40}})
+        self.assertTrue(1 < len(self.shard_ids(PRODUCTS_COUNTER)) <= 4)
+
+    def test_unchanged_counts_write_nothing(self):
+        counts = product_counts(product('men'))
+        self.assertFalse(self.apply(PRODUCTS_COUNTER, combine(counts, combine(counts, sign=-1))))
+        self.assertEqual(self.shard_ids(PRODUCTS_COUNTER), set())
+
+    def test_emptied_category_is_left_out(self):
+        self.apply(PRODUCTS_COUNTER, product_counts(product('men')))
+        self.apply(PRODUCTS_COUNTER, combine(product_counts(product('men')), sign=-1))
+        self.assertEqual(read_counter(self.db, PRODUCTS_COUNTER), {'total': 0, 'active': 0, 'by_category': {}})
+
+    def test_reset_replaces_all_shards(self):
+        for _ in range(10):
+            self.apply(PRODUCTS_COUNTER, {'total': 1})
+        reset_counter(self.db, PRODUCTS_COUNTER, {'total': 3})
+        self.assertEqual(self.shard_ids(PRODUCTS_COUNTER), {'0'})
+        self.assertEqual(read_counter(self.db, PRODUCTS_COUNTER), {'total': 3})
+
+    def test_per_seller_counters_are_separate(self):
+        self.assertNotEqual(seller_products_counter('s1'), seller_products_counter('s2'))
+        for seller_id, count in (('s1', 3), ('s2', 1)):
+            for _ in range(count):
+                self.apply(seller_products_counter(seller_id), {'total': 1})
+        self.apply(seller_products_counter('s1'), {'total': -1})
+        self.assertEqual(read_counter(self.db, seller_products_counter('s1')), {'total': 2})
+        self.assertEqual(read_counter(self.db, seller_products_counter('s2')), {'total': 1})
+
+
+class CounterValuesTest(unittest.TestCase):
+    def setUp(self):
+        self.db = FakeFirestore()
+        # Written before the counters existed, so the counters know nothing of them
+        self.db.load('products', {
+            'p1': product('men', seller_id='s1'),
+            'p2': product('women', seller_id='s1'),
+            'p3': product('men', seller_id='s2'),
+        })
+        self.products_ref = self.db.collection('products')
+        self.cache = CounterCache(ttl=60)
+        self.backfill = BackfillMarker(COUNTERS_COLLECTION, recheck=0)
+
+    def values(self, name, recount):
+        return read_counter_values(self.cache, self.db, name, self.backfill, recount)
+
+    def seller_products(self, seller_id):
+        return self.values(seller_products_counter(seller_id), lambda: {
+            'total': count_documents(self.products_ref.where('seller_id', '==', seller_id))
+        })
+
+    def test_count_aggregations_until_backfilled(self):
+        recount = lambda: {'total': count_documents(self.products_ref)}
+        self.assertEqual(self.values(PRODUCTS_COUNTER, recount), {'total': 3})
+
+    def test_per_seller_counts_before_backfill(self):
+        self.assertEqual(self.seller_products('s1'), {'total': 2})
+        self.assertEqual(self.seller_products('s2'), {'total': 1})
+        self.assertEqual(self.seller_products('s3'), {'total': 0})
+
+    def test_counters_once_backfilled(self):
+        reset_counter(self.db, seller_products_counter('s1'), {'total': 7})
+        self.backfill.mark(self.db)
+        self.assertEqual(self.seller_products('s1'), {'total': 7})
+
+    def test_values_are_cached(self):
+        calls = []
+        recount = lambda: calls.append(1) or {'total': 1}
+        self.values(PRODUCTS_COUNTER, recount)
+        self.values(PRODUCTS_COUNTER, recount)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
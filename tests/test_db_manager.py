@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.fake_firebase import FakeFirestore
+from utils.db_manager import FirestoreBackend, Repositories, SQLiteReplica
+from utils.pagination import decode_cursor
+
+
+def walk(backend, limit, **kwargs):
+    """All pages of backend.query(), following next_cursor to the end."""
+    ids = []
+    cursor = None
+    while True:
+        docs, next_cursor = backend.query('products', limit=limit, cursor=cursor, **kwargs)
+        ids.extend(doc['id'] for doc in docs)
+        if next_cursor is None:
+            return ids
+        cursor = decode_cursor(next_cursor)
+
+
+class BackendTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db = FakeFirestore()
+        self.products = {
+            f'p{i:03d}': {'price': float(i % 9), 'status': 'active' if i % 4 else 'inactive',
+                          'seller_id': 's1' if i % 7 == 0 else 's2'}
+            for i in range(120)
+        }
+        self.db.load('products', self.products)
+
+        self.replica = SQLiteReplica(os.path.join(self.directory, 'replica.sqlite3'))
+        self.replica._writer = self.replica._connect()
+        self.replica._apply('products', [(doc, False) for doc in self.db.collection('products').stream()],
+                            replace=True)
+        self.firestore = FirestoreBackend(self.db)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_backends_return_the_same_pages(self):
+        kwargs = {
+            'where': {'status': 'active'},
+            'ranges': {'price': (2.0, 6.0)},
+            'order_field': 'price',
+            'descending': True,
+            'predicate': lambda doc: doc['seller_id'] == 's2'
+        }
+        expected = sorted(
+            (i for i, p in self.products.items()
+             if p['status'] == 'active' and 2 <= p['price'] <= 6 and p['seller_id'] == 's2'),
+            key=lambda i: (self.products[i]['price'], i), reverse=True)
+        self.assertEqual(walk(self.replica, 7, **kwargs), expected)
+        self.assertEqual(walk(self.firestore, 7, **kwargs), expected)
+
+    def test_range_off_the_order_field_is_checked_in_python(self):
+        kwargs = {'ranges': {'price': (None, 3.0)}, 'order_field': 'seller_id'}
+        expected = sorted((i for i, p in self.products.items() if p['price'] <= 3),
+                          key=lambda i: (self.products[i]['seller_id'], i))
+        self.assertEqual(walk(self.firestore, 10, **kwargs), expected)
+        self.assertEqual(walk(self.replica, 10, **kwargs), expected)
+
+    def test_selective_predicate_reads_in_batches(self):
+        statements = []
+        self.replica._reader().set_trace_callback(statements.append)
+        docs, _ = self.replica.query('products', limit=3, predicate=lambda doc: doc['seller_id'] == 's1')
+        self.assertEqual([doc['id'] for doc in docs], ['p000', 'p007', 'p014'])
+        self.assertEqual(len([sql for sql in statements if sql.startswith('SELECT id, doc')]), 1)
+
+    def test_scan_matches_unpaged_query(self):
+        where = {'seller_id': 's1'}
+        self.assertEqual([doc['id'] for doc in self.replica.scan('products', where=where)],
+                         [doc['id'] for doc in self.firestore.scan('products', where=where)])
+
+
+class RepositoryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db = FakeFirestore()
+        self.db.load('songs', {'a': {'title': 'A'}, 'b': {'title': 'B'}})
+        self.replica = SQLiteReplica(os.path.join(self.directory, 'replica.sqlite3'))
+        self.repositories = Repositories(self.db, self.replica)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_reads_firestore_until_the_replica_is_synced(self):
+        self.replica.start = lambda db: None
+        self.assertIsNone(self.repositories.songs.local())
+        self.assertEqual(self.repositories.songs.get('a')['title'], 'A')
+        self.assertEqual(sorted(self.repositories.songs.get_many(['a', 'b', 'x'])), ['a', 'b'])
+
+    def test_document_missing_from_the_replica_is_read_from_firestore(self):
+        self.replica.start = lambda db: None
+        self.replica.ready = lambda collection: True
+        self.assertIs(self.repositories.songs.local(), self.replica)
+        self.assertEqual(self.repositories.songs.get('b')['title'], 'B')
+
+    def test_unreplicated_collections_use_firestore(self):
+        self.assertIsNone(self.repositories.users.replica)
+        self.assertIsNone(self.repositories.words.local())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import gzip
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import msgpack
+
+from utils.dictionary_pack import (CLOCK_SKEW, PACK_FIELDS, FullPackCache, build_delta, delta_margin,
+                                   encode_pack, from_version, pack_version, to_version)
+
+T0 = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def word(word_id, minutes):
+    return {'id': word_id, 'tai_khamyang': word_id, 'english': word_id.upper(), 'assamese': '',
+            'updated_at': T0 + timedelta(minutes=minutes)}
+
+
+def deletion(word_id, minutes):
+    return {'word_id': word_id, 'deleted_at': T0 + timedelta(minutes=minutes)}
+
+
+class VersionTest(unittest.TestCase):
+    def test_round_trips_to_the_microsecond(self):
+        value = T0 + timedelta(microseconds=123)
+        self.assertEqual(from_version(to_version(value)), value)
+
+    def test_naive_timestamps_are_utc(self):
+        self.assertEqual(to_version(T0.replace(tzinfo=None)), to_version(T0))
+
+    def test_offsets_are_normalized(self):
+        ist = timezone(timedelta(hours=5, minutes=30))
+        self.assertEqual(to_version(T0.astimezone(ist)), to_version(T0))
+
+    def test_missing_timestamp_is_zero(self):
+        self.assertEqual(to_version(None), 0)
+        self.assertEqual(pack_version([{'id': 'a'}]), 0)
+
+    def test_pack_version_includes_tombstones(self):
+        words = [word('a', 1), word('b', 3)]
+        self.assertEqual(pack_version(words), to_version(T0 + timedelta(minutes=3)))
+        self.assertEqual(pack_version(words, [T0 + timedelta(minutes=7)]), to_version(T0 + timedelta(minutes=7)))
+
+
+class DeltaTest(unittest.TestCase):
+    def test_margin_covers_cache_staleness(self):
+        for staleness in (0, 300, 3600):
+            with self.subTest(staleness=staleness):
+                margin = delta_margin(staleness)
+                self.assertGreaterEqual(margin, timedelta(seconds=staleness))
+                self.assertGreaterEqual(margin, CLOCK_SKEW)
+
+    def test_sends_words_changed_after_the_cutoff(self):
+        words = [word('old', -10), word('edge', 0), word('new', 2)]
+        since = to_version(T0 + timedelta(minutes=5))
+        changed, deleted, version = build_delta(words, [], since, T0)
+        self.assertEqual([w['id'] for w in changed], ['new'])
+        self.assertEqual(deleted, [])
+        # Nothing newer than `since`, so the client stays where it is
+        self.assertEqual(version, since)
+
+    def test_word_missed_by_a_stale_cache_is_resent(self):
+        # A worker wrote 'late' at minute 1, but this worker's cache only saw
+        # it after handing out version 4; the next delta must still carry it
+        margin = delta_margin(300)
+        since_time = T0 + timedelta(minutes=4)
+        changed, _, _ = build_delta([word('late', 1), word('seen', 4)], [], to_version(since_time),
+                                    since_time - margin)
+        self.assertIn('late', [w['id'] for w in changed])
+
+    def test_tombstones_are_sent_and_advance_the_version(self):
+        since = to_version(T0)
+        changed, deleted, version = build_delta([word('a', 1)], [deletion('b', 6)], since, T0)
+        self.assertEqual([w['id'] for w in changed], ['a'])
+        self.assertEqual(deleted, ['b'])
+        self.assertEqual(version, to_version(T0 + timedelta(minutes=6)))
+
+    def test_version_never_goes_back(self):
+        since = to_version(T0 + timedelta(minutes=10))
+        _, _, version = build_delta([word('a', 8)], [deletion('b', 9)], since, T0)
+        self.assertEqual(version, since)
+
+
+class EncodePackTest(unittest.TestCase):
+    def test_rows_follow_pack_fields(self):
+        body = encode_pack([word('a', 1)], ['gone'], 42, since=7)
+        payload = msgpack.unpackb(gzip.decompress(body), raw=False)
+        self.assertEqual(payload['fields'], list(PACK_FIELDS))
+        self.assertEqual(payload['words'], [['a', 'a', 'A', '', '']])
+        self.assertEqual(payload['deleted'], ['gone'])
+        self.assertEqual((payload['version'], payload['since']), (42, 7))
+
+    def test_full_pack_is_rebuilt_per_generation(self):
+        cache = FullPackCache()
+        body, version = cache.get(1, [word('a', 1)])
+        self.assertIs(cache.get(1, [word('a', 1), word('b', 2)])[0], body)
+        _, newer = cache.get(2, [word('a', 1), word('b', 2)])
+        self.assertGreater(newer, version)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import random
+import unittest
+
+from benchmarks.fake_firebase import FakeFirestore
+from utils.pagination import InvalidCursor, decode_cursor, encode_cursor, paginate_query
+
+
+def walk(collection_ref, query, limit, **kwargs):
+    """All pages of paginate_query, following next_cursor to the end."""
+    ids = []
+    cursor = None
+    while True:
+        docs, next_cursor = paginate_query(collection_ref, query, limit, cursor, **kwargs)
+        ids.extend(doc.id for doc in docs)
+        if next_cursor is None:
+            return ids
+        cursor = decode_cursor(next_cursor)
+
+
+class PaginateQueryTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.db = FakeFirestore()
+        # Few distinct prices, so pages often split a run of equal sort values
+        self.products = {
+            f'p{i:03d}': {'price': float(rng.randint(1, 5)), 'status': 'active' if i % 4 else 'inactive'}
+            for i in range(57)
+        }
+        self.db.load('products', self.products)
+        self.ref = self.db.collection('products')
+
+    def test_orders_by_document_id(self):
+        self.assertEqual(walk(self.ref, self.ref, 10), sorted(self.products))
+
+    def test_orders_by_field_then_id(self):
+        expected = sorted(self.products, key=lambda i: (self.products[i]['price'], i))
+        self.assertEqual(walk(self.ref, self.ref, 8, order_field='price'), expected)
+
+    def test_descending(self):
+        expected = sorted(self.products, key=lambda i: (self.products[i]['price'], i), reverse=True)
+        self.assertEqual(walk(self.ref, self.ref, 8, order_field='price', descending=True), expected)
+
+    def test_filters_and_predicate(self):
+        active = self.ref.where('status', '==', 'active')
+        expected = sorted(i for i, p in self.products.items() if p['status'] == 'active' and p['price'] > 2)
+        ids = walk(self.ref, active, 5, predicate=lambda doc: doc.get('price') > 2)
+        self.assertEqual(ids, expected)
+
+    def test_selective_predicate_reads_in_batches(self):
+        # One match in 57 documents: scanning must not fall back to one read per document
+        self.db.stats.reset()
+        docs, _ = paginate_query(self.ref, self.ref, 5, predicate=lambda doc: doc.id == 'p050')
+        self.assertEqual([doc.id for doc in docs], ['p050'])
+        self.assertLessEqual(self.db.stats.snapshot()['calls'][('products', 'stream')], 2)
+
+    def test_last_page_has_no_cursor(self):
+        docs, next_cursor = paginate_query(self.ref, self.ref, len(self.products))
+        self.assertEqual(len(docs), len(self.products))
+        self.assertIsNone(next_cursor)
+
+
+class CursorTest(unittest.TestCase):
+    def test_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor({'id': 'p1', 'v': 3.5})), {'id': 'p1', 'v': 3.5})
+
+    def test_rejects_garbage(self):
+        with self.assertRaises(InvalidCursor):
+            decode_cursor('not-a-cursor!')
+
+    def test_rejects_cursor_without_required_keys(self):
+        with self.assertRaises(InvalidCursor):
+            decode_cursor(encode_cursor({'v': 3.5}), required=('id',))
+        with self.assertRaises(InvalidCursor):
+            decode_cursor(encode_cursor({'id': 7}))
+
+
+if __name__ == '__main__':
+    unittest.main()
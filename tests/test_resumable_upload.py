@@ -0,0 +1,52 @@
+import io
+import unittest
+
+import requests
+
+from benchmarks.fake_firebase import STORAGE_HOST, FakeBucket, StorageAdapter
+from utils.resumable_upload import CHUNK_ALIGNMENT, UploadError, cancel_session, put_chunk, query_offset
+
+
+class ResumableUploadTest(unittest.TestCase):
+    def setUp(self):
+        self.bucket = FakeBucket()
+        self.http = requests.Session()
+        self.http.mount(f'http://{STORAGE_HOST}/', StorageAdapter(self.bucket))
+        self.data = bytes(i % 251 for i in range(2 * CHUNK_ALIGNMENT + 1000))
+        self.session_url = self.bucket.blob('songs/a.mp3').create_resumable_upload_session(
+            content_type='audio/mpeg', size=len(self.data))
+
+    def put(self, offset, length):
+        stream = io.BytesIO(self.data[offset:offset + length])
+        return put_chunk(self.http, self.session_url, stream, offset, length, len(self.data))
+
+    def test_chunks_complete_the_object(self):
+        self.assertEqual(self.put(0, CHUNK_ALIGNMENT), (CHUNK_ALIGNMENT, False))
+        self.assertEqual(self.put(CHUNK_ALIGNMENT, CHUNK_ALIGNMENT), (2 * CHUNK_ALIGNMENT, False))
+        self.assertEqual(self.put(2 * CHUNK_ALIGNMENT, 1000), (len(self.data), True))
+        self.assertEqual(self.bucket._objects['songs/a.mp3']['data'], self.data)
+
+    def test_query_offset_resumes_after_last_chunk(self):
+        self.assertEqual(query_offset(self.http, self.session_url, len(self.data)), (0, False))
+        self.put(0, CHUNK_ALIGNMENT)
+        self.assertEqual(query_offset(self.http, self.session_url, len(self.data)), (CHUNK_ALIGNMENT, False))
+
+    def test_resent_chunk_is_not_duplicated(self):
+        self.put(0, CHUNK_ALIGNMENT)
+        self.assertEqual(self.put(0, CHUNK_ALIGNMENT), (CHUNK_ALIGNMENT, False))
+
+    def test_rejects_unaligned_chunk(self):
+        with self.assertRaises(UploadError):
+            self.put(0, CHUNK_ALIGNMENT - 1)
+
+    def test_cancelled_session_expires(self):
+        self.put(0, CHUNK_ALIGNMENT)
+        self.assertTrue(cancel_session(self.http, self.session_url))
+        with self.assertRaises(UploadError) as raised:
+            query_offset(self.http, self.session_url, len(self.data))
+        self.assertEqual(raised.exception.status, 410)
+        self.assertNotIn('songs/a.mp3', self.bucket._objects)
+
+
+if __name__ == '__main__':
+    unittest.main()
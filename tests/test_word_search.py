@@ -0,0 +1,122 @@
+import unicodedata
+import unittest
+
+from utils.word_cache import WordCache
+from utils.word_search import RANK_EXACT, RANK_PREFIX, RANK_SUBSTRING, WordSearchIndex, normalize
+
+# Tai Khamyang is written in the Myanmar block; ဦ (U+1026) is canonically
+# U+1025 U+102E. Assamese uses the Bengali block; ো (U+09CB) is U+09C7 U+09BE.
+TAI_UU = 'ဦ'
+ASSAMESE_KO = 'কো'
+
+
+def nfd(text):
+    return unicodedata.normalize('NFD', text)
+
+
+class FakeDoc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeCollection:
+    def __init__(self, words):
+        self.words = words
+
+    def stream(self):
+        return [FakeDoc(doc_id, data) for doc_id, data in self.words.items()]
+
+
+def word(tai_khamyang='', english='', assamese=''):
+    return {'tai_khamyang': tai_khamyang, 'english': english, 'assamese': assamese}
+
+
+class NormalizeTest(unittest.TestCase):
+    def test_composes_decomposed_marks(self):
+        self.assertEqual(normalize(nfd(TAI_UU)), TAI_UU)
+        self.assertEqual(normalize(nfd(ASSAMESE_KO)), ASSAMESE_KO)
+
+    def test_casefolds_and_strips(self):
+        self.assertEqual(normalize('  Straße '), 'strasse')
+        self.assertEqual(normalize(None), '')
+
+
+class WordSearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = WordSearchIndex()
+        self.index.build([
+            dict(word(TAI_UU + 'က', 'Water', nfd(ASSAMESE_KO)), id='w1'),
+            dict(word('က', 'Waterfall', 'পানী'), id='w2'),
+            dict(word('ခ', 'Rainwater', ''), id='w3'),
+        ])
+
+    def search(self, query):
+        return sorted(self.index.search(query))
+
+    def test_ranks_exact_prefix_and_substring(self):
+        self.assertEqual(self.search('water'), [(RANK_EXACT, 'w1'), (RANK_PREFIX, 'w2'), (RANK_SUBSTRING, 'w3')])
+
+    def test_best_rank_over_all_fields(self):
+        # 'w1' has it in Tai Khamyang too, but only after ဦ
+        self.assertEqual(self.search('က'), [(RANK_EXACT, 'w2'), (RANK_SUBSTRING, 'w1')])
+
+    def test_query_and_stored_text_match_in_any_normal_form(self):
+        self.assertEqual(self.search(ASSAMESE_KO), [(RANK_EXACT, 'w1')])
+        self.assertEqual(self.search(nfd(TAI_UU)), [(RANK_PREFIX, 'w1')])
+
+    def test_case_insensitive(self):
+        self.assertEqual(self.search('WATERFALL'), [(RANK_EXACT, 'w2')])
+
+    def test_one_and_two_character_queries(self):
+        self.assertEqual(self.search('f'), [(RANK_SUBSTRING, 'w2')])
+        self.assertEqual(self.search('ra'), [(RANK_PREFIX, 'w3')])
+        self.assertEqual(self.search(TAI_UU), [(RANK_PREFIX, 'w1')])
+        # ো in 'w1' is composed, so its া part alone only matches 'w2'
+        self.assertEqual(self.search('া'), [(RANK_SUBSTRING, 'w2')])
+
+    def test_no_match_and_empty_query(self):
+        self.assertEqual(self.search('xyz'), [])
+        self.assertEqual(self.search('   '), [])
+
+    def test_upsert_and_remove(self):
+        self.index.upsert('w3', dict(word('ခ', 'River', '')))
+        self.assertEqual(self.search('rain'), [])
+        self.assertEqual(self.search('riv'), [(RANK_PREFIX, 'w3')])
+        self.index.remove('w1')
+        self.assertEqual(self.search('water'), [(RANK_PREFIX, 'w2')])
+
+    def test_copy_is_independent(self):
+        copy = self.index.copy()
+        copy.remove('w1')
+        self.assertEqual(sorted(copy.search('water')), [(RANK_PREFIX, 'w2'), (RANK_SUBSTRING, 'w3')])
+        self.assertIn((RANK_EXACT, 'w1'), self.search('water'))
+
+
+class WordCacheSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.collection = FakeCollection({
+            'a': word('ဂ', 'Bat', ''),
+            'b': word('ဃ', 'Bath', ''),
+            'c': word('င', 'Acrobat', ''),
+            'd': word('စ', 'Bat', ''),
+            'e': word('ဆ', 'Batch', ''),
+        })
+        self.cache = WordCache(use_listener=False)
+
+    def test_orders_by_rank_then_sort_field(self):
+        total, words = self.cache.search(self.collection, 'bat', 'tai_khamyang')
+        self.assertEqual(total, 5)
+        self.assertEqual([w['id'] for w in words], ['a', 'd', 'b', 'e', 'c'])
+
+    def test_pages_keep_the_ranking(self):
+        _, first = self.cache.search(self.collection, 'bat', 'english', limit=2)
+        _, rest = self.cache.search(self.collection, 'bat', 'english', limit=10, offset=2)
+        self.assertEqual([w['id'] for w in first + rest], ['a', 'd', 'e', 'b', 'c'])
+
+
+if __name__ == '__main__':
+    unittest.main()
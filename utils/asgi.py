@@ -0,0 +1,205 @@
+import os
+import sys
+import tempfile
+
+import anyio
+
+from utils.audio_proxy import parse_byte_range
+
+FILE_CHUNK = 256 * 1024
+
+# Request bodies passed to WSGI views are kept in memory up to this size
+SPOOL_BYTES = 1024 * 1024
+
+
+def request_headers(scope):
+    """Lower-cased header dict of an ASGI scope (repeated headers joined with ',')."""
+    headers = {}
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').lower()
+        value = value.decode('latin-1')
+        headers[name] = f'{headers[name]},{value}' if name in headers else value
+    return headers
+
+
+def encode_headers(headers):
+    return [(name.lower().encode('latin-1'), str(value).encode('latin-1')) for name, value in headers.items()]
+
+
+async def send_response(send, status, body=b'', headers=None, content_type='text/plain; charset=utf-8'):
+    headers = dict(headers or {})
+    headers.setdefault('Content-Type', content_type)
+    headers['Content-Length'] = str(len(body))
+    await send({'type': 'http.response.start', 'status': status, 'headers': encode_headers(headers)})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def resolve_range(byte_range, size):
+    """(start, end) from parse_byte_range() -> inclusive offsets, or None if unsatisfiable."""
+    start, end = byte_range
+    if start is None:
+        start, end = max(size - end, 0), size - 1
+    elif end is None or end >= size:
+        end = size - 1
+    if start >= size or size == 0:
+        return None
+    return start, end
+
+
+async def send_file(scope, send, path, content_type, etag, headers=None, max_age=3600):
+    """Serve a local file with ETag and single-range support, reading it off the event loop."""
+    request = request_headers(scope)
+    size = os.stat(path).st_size
+    headers = dict(headers or {})
+    headers.update({
+        'Content-Type': content_type,
+        'Accept-Ranges': 'bytes',
+        'ETag': f'"{etag}"',
+        'Cache-Control': f'public, max-age={max_age}'
+    })
+
+    if_none_match = request.get('if-none-match', '')
+    if etag and (f'"{etag}"' in if_none_match or if_none_match.strip() == '*'):
+        await send({'type': 'http.response.start', 'status': 304, 'headers': encode_headers(headers)})
+        await send({'type': 'http.response.body', 'body': b''})
+        return 304
+
+    status, start, end = 200, 0, size - 1
+    byte_range = parse_byte_range(request.get('range'))
+    if byte_range:
+        resolved = resolve_range(byte_range, size)
+        if resolved is None:
+            headers['Content-Range'] = f'bytes */{size}'
+            await send_response(send, 416, headers=headers)
+            return 416
+        status, (start, end) = 206, resolved
+        headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    length = end - start + 1 if size else 0
+    headers['Content-Length'] = str(length)
+    await send({'type': 'http.response.start', 'status': status, 'headers': encode_headers(headers)})
+    if scope['method'] == 'HEAD' or not length:
+        await send({'type': 'http.response.body', 'body': b''})
+        return status
+
+    async with await anyio.open_file(path, 'rb') as f:
+        await f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await f.read(min(FILE_CHUNK, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': remaining > 0})
+    if remaining > 0:
+        await send({'type': 'http.response.body', 'body': b''})
+    return status
+
+
+class WsgiBridge:
+    """Runs a WSGI app (the Flask app) from ASGI in a bounded thread pool.
+
+    The response is iterated chunk by chunk in worker threads, so streamed
+    Flask responses stay streamed. Request bodies are not: the whole body is
+    spooled (to disk past SPOOL_BYTES) before the view runs, so large uploads
+    should use the chunked upload routes. Bodies over `max_body` bytes are
+    refused with 413 before anything is spooled where Content-Length is
+    known, otherwise as soon as the limit is passed. `max_threads` caps how
+    many sync views run at once.
+    """
+
+    def __init__(self, wsgi_app, max_threads=40, max_body=None):
+        self.wsgi_app = wsgi_app
+        self.max_threads = max_threads
+        self.max_body = max_body
+        self._limiter = None
+
+    def _environ(self, scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False
+        }
+        for name, value in request_headers(scope).items():
+            if name == 'content-type':
+                environ['CONTENT_TYPE'] = value
+            elif name == 'content-length':
+                environ['CONTENT_LENGTH'] = value
+            else:
+                environ['HTTP_' + name.upper().replace('-', '_')] = value
+        return environ
+
+    async def __call__(self, scope, receive, send):
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.max_threads)
+
+        if self.max_body is not None:
+            length = request_headers(scope).get('content-length', '')
+            if length.isdigit() and int(length) > self.max_body:
+                await send_response(send, 413, b'Request body too large')
+                return
+
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        try:
+            received = 0
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                chunk = message.get('body', b'')
+                received += len(chunk)
+                if self.max_body is not None and received > self.max_body:
+                    await send_response(send, 413, b'Request body too large')
+                    return
+                body.write(chunk)
+                more_body = message.get('more_body', False)
+            body.seek(0)
+
+            response = {}
+            written = []
+
+            def start_response(status, headers, exc_info=None):
+                response['status'] = int(status.split(' ', 1)[0])
+                response['headers'] = headers
+                return written.append
+
+            result = await anyio.to_thread.run_sync(
+                self.wsgi_app, self._environ(scope, body), start_response, limiter=self._limiter)
+            try:
+                iterator = iter(result)
+                chunk = await anyio.to_thread.run_sync(next, iterator, None, limiter=self._limiter)
+                await send({
+                    'type': 'http.response.start',
+                    'status': response['status'],
+                    'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                for name, value in response['headers']]
+                })
+                for data in written:
+                    await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+                while chunk is not None:
+                    if chunk:
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                    chunk = await anyio.to_thread.run_sync(next, iterator, None, limiter=self._limiter)
+                await send({'type': 'http.response.body', 'body': b''})
+            finally:
+                close = getattr(result, 'close', None)
+                if close is not None:
+                    await anyio.to_thread.run_sync(close, limiter=self._limiter)
+        finally:
+            body.close()
@@ -0,0 +1,242 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads in this process are coordinated
+    fcntl = None
+
+LOCK_STRIPES = 64
+DATA_SUFFIX = '.audio'
+TMP_SUFFIX = '.part'
+
+# Hits only refresh the file's mtime (used for LRU order) this often
+TOUCH_INTERVAL = 60
+
+# Leftover temp files from a crashed download are removed after this long
+STALE_TMP_SECONDS = 3600
+
+
+class AudioDiskCache:
+    """Byte-bounded on-disk LRU cache of song audio.
+
+    Files are keyed by song id and the stored object's version (generation,
+    or the storage path which changes whenever the audio is replaced). A
+    download is written to a `*.part` temp file and renamed into place, so a
+    partial file is never served. Concurrent misses for the same key share
+    one in-flight download: the first caller fetches, the others wait for its
+    result. Downloads of different keys never wait on each other; only the
+    final check-and-rename takes a striped thread lock plus, where available,
+    a flock on a matching lock file so several gunicorn workers agree on
+    which copy is kept. prefetch() fills the cache from a small background
+    pool so a request can be proxied at once instead. The modification time of each file is its LRU timestamp, which
+    keeps eviction consistent across processes sharing the directory.
+    """
+
+    def __init__(self, directory, max_bytes, max_file_bytes=None, chunk_size=64 * 1024, fill_workers=4):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes or max_bytes // 4
+        self.chunk_size = chunk_size
+        self.fill_workers = fill_workers
+        self._lock_dir = os.path.join(directory, 'locks')
+        os.makedirs(self._lock_dir, exist_ok=True)
+        self._stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._fill_pool = None
+        self._fill_pid = None
+
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.evictions = 0
+
+    def _key(self, song_id, version):
+        return hashlib.sha256(f'{song_id}\0{version}'.encode('utf-8')).hexdigest()[:40]
+
+    def path_for(self, song_id, version):
+        return os.path.join(self.directory, self._key(song_id, version) + DATA_SUFFIX)
+
+    def etag_for(self, song_id, version):
+        return self._key(song_id, version)
+
+    def get(self, song_id, version):
+        """Return the cached file path, or None on a miss."""
+        path = self.path_for(song_id, version)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        now = time.time()
+        if now - mtime > TOUCH_INTERVAL:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return path
+
+    def fetch(self, song_id, version, open_upstream):
+        """Download the audio once and return its cached path.
+
+        `open_upstream` returns a streaming requests-style response. Returns
+        None when the file is too big to cache or the download fails, in which
+        case the caller should proxy the request instead.
+        """
+        path = self.path_for(song_id, version)
+        if os.path.exists(path):
+            return path
+
+        key = self._key(song_id, version)
+        with self._inflight_lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+        if not leader:
+            # Someone in this process is already downloading it
+            return flight.result()
+
+        result = None
+        try:
+            result = self._download(song_id, version, path, open_upstream)
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+            flight.set_result(result)
+        return result
+
+    def prefetch(self, song_id, version, open_upstream):
+        """Start fetch() in the background unless the song is cached or
+        already being downloaded. Returns immediately."""
+        key = self._key(song_id, version)
+        with self._inflight_lock:
+            if key in self._inflight or os.path.exists(self.path_for(song_id, version)):
+                return
+            # The pool's threads don't survive fork, each worker starts its own
+            if self._fill_pid != os.getpid():
+                self._fill_pool = ThreadPoolExecutor(max_workers=self.fill_workers,
+                                                     thread_name_prefix='audio-cache-fill')
+                self._fill_pid = os.getpid()
+            pool = self._fill_pool
+        pool.submit(self.fetch, song_id, version, open_upstream)
+
+    def _download(self, song_id, version, path, open_upstream):
+        self.fetches += 1
+        stripe = int(self._key(song_id, version)[:8], 16) % LOCK_STRIPES
+        tmp_path = os.path.join(self.directory, f'.{uuid.uuid4().hex}{TMP_SUFFIX}')
+        response = None
+        try:
+            response = open_upstream()
+            if response.status_code != 200:
+                print(f"Audio cache: upstream returned {response.status_code} for song {song_id}")
+                return None
+
+            length = response.headers.get('Content-Length')
+            if length and int(length) > self.max_file_bytes:
+                return None
+
+            written = 0
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if not chunk:
+                        continue
+                    written += len(chunk)
+                    if written > self.max_file_bytes:
+                        break
+                    f.write(chunk)
+
+            if written > self.max_file_bytes:
+                return None
+
+            with self._stripes[stripe], self._process_lock(stripe):
+                # Another worker process may have finished the same download meanwhile
+                if not os.path.exists(path):
+                    # Atomic on POSIX and Windows, readers see all or nothing
+                    os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Audio cache download failed for song {song_id}: {e}")
+            return None
+        finally:
+            if response is not None:
+                response.close()
+            _remove_quietly(tmp_path)
+
+        self._evict()
+        return path
+
+    def _process_lock(self, stripe):
+        return _FileLock(os.path.join(self._lock_dir, f'{stripe}.lock'))
+
+    def _evict(self):
+        """Delete least recently used files until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        now = time.time()
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith(TMP_SUFFIX):
+                    if now - stat.st_mtime > STALE_TMP_SECONDS:
+                        _remove_quietly(entry.path)
+                    continue
+                if entry.name.endswith(DATA_SUFFIX):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if _remove_quietly(path):
+                total -= size
+                self.evictions += 1
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'fetches': self.fetches,
+            'evictions': self.evictions,
+            'in_flight': len(self._inflight),
+            'max_bytes': self.max_bytes
+        }
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        # Already gone, or still open on a platform that refuses to delete it
+        return False
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._file = open(self.path, 'a')
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
@@ -0,0 +1,40 @@
+import re
+
+_RANGE_RE = re.compile(r'^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$', re.IGNORECASE)
+
+
+def parse_byte_range(header):
+    """Parse a single-range `Range: bytes=...` header.
+
+    Returns (start, end) where either side may be None for open ranges
+    (`bytes=500-` -> (500, None), `bytes=-500` -> (None, 500) meaning the last
+    500 bytes). Returns None when there is no header, it is malformed, or it
+    asks for several ranges; the caller then serves the whole file.
+    """
+    if not header or ',' in header:
+        return None
+    match = _RANGE_RE.match(header)
+    if not match:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    start = int(start) if start else None
+    end = int(end) if end else None
+    if start is not None and end is not None and end < start:
+        return None
+    return start, end
+
+
+def format_byte_range(byte_range):
+    start, end = byte_range
+    if start is None:
+        return f'bytes=-{end}'
+    if end is None:
+        return f'bytes={start}-'
+    return f'bytes={start}-{end}'
+
+
+# Upstream headers that are passed through to the client as they are
+PASSTHROUGH_HEADERS = ('Content-Length', 'Content-Range', 'ETag', 'Last-Modified')
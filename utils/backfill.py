@@ -0,0 +1,49 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+# One document per derived data set (catalog, counters, ...), written by the
+# CLI command that fills it
+BACKFILLS_COLLECTION = 'backfills'
+
+
+class BackfillMarker:
+    """Whether a derived collection has been filled by its backfill command.
+
+    Read paths switch to derived data only once the marker exists, so a
+    deploy never serves an empty catalog or zero counts before the backfill
+    has run. A missing marker is re-checked every `recheck` seconds; once
+    seen it is remembered for the life of the process.
+    """
+
+    def __init__(self, name, recheck=60):
+        self.name = name
+        self.recheck = recheck
+        self._lock = threading.Lock()
+        self._ready = False
+        self._checked = None
+
+    def _ref(self, db):
+        return db.collection(BACKFILLS_COLLECTION).document(self.name)
+
+    def ready(self, db):
+        if self._ready:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            if self._checked is not None and now - self._checked < self.recheck:
+                return self._ready
+            self._checked = now
+        try:
+            ready = self._ref(db).get().exists
+        except Exception as e:
+            print(f"Backfill marker check failed for {self.name}: {e}")
+            return False
+        with self._lock:
+            self._ready = self._ready or ready
+        return ready
+
+    def mark(self, db):
+        self._ref(db).set({'completed_at': datetime.now(timezone.utc)})
+        with self._lock:
+            self._ready = True
@@ -0,0 +1,205 @@
+import csv
+import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.counters import DEFAULT_SHARDS, WORDS_COUNTER, increment
+from utils.dictionary_pack import utcnow
+from utils.word_search import normalize
+
+WORD_FIELDS = ('tai_khamyang', 'english', 'assamese')
+
+# Firestore caps a WriteBatch at 500 operations
+BATCH_LIMIT = 500
+
+# Only the first errors are kept so a bad file can't exhaust memory
+MAX_REPORTED_ERRORS = 1000
+
+
+def iter_rows(stream, fmt):
+    """Yield (row_number, row_dict_or_error) from a CSV or JSONL byte stream.
+
+    The stream is decoded and parsed line by line, so the upload is never
+    held in memory as a whole, and every row before an undecodable line is
+    still yielded. A JSONL line that isn't UTF-8 is reported as that row's
+    error; in a CSV it raises UnicodeDecodeError, as the rest can't be split
+    into records reliably.
+    """
+    if fmt == 'csv':
+        rows = csv.DictReader(_decoded_lines(stream))
+        for row_number, row in enumerate(rows, start=2):  # line 1 is the header
+            yield row_number, row
+        return
+
+    for row_number, raw in enumerate(stream, start=1):
+        try:
+            line = raw.decode('utf-8-sig' if row_number == 1 else 'utf-8').strip()
+        except UnicodeDecodeError as e:
+            yield row_number, ValueError(f'Invalid UTF-8: {e}')
+            continue
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield row_number, ValueError(f'Invalid JSON: {e}')
+            continue
+        if not isinstance(row, dict):
+            yield row_number, ValueError('Each line must be a JSON object')
+            continue
+        yield row_number, row
+
+
+def _decoded_lines(stream):
+    for line_number, raw in enumerate(stream, start=1):
+        yield raw.decode('utf-8-sig' if line_number == 1 else 'utf-8')
+
+
+def validate_row(row):
+    word_data = {}
+    for field in WORD_FIELDS:
+        value = row.get(field)
+        value = value.strip() if isinstance(value, str) else value
+        if not value or not isinstance(value, str):
+            raise ValueError(f'Missing required field: {field}')
+        word_data[field] = value
+    return word_data
+
+
+class BulkWordImporter:
+    """Upsert words keyed on tai_khamyang using batched writes.
+
+    Rows are collected into WriteBatches of up to `batch_size` and several
+    batches are committed concurrently, with at most `concurrency * 2`
+    outstanding so memory stays bounded however long the file is.
+    `existing` maps normalized tai_khamyang -> document id for the words
+    already in Firestore (taken from the word cache). Each batch also
+    increments the words counter by the number of words it creates.
+    A file that can't be read to the end (bad encoding, broken CSV quoting)
+    stops the import there: the rows before it are still written, and
+    `stopped_at` in the summary names the row.
+    """
+
+    def __init__(self, db, existing, batch_size=BATCH_LIMIT, concurrency=4, on_progress=None,
+                 counter_shards=DEFAULT_SHARDS):
+        self.db = db
+        self.words_ref = db.collection('words')
+        self.existing = dict(existing)
+        # One operation per batch is kept for the counter increment
+        self.batch_size = min(batch_size, BATCH_LIMIT - 1)
+        self.counter_shards = counter_shards
+        self.concurrency = concurrency
+        self.on_progress = on_progress
+
+        self._lock = threading.Lock()
+        self._report_lock = threading.Lock()
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        self.stopped_at = None
+
+    def _error(self, row_number, message):
+        with self._lock:
+            self.failed += 1
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append({'row': row_number, 'error': message})
+
+    def _commit(self, batch, row_numbers, created, updated):
+        try:
+            increment(batch, self.db, WORDS_COUNTER, {'total': created}, shards=self.counter_shards)
+            batch.commit()
+        except Exception as e:
+            for row_number in row_numbers:
+                self._error(row_number, f'Batch commit failed: {e}')
+            return
+        with self._lock:
+            self.created += created
+            self.updated += updated
+        self._report()
+
+    def _report(self):
+        if not self.on_progress:
+            return
+        # Batches finish concurrently; taking the summary and writing it under
+        # one lock keeps the stored progress from ever moving backwards
+        with self._report_lock:
+            try:
+                self.on_progress(self.summary())
+            except Exception as e:
+                print(f"Import progress update failed: {e}")
+
+    def run(self, rows):
+        in_flight = deque()
+        batch = self.db.batch()
+        row_numbers = []
+        created = updated = 0
+        rows = iter(rows)
+        last_row = 0
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='word-import') as pool:
+            while True:
+                try:
+                    row_number, row = next(rows)
+                except StopIteration:
+                    break
+                except (UnicodeDecodeError, csv.Error) as e:
+                    # The rest of the file can't be parsed; keep what was read so far
+                    self.stopped_at = {'row': last_row + 1, 'error': f'Could not read the file: {e}'}
+                    self._error(last_row + 1, self.stopped_at['error'])
+                    break
+                last_row = row_number
+                self.rows += 1
+                if isinstance(row, Exception):
+                    self._error(row_number, str(row))
+                    continue
+                try:
+                    word_data = validate_row(row)
+                except ValueError as e:
+                    self._error(row_number, str(e))
+                    continue
+
+                key = normalize(word_data['tai_khamyang'])
+                doc_id = self.existing.get(key)
+                if doc_id is None:
+                    # Later rows with the same word update this new document
+                    doc_id = self.words_ref.document().id
+                    self.existing[key] = doc_id
+                    created += 1
+                else:
+                    updated += 1
+
+                word_data['updated_at'] = utcnow()
+                batch.set(self.words_ref.document(doc_id), word_data, merge=True)
+                row_numbers.append(row_number)
+
+                if len(row_numbers) == self.batch_size:
+                    in_flight.append(pool.submit(self._commit, batch, row_numbers, created, updated))
+                    batch = self.db.batch()
+                    row_numbers = []
+                    created = updated = 0
+
+                    # Back-pressure: don't parse further ahead than the writers
+                    while len(in_flight) >= self.concurrency * 2:
+                        in_flight.popleft().result()
+
+            if row_numbers:
+                in_flight.append(pool.submit(self._commit, batch, row_numbers, created, updated))
+            for future in in_flight:
+                future.result()
+
+        self._report()
+        return self.summary()
+
+    def summary(self):
+        with self._lock:
+            return {
+                'rows': self.rows,
+                'created': self.created,
+                'updated': self.updated,
+                'failed': self.failed,
+                'errors': list(self.errors),
+                'stopped_at': self.stopped_at
+            }
@@ -0,0 +1,87 @@
+from utils.seller_cache import UNKNOWN_SELLER, seller_info_from_dict
+
+# Denormalized read model: one document per product with seller_info embedded.
+# Kept in step with `products` by the shop write routes, so the shop reads
+# never have to join products and sellers.
+CATALOG_COLLECTION = 'catalog'
+
+# Firestore caps a WriteBatch at 500 operations
+BATCH_LIMIT = 500
+
+
+def catalog_entry(product_id, product_data, seller_info):
+    entry = dict(product_data)
+    entry['id'] = product_id
+    entry['seller_info'] = dict(seller_info or UNKNOWN_SELLER)
+    return entry
+
+
+def set_entry(batch, db, product_id, product_data, seller_info):
+    """Queue the catalog write for a product on an existing batch."""
+    catalog_ref = db.collection(CATALOG_COLLECTION).document(product_id)
+    batch.set(catalog_ref, catalog_entry(product_id, product_data, seller_info))
+
+
+def delete_entry(batch, db, product_id):
+    batch.delete(db.collection(CATALOG_COLLECTION).document(product_id))
+
+
+def refresh_seller(db, seller_id, seller_data):
+    """Rewrite the embedded seller_info on every catalog entry of a seller."""
+    seller_info = seller_info_from_dict(seller_data)
+    entries = db.collection(CATALOG_COLLECTION).where('seller_id', '==', seller_id).stream()
+
+    batch = db.batch()
+    pending = 0
+    updated = 0
+    for entry in entries:
+        batch.update(entry.reference, {'seller_info': seller_info})
+        pending += 1
+        updated += 1
+        if pending == BATCH_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+    return updated
+
+
+def rebuild_catalog(db):
+    """Rebuild the whole catalog from `products` and `sellers`.
+
+    Returns (written, removed). Safe to run while the app is serving: every
+    entry is overwritten in place and entries for deleted products are
+    removed afterwards.
+    """
+    sellers = {}
+    for seller_doc in db.collection('sellers').stream():
+        sellers[seller_doc.id] = seller_info_from_dict(seller_doc.to_dict())
+
+    product_ids = set()
+    batch = db.batch()
+    pending = 0
+    for product_doc in db.collection('products').stream():
+        product_data = product_doc.to_dict()
+        product_ids.add(product_doc.id)
+        set_entry(batch, db, product_doc.id, product_data, sellers.get(product_data.get('seller_id')))
+        pending += 1
+        if pending == BATCH_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    removed = 0
+    for entry in db.collection(CATALOG_COLLECTION).select([]).stream():
+        if entry.id not in product_ids:
+            batch.delete(entry.reference)
+            removed += 1
+            pending += 1
+            if pending == BATCH_LIMIT:
+                batch.commit()
+                batch = db.batch()
+                pending = 0
+
+    if pending:
+        batch.commit()
+    return len(product_ids), removed
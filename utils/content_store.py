@@ -0,0 +1,55 @@
+import hashlib
+import os
+import re
+import uuid
+
+HASHED_NAME_RE = re.compile(r'^[0-9a-f]{64}(\.[A-Za-z0-9]{1,8})?$')
+
+# Long-lived caching is safe because a hashed name never changes content
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def is_hashed_name(filename):
+    return bool(HASHED_NAME_RE.match(filename or ''))
+
+
+def _extension(filename):
+    ext = os.path.splitext(filename or '')[1].lower()
+    return ext if re.match(r'^\.[a-z0-9]{1,8}$', ext) else ''
+
+
+def store_stream(stream, directory, original_filename, chunk_size=64 * 1024):
+    """Save a file under the SHA-256 of its content and return the new name.
+
+    The content is hashed while it is copied to a temp file, then renamed to
+    `<sha256><ext>`. If that name already exists the clip is a duplicate
+    and the temp file is simply dropped.
+    """
+    digest = hashlib.sha256()
+    tmp_path = os.path.join(directory, f'.{uuid.uuid4().hex}.tmp')
+    try:
+        with open(tmp_path, 'wb') as f:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+
+        filename = digest.hexdigest() + _extension(original_filename)
+        final_path = os.path.join(directory, filename)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, final_path)
+        return filename
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def store_existing(path, directory):
+    """Content-address a file that is already on disk (used by the migration)."""
+    with open(path, 'rb') as f:
+        return store_stream(f, directory, os.path.basename(path))
@@ -0,0 +1,151 @@
+import random
+import threading
+
+from cachetools import TTLCache
+from firebase_admin import firestore
+
+# counters/<name>/shards/<n>: each write increments one random shard, so
+# concurrent writers rarely touch the same document (Firestore sustains
+# about one write per second per document). Reading a counter sums its shards.
+COUNTERS_COLLECTION = 'counters'
+SHARDS_COLLECTION = 'shards'
+DEFAULT_SHARDS = 10
+
+WORDS_COUNTER = 'words'
+SONGS_COUNTER = 'songs'
+PRODUCTS_COUNTER = 'products'
+
+
+def seller_products_counter(seller_id):
+    # One counter per seller, so no document grows with the number of sellers
+    return f'products_seller_{seller_id}'
+
+
+def product_counts(product_data):
+    """What one product contributes to the products counter.
+
+    `by_category` counts active products only (what the shop lists). Per
+    seller totals are kept in seller_products_counter().
+    """
+    active = product_data.get('status') == 'active'
+    counts = {'total': 1, 'active': 1 if active else 0}
+    category = product_data.get('category')
+    if active and category:
+        counts['by_category'] = {category: 1}
+    return counts
+
+
+def combine(*deltas, sign=1):
+    """Sum nested {field: int | {key: int}} dicts, each scaled by `sign`.
+
+    Pass sign=-1 to negate; combine(new, combine(old, sign=-1)) is the
+    change from old to new.
+    """
+    result = {}
+    for delta in deltas:
+        for field, value in delta.items():
+            if isinstance(value, dict):
+                nested = result.setdefault(field, {})
+                for key, count in value.items():
+                    nested[key] = nested.get(key, 0) + sign * count
+            else:
+                result[field] = result.get(field, 0) + sign * value
+    return result
+
+
+def _increments(deltas):
+    # Zero changes are dropped so an update that keeps the category writes nothing for it
+    fields = {}
+    for field, value in deltas.items():
+        if isinstance(value, dict):
+            nested = {key: firestore.Increment(count) for key, count in value.items() if count and key}
+            if nested:
+                fields[field] = nested
+        elif value:
+            fields[field] = firestore.Increment(value)
+    return fields
+
+
+def increment(batch, db, name, deltas, shards=DEFAULT_SHARDS):
+    """Queue `deltas` on a random shard of counter `name` on an existing batch.
+
+    Returns False (and queues nothing) when every delta is zero. The batch
+    then commits the counter change atomically with the write it counts.
+    """
+    fields = _increments(deltas)
+    if not fields:
+        return False
+    shard_ref = (db.collection(COUNTERS_COLLECTION).document(name)
+                 .collection(SHARDS_COLLECTION).document(str(random.randrange(shards))))
+    batch.set(shard_ref, fields, merge=True)
+    return True
+
+
+def read_counter(db, name):
+    """Sum of all shards of a counter (maps are summed per key)."""
+    shards = db.collection(COUNTERS_COLLECTION).document(name).collection(SHARDS_COLLECTION).stream()
+    total = combine(*(shard.to_dict() or {} for shard in shards))
+    # Keys that went back to zero (e.g. an emptied category) are left out
+    for field, value in total.items():
+        if isinstance(value, dict):
+            total[field] = {key: count for key, count in value.items() if count}
+    return total
+
+
+def reset_counter(db, name, values):
+    """Replace a counter with exact `values` (used after a full recount).
+
+    Only safe while nothing else writes to the counted collection:
+    increments committed between the recount and the reset are lost.
+    """
+    shards_ref = db.collection(COUNTERS_COLLECTION).document(name).collection(SHARDS_COLLECTION)
+    batch = db.batch()
+    for shard in shards_ref.stream():
+        batch.delete(shard.reference)
+    batch.set(shards_ref.document('0'), values)
+    batch.commit()
+
+
+def read_counter_values(cache, db, name, backfill, recount):
+    """Values of counter `name` through `cache`.
+
+    Until `backfill` (a BackfillMarker) is marked the counters may be
+    missing data written before they existed, so `recount()` (e.g. count
+    aggregations) is used instead.
+    """
+    if backfill.ready(db):
+        return cache.get(db, name)
+    return cache.get(db, name, load=recount)
+
+
+class CounterCache:
+    """Counter values read through a short TTL, so /api/stats costs a
+    handful of shard reads per `ttl` seconds however often it is polled.
+    Bounded by `maxsize` counters (per-seller counters come and go)."""
+
+    def __init__(self, ttl=30, maxsize=1024):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db, name, load=None):
+        """Cached counter values; `load` replaces read_counter (e.g. a recount)."""
+        with self._lock:
+            values = self._values.get(name)
+            if values is not None:
+                self.hits += 1
+                return values
+            self.misses += 1
+        values = load() if load is not None else read_counter(db, name)
+        with self._lock:
+            self._values[name] = values
+        return values
+
+    def invalidate(self, name):
+        with self._lock:
+            self._values.pop(name, None)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._values), 'ttl': self.ttl}
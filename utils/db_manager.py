@@ -0,0 +1,651 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from utils.catalog import CATALOG_COLLECTION
+from utils.pagination import MIN_SCAN_BATCH, encode_cursor, paginate_query
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process keeps its own listeners
+    fcntl = None
+
+# Bump when REPLICATED_COLLECTIONS changes; the replica is then rebuilt
+SCHEMA_VERSION = 3
+
+# Collections mirrored into SQLite. `columns` are copied out of the document
+# into indexed columns for filtering and ordering; `fields` (if set) limits
+# what is stored at all, so credentials never reach the local file. Users are
+# not replicated: they are only read by login, which needs the live hash.
+REPLICATED_COLLECTIONS = {
+    'songs': {
+        'columns': ('title', 'description'),
+        'indexes': [('title',), ('description',)]
+    },
+    'products': {
+        'columns': ('status', 'seller_id', 'name', 'price', 'created_at', 'category'),
+        'indexes': [('seller_id',), ('status', 'name'), ('status', 'price'), ('status', 'created_at'),
+                    ('status', 'category', 'price'), ('status', 'category', 'created_at')]
+    },
+    'catalog': {
+        'columns': ('status', 'seller_id', 'name', 'price', 'created_at', 'category'),
+        'indexes': [('seller_id',), ('status', 'name'), ('status', 'price'), ('status', 'created_at'),
+                    ('status', 'category', 'price'), ('status', 'category', 'created_at')]
+    },
+    'sellers': {
+        'columns': (),
+        'indexes': [],
+        'fields': ('business_name', 'whatsapp', 'phone')
+    }
+}
+
+# SQLite limits the number of bound parameters per statement
+MAX_IN_PARAMS = 500
+
+# How often the writer checks its listeners and records that it is alive
+HEARTBEAT_INTERVAL = 10
+
+
+def _encode_value(value):
+    # Firestore timestamps come back as datetime subclasses
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    return str(value)
+
+
+def _decode_value(obj):
+    if set(obj) == {'$dt'}:
+        return datetime.fromisoformat(obj['$dt'])
+    return obj
+
+
+def _column_value(value):
+    """Document value -> SQLite value that orders the way Firestore does."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat()
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float, str)):
+        return value
+    return None
+
+
+class SQLiteReplica:
+    """Local SQLite copy of the read-mostly collections.
+
+    The replica is fed by Firestore on_snapshot listeners: the first snapshot
+    of a collection replaces its table, later ones apply only the changed
+    documents. GET routes query it with indexed lookups instead of a network
+    round-trip, and because the file outlives the process, reads keep
+    working through a Firestore outage or a restart during one.
+
+    Several gunicorn workers share one file. Only the worker holding the
+    flock on `<path>.lock` runs listeners and writes; the others block on the
+    lock in a background thread and take over if the writer goes away.
+    Reads use WAL mode so they never wait for the writer.
+
+    The writer records a heartbeat while all its listeners are active and
+    restarts any that stopped. A collection counts as ready only if the
+    current writer has delivered its snapshot and the heartbeat is at most
+    `max_lag` seconds old. After a restart, or when no listener is running,
+    readers fall back to Firestore instead of serving a stale file.
+    """
+
+    def __init__(self, path, collections=None, max_lag=60, heartbeat_interval=HEARTBEAT_INTERVAL):
+        self.path = path
+        self.collections = collections or REPLICATED_COLLECTIONS
+        self.max_lag = max_lag
+        self.heartbeat_interval = heartbeat_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._start_lock = threading.Lock()
+        self._started_pid = None
+        self._write_lock = threading.Lock()
+        self._writer = None
+        self._listeners = {}
+        self._live = {}
+        self._lock_file = None
+        self.leader = False
+
+        self.reads = 0
+        self.applied = 0
+        self.errors = 0
+
+        self._create_schema()
+
+    # ---------- connections ----------
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _reader(self):
+        # One connection per thread, re-opened in a forked worker
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _create_schema(self):
+        conn = self._connect()
+        try:
+            with conn:
+                if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                    for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+                        conn.execute(f'DROP TABLE "{table}"')
+
+                # synced_at: last applied change, snapshot_at: last snapshot received
+                conn.execute('CREATE TABLE IF NOT EXISTS replica_meta ('
+                             'collection TEXT PRIMARY KEY, version INTEGER NOT NULL, synced_at REAL NOT NULL, '
+                             'snapshot_at REAL NOT NULL)')
+                conn.execute('CREATE TABLE IF NOT EXISTS replica_leader ('
+                             'id INTEGER PRIMARY KEY CHECK (id = 1), pid INTEGER NOT NULL, '
+                             'started_at REAL NOT NULL, heartbeat_at REAL)')
+                for collection, spec in self.collections.items():
+                    columns = ''.join(f', "{column}"' for column in spec['columns'])
+                    conn.execute(f'CREATE TABLE IF NOT EXISTS "{collection}" '
+                                 f'(id TEXT PRIMARY KEY, doc TEXT NOT NULL{columns})')
+                    for index in spec['indexes']:
+                        name = f'{collection}_{"_".join(index)}'
+                        fields = ', '.join(f'"{field}"' for field in index)
+                        conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{collection}" ({fields}, id)')
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        finally:
+            conn.close()
+
+    # ---------- reads ----------
+
+    def ready(self, collection):
+        """True while the collection is synced by a live writer.
+
+        Its snapshot must come from the current writer (not a previous
+        process), and the writer's heartbeat must be at most max_lag old.
+        """
+        if collection not in self.collections:
+            return False
+        row = self._reader().execute(
+            'SELECT m.snapshot_at, l.started_at, l.heartbeat_at FROM replica_meta m, replica_leader l '
+            'WHERE m.collection = ?', (collection,)).fetchone()
+        if row is None:
+            return False
+        snapshot_at, started_at, heartbeat_at = row
+        return (snapshot_at >= started_at and heartbeat_at is not None
+                and time.time() - heartbeat_at <= self.max_lag)
+
+    def version(self, collection):
+        """Counter bumped on every change applied to the collection."""
+        row = self._reader().execute(
+            'SELECT version FROM replica_meta WHERE collection = ?', (collection,)).fetchone()
+        return row[0] if row else 0
+
+    def get(self, collection, doc_id):
+        """Return the document as a dict (with 'id'), or None."""
+        self.reads += 1
+        row = self._reader().execute(
+            f'SELECT id, doc FROM "{collection}" WHERE id = ?', (doc_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def get_many(self, collection, doc_ids):
+        """Return {id: document} for the ids that exist."""
+        self.reads += 1
+        doc_ids = list({doc_id for doc_id in doc_ids if doc_id})
+        result = {}
+        for start in range(0, len(doc_ids), MAX_IN_PARAMS):
+            chunk = doc_ids[start:start + MAX_IN_PARAMS]
+            placeholders = ', '.join('?' * len(chunk))
+            rows = self._reader().execute(
+                f'SELECT id, doc FROM "{collection}" WHERE id IN ({placeholders})', chunk)
+            for row in rows:
+                result[row[0]] = self._to_dict(row)
+        return result
+
+    def _filters(self, where, ranges):
+        clauses = []
+        params = []
+        for field, value in (where or {}).items():
+            clauses.append(f'"{field}" = ?')
+            params.append(_column_value(value))
+        for field, (low, high) in (ranges or {}).items():
+            if low is not None:
+                clauses.append(f'"{field}" >= ?')
+                params.append(_column_value(low))
+            if high is not None:
+                clauses.append(f'"{field}" <= ?')
+                params.append(_column_value(high))
+        return clauses, params
+
+    def _order(self, clauses, order_field, descending):
+        direction = 'DESC' if descending else 'ASC'
+        if order_field:
+            clauses.append(f'"{order_field}" IS NOT NULL')
+            return f'"{order_field}" {direction}, id {direction}'
+        return f'id {direction}'
+
+    def query(self, collection, where=None, order_field=None, descending=False,
+              limit=None, cursor=None, predicate=None, ranges=None):
+        """Local equivalent of paginate_query(), returning dicts.
+
+        `where` is a dict of equality filters on the indexed columns and
+        `ranges` a dict of inclusive (low, high) bounds, either end None. Like
+        Firestore, ordering by a field leaves out documents without it, and
+        the document id breaks ties. Cursors use the same {'id', 'v'} shape
+        as paginate_query, so a client can keep paging if reads switch
+        between Firestore and the replica. Returns (documents, next_cursor);
+        next_cursor is None on the last page or when `limit` is None.
+        """
+        if limit is None:
+            return list(self.scan(collection, where, order_field, descending, predicate, ranges)), None
+
+        self.reads += 1
+        clauses, params = self._filters(where, ranges)
+        order_by = self._order(clauses, order_field, descending)
+        compare = '<' if descending else '>'
+
+        base_sql = f'SELECT id, doc FROM "{collection}"'
+        conn = self._reader()
+        # With a predicate read the same larger batch each time rather than
+        # only as many rows as are still missing from the page
+        batch_size = max(limit + 1, MIN_SCAN_BATCH) if predicate else limit + 1
+
+        results = []
+        last = cursor
+        while len(results) <= limit:
+            page_clauses = list(clauses)
+            page_params = list(params)
+            if last:
+                if order_field:
+                    value = _column_value(last.get('v'))
+                    page_clauses.append(f'("{order_field}" {compare} ? OR ("{order_field}" = ? AND id {compare} ?))')
+                    page_params.extend([value, value, last['id']])
+                else:
+                    page_clauses.append(f'id {compare} ?')
+                    page_params.append(last['id'])
+
+            sql = base_sql
+            if page_clauses:
+                sql += ' WHERE ' + ' AND '.join(page_clauses)
+            sql += f' ORDER BY {order_by} LIMIT ?'
+            page_params.append(batch_size)
+
+            rows = conn.execute(sql, page_params).fetchall()
+            for row in rows:
+                doc = self._to_dict(row)
+                last = {'id': doc['id']}
+                if order_field:
+                    last['v'] = doc.get(order_field)
+                if predicate is None or predicate(doc):
+                    results.append(doc)
+
+            if len(rows) < batch_size:
+                break
+
+        if len(results) > limit:
+            results = results[:limit]
+            tail = results[-1]
+            next_cursor = {'id': tail['id']}
+            if order_field:
+                next_cursor['v'] = tail.get(order_field)
+            return results, encode_cursor(next_cursor)
+        return results, None
+
+    def scan(self, collection, where=None, order_field=None, descending=False, predicate=None, ranges=None):
+        """Yield every matching document, in order, as a dict."""
+        self.reads += 1
+        clauses, params = self._filters(where, ranges)
+        order_by = self._order(clauses, order_field, descending)
+        sql = f'SELECT id, doc FROM "{collection}"'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        for row in self._reader().execute(f'{sql} ORDER BY {order_by}', params):
+            doc = self._to_dict(row)
+            if predicate is None or predicate(doc):
+                yield doc
+
+    def facet_counts(self, collection, field, where=None, ranges=None, predicate=None):
+        """{value: count} of an indexed column over the filtered documents.
+
+        Grouped in SQL; with a `predicate` the filtered documents are decoded
+        and counted in Python instead.
+        """
+        self.reads += 1
+        clauses, params = self._filters(where, ranges)
+        where_sql = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+        conn = self._reader()
+        if predicate is None:
+            rows = conn.execute(f'SELECT "{field}", COUNT(*) FROM "{collection}"{where_sql} '
+                                f'GROUP BY "{field}"', params)
+            return {value: count for value, count in rows if value is not None}
+
+        counts = {}
+        for row in conn.execute(f'SELECT id, doc FROM "{collection}"{where_sql}', params):
+            doc = self._to_dict(row)
+            value = doc.get(field)
+            if value is not None and predicate(doc):
+                counts[value] = counts.get(value, 0) + 1
+        return counts
+
+    def _to_dict(self, row):
+        doc = json.loads(row[1], object_hook=_decode_value)
+        doc['id'] = row[0]
+        return doc
+
+    # ---------- sync ----------
+
+    def start(self, db):
+        """Start following Firestore, once per process (safe to call per request)."""
+        pid = os.getpid()
+        if self._started_pid == pid:
+            return
+        with self._start_lock:
+            if self._started_pid == pid:
+                return
+            # Threads and listeners don't survive fork, start afresh in a worker
+            self._started_pid = pid
+            self._writer = None
+            self._listeners = {}
+            self._live = {}
+            self.leader = False
+            thread = threading.Thread(target=self._lead, args=(db,), name='read-replica', daemon=True)
+            thread.start()
+
+    def _lead(self, db):
+        lock_file = None
+        try:
+            if fcntl is not None:
+                # Blocks until no other worker on this host is writing
+                lock_file = open(self.path + '.lock', 'a')
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+
+            self._writer = self._connect()
+            with self._write_lock, self._writer:
+                self._writer.execute(
+                    'INSERT OR REPLACE INTO replica_leader (id, pid, started_at, heartbeat_at) VALUES (1, ?, ?, NULL)',
+                    (os.getpid(), time.time()))
+            self.leader = True
+            for collection in self.collections:
+                self._listen(db, collection)
+            print(f"Read replica syncing {', '.join(self.collections)} into {self.path}")
+        except Exception as e:
+            print(f"Warning: Read replica sync could not start - {e}")
+            self.leader = False
+            if lock_file is not None:
+                lock_file.close()
+            return
+        # The lock file stays open (and locked) for the life of the process
+        self._lock_file = lock_file
+
+        while True:
+            time.sleep(self.heartbeat_interval)
+            try:
+                self._heartbeat(db)
+            except Exception as e:
+                self.errors += 1
+                print(f"Read replica heartbeat error: {e}")
+
+    def _listen(self, db, collection):
+        self._live[collection] = False
+        self._listeners[collection] = db.collection(collection).on_snapshot(self._make_callback(collection))
+
+    def _heartbeat(self, db):
+        healthy = True
+        for collection, watch in list(self._listeners.items()):
+            # A listener that hit an unrecoverable error stops delivering snapshots
+            if not getattr(watch, 'is_active', True):
+                print(f"Read replica listener for {collection} stopped, restarting")
+                try:
+                    watch.unsubscribe()
+                except Exception:
+                    pass
+                self._listen(db, collection)
+            if not self._live.get(collection):
+                healthy = False
+        if healthy:
+            self._beat()
+
+    def _beat(self):
+        with self._write_lock, self._writer:
+            self._writer.execute('UPDATE replica_leader SET heartbeat_at = ? WHERE id = 1', (time.time(),))
+
+    def _make_callback(self, collection):
+        state = {'initial': True}
+
+        def on_snapshot(col_snapshot, changes, read_time):
+            try:
+                if state['initial']:
+                    self._apply(collection, [(doc, False) for doc in col_snapshot], replace=True)
+                    state['initial'] = False
+                    self._live[collection] = True
+                    if all(self._live.get(name) for name in self.collections):
+                        # Serve reads right away instead of after the next heartbeat
+                        self._beat()
+                else:
+                    self._apply(collection, [(change.document, change.type.name == 'REMOVED')
+                                             for change in changes])
+            except Exception as e:
+                self.errors += 1
+                print(f"Read replica listener error for {collection}: {e}")
+
+        return on_snapshot
+
+    def _row(self, collection, doc):
+        spec = self.collections[collection]
+        data = doc.to_dict() or {}
+        if spec.get('fields'):
+            data = {field: data[field] for field in spec['fields'] if field in data}
+        data.pop('id', None)
+        body = json.dumps(data, separators=(',', ':'), default=_encode_value)
+        return [doc.id, body] + [_column_value(data.get(column)) for column in spec['columns']]
+
+    def _apply(self, collection, docs, replace=False):
+        spec = self.collections[collection]
+        columns = ['id', 'doc'] + list(spec['columns'])
+        names = ', '.join(f'"{column}"' for column in columns)
+        placeholders = ', '.join('?' * len(columns))
+
+        upserts = [self._row(collection, doc) for doc, removed in docs if not removed]
+        removals = [(doc.id,) for doc, removed in docs if removed]
+
+        with self._write_lock, self._writer:
+            if replace:
+                self._writer.execute(f'DELETE FROM "{collection}"')
+            if upserts:
+                self._writer.executemany(
+                    f'INSERT OR REPLACE INTO "{collection}" ({names}) VALUES ({placeholders})', upserts)
+            if removals:
+                self._writer.executemany(f'DELETE FROM "{collection}" WHERE id = ?', removals)
+            now = time.time()
+            self._writer.execute(
+                'INSERT INTO replica_meta (collection, version, synced_at, snapshot_at) VALUES (?, 1, ?, ?) '
+                'ON CONFLICT(collection) DO UPDATE SET version = version + 1, synced_at = excluded.synced_at, '
+                'snapshot_at = excluded.snapshot_at',
+                (collection, now, now))
+        self.applied += len(docs)
+
+    def stats(self):
+        conn = self._reader()
+        meta = {row[0]: (row[1], row[2]) for row in
+                conn.execute('SELECT collection, version, synced_at FROM replica_meta')}
+        collections = {}
+        for collection in self.collections:
+            version, synced_at = meta.get(collection, (0, None))
+            collections[collection] = {
+                'rows': conn.execute(f'SELECT COUNT(*) FROM "{collection}"').fetchone()[0],
+                'version': version,
+                'seconds_since_change': round(time.time() - synced_at, 1) if synced_at else None
+            }
+        leader = conn.execute('SELECT pid, heartbeat_at FROM replica_leader WHERE id = 1').fetchone()
+        return {
+            'leader': self.leader,
+            'writer_pid': leader[0] if leader else None,
+            'seconds_since_heartbeat': round(time.time() - leader[1], 1) if leader and leader[1] else None,
+            'reads': self.reads,
+            'applied_changes': self.applied,
+            'errors': self.errors,
+            'collections': collections
+        }
+
+
+# ---------- repositories ----------
+
+def doc_to_dict(doc):
+    data = doc.to_dict() or {}
+    data['id'] = doc.id
+    return data
+
+
+class FirestoreBackend:
+    """Reads straight from Firestore, with the same methods and result
+    shapes (dicts carrying 'id') as SQLiteReplica."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def get(self, collection, doc_id):
+        doc = self.db.collection(collection).document(doc_id).get()
+        return doc_to_dict(doc) if doc.exists else None
+
+    def get_many(self, collection, doc_ids):
+        collection_ref = self.db.collection(collection)
+        refs = [collection_ref.document(doc_id) for doc_id in {doc_id for doc_id in doc_ids if doc_id}]
+        if not refs:
+            return {}
+        return {doc.id: doc_to_dict(doc) for doc in self.db.get_all(refs) if doc.exists}
+
+    def _query(self, collection, where, order_field, predicate, ranges):
+        """(query, predicate) for the filters.
+
+        Firestore orders by a range field first, so a range is only pushed
+        down on the order field (or when there is no order); any other is
+        checked in Python along with `predicate`.
+        """
+        query = self.db.collection(collection)
+        for field, value in (where or {}).items():
+            query = query.where(field, '==', value)
+
+        checks = []
+        for field, (low, high) in (ranges or {}).items():
+            if order_field in (None, field) and len(ranges) == 1:
+                if low is not None:
+                    query = query.where(field, '>=', low)
+                if high is not None:
+                    query = query.where(field, '<=', high)
+            else:
+                checks.append((field, low, high))
+        if not checks:
+            return query, predicate
+
+        def matches(data):
+            for field, low, high in checks:
+                value = data.get(field)
+                if not isinstance(value, (int, float)):
+                    return False
+                if (low is not None and value < low) or (high is not None and value > high):
+                    return False
+            return predicate is None or predicate(data)
+        return query, matches
+
+    def query(self, collection, where=None, order_field=None, descending=False,
+              limit=None, cursor=None, predicate=None, ranges=None):
+        """See SQLiteReplica.query(); pages through paginate_query()."""
+        if limit is None:
+            return list(self.scan(collection, where, order_field, descending, predicate, ranges)), None
+
+        query, predicate = self._query(collection, where, order_field, predicate, ranges)
+        docs, next_cursor = paginate_query(
+            self.db.collection(collection), query, limit, cursor,
+            order_field=order_field, descending=descending,
+            predicate=(lambda doc: predicate(doc_to_dict(doc))) if predicate else None
+        )
+        return [doc_to_dict(doc) for doc in docs], next_cursor
+
+    def scan(self, collection, where=None, order_field=None, descending=False, predicate=None, ranges=None):
+        query, predicate = self._query(collection, where, order_field, predicate, ranges)
+        if order_field:
+            query = query.order_by(order_field, direction='DESCENDING' if descending else 'ASCENDING')
+        for doc in query.stream():
+            data = doc_to_dict(doc)
+            if predicate is None or predicate(data):
+                yield data
+
+
+class Repository:
+    """Reads of one collection.
+
+    Served by the read replica while it holds a synced copy of the
+    collection and by Firestore otherwise, so callers don't need to know
+    which one answered. Writes still go through the Firestore client, where
+    they are batched with their counter and catalog updates.
+    """
+
+    def __init__(self, collection, firestore_backend, replica=None):
+        self.collection = collection
+        self.firestore = firestore_backend
+        self.replica = replica if replica is not None and collection in replica.collections else None
+
+    def local(self):
+        """The replica once it is synced for this collection, else None."""
+        if self.replica is None:
+            return None
+        try:
+            self.replica.start(self.firestore.db)
+            if self.replica.ready(self.collection):
+                return self.replica
+        except Exception as e:
+            print(f"Read replica unavailable for {self.collection}: {e}")
+        return None
+
+    def backend(self):
+        return self.local() or self.firestore
+
+    def version(self):
+        """Bumped on every replicated change, 0 without a replica."""
+        return self.replica.version(self.collection) if self.replica is not None else 0
+
+    def get(self, doc_id):
+        replica = self.local()
+        data = replica.get(self.collection, doc_id) if replica is not None else None
+        # A document written moments ago may not be replicated yet
+        return data if data is not None else self.firestore.get(self.collection, doc_id)
+
+    def get_many(self, doc_ids):
+        replica = self.local()
+        found = replica.get_many(self.collection, doc_ids) if replica is not None else {}
+        missing = [doc_id for doc_id in doc_ids if doc_id and doc_id not in found]
+        if missing:
+            found.update(self.firestore.get_many(self.collection, missing))
+        return found
+
+    def query(self, **kwargs):
+        return self.backend().query(self.collection, **kwargs)
+
+    def scan(self, **kwargs):
+        return self.backend().scan(self.collection, **kwargs)
+
+
+class Repositories:
+    """One Repository per collection the routes read."""
+
+    def __init__(self, db, replica=None):
+        self.firestore = FirestoreBackend(db)
+        self.replica = replica
+        self.words = self.repository('words')
+        self.songs = self.repository('songs')
+        self.products = self.repository('products')
+        self.catalog = self.repository(CATALOG_COLLECTION)
+        self.sellers = self.repository('sellers')
+        self.users = self.repository('users')
+
+    def repository(self, collection):
+        return Repository(collection, self.firestore, self.replica)
@@ -0,0 +1,97 @@
+import gzip
+import threading
+from datetime import datetime, timedelta, timezone
+
+import msgpack
+
+PACK_FORMAT = 1
+
+# Column order of each word row in the pack
+PACK_FIELDS = ('id', 'tai_khamyang', 'english', 'assamese', 'audio_path')
+
+# Word timestamps come from the clock of whichever worker wrote them, so a
+# delta re-sends at least this much history to cover clock skew between
+# workers (see delta_margin()). Re-sent words and tombstones are idempotent
+# on the client.
+CLOCK_SKEW = timedelta(minutes=5)
+
+# Tombstones are kept this long; older `since` values need a full pack
+DELETION_RETENTION = timedelta(days=180)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+def to_version(value):
+    """Timestamp -> integer version (microseconds since the epoch)."""
+    if not isinstance(value, datetime):
+        return 0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def from_version(version):
+    return EPOCH + timedelta(microseconds=version)
+
+
+def pack_version(words, deleted_at=()):
+    versions = [to_version(w.get('updated_at')) for w in words]
+    versions.extend(to_version(d) for d in deleted_at)
+    return max(versions, default=0)
+
+
+def delta_margin(max_staleness):
+    """How far before `since` a delta starts.
+
+    Packs are built from the word cache, which may lack another worker's
+    change for up to `max_staleness` seconds while already holding later
+    ones, so the margin covers that lag on top of clock skew.
+    """
+    return CLOCK_SKEW + timedelta(seconds=max_staleness)
+
+
+def build_delta(words, deletions, since, cutoff):
+    """Words changed after `cutoff`, the deleted word ids, and the version
+    the client moves to (never older than `since`).
+
+    `deletions` are the word_deletions documents deleted after `cutoff`.
+    """
+    cutoff_version = to_version(cutoff)
+    changed = [w for w in words if to_version(w.get('updated_at')) > cutoff_version]
+    version = max(since, pack_version(changed, [d['deleted_at'] for d in deletions]))
+    return changed, [d['word_id'] for d in deletions], version
+
+
+def encode_pack(words, deleted_ids, version, since=None):
+    """Serialize words (and tombstones) as gzip-compressed msgpack."""
+    payload = {
+        'format': PACK_FORMAT,
+        'version': version,
+        'since': since,
+        'fields': list(PACK_FIELDS),
+        'words': [[w.get(field) or '' for field in PACK_FIELDS] for w in words],
+        'deleted': list(deleted_ids)
+    }
+    return gzip.compress(msgpack.packb(payload, use_bin_type=True), compresslevel=6)
+
+
+class FullPackCache:
+    """The full pack, rebuilt only when the word cache generation changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._body = None
+        self._version = 0
+
+    def get(self, generation, words):
+        with self._lock:
+            if self._generation != generation:
+                self._version = pack_version(words)
+                self._body = encode_pack(words, [], self._version)
+                self._generation = generation
+            return self._body, self._version
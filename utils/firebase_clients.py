@@ -0,0 +1,83 @@
+import os
+import threading
+
+import firebase_admin
+from firebase_admin import credentials, firestore, storage
+from google.cloud.firestore import AsyncClient
+
+
+class FirebaseClients:
+    """Firebase app and Firestore/Storage clients, created on first use per process.
+
+    gRPC channels don't survive fork, so nothing is created at import time:
+    with `gunicorn --preload` the master imports the app without touching
+    Firebase and every worker builds its own clients on its first call.
+    Each process registers its own named firebase_admin app, so a client
+    cached by a parent process is never reused by a child.
+    """
+
+    def __init__(self, sdk_path, storage_bucket=None):
+        self.sdk_path = sdk_path
+        self.storage_bucket = storage_bucket
+        self._lock = threading.Lock()
+        self._pid = None
+        self._firestore = None
+        self._bucket = None
+        self._async_pid = None
+        self._async_firestore = None
+
+    def check(self):
+        """Validate the configuration without opening any connection."""
+        if not self.sdk_path:
+            raise ValueError("FIREBASE_ADMIN_SDK_PATH not found in environment variables")
+        if not os.path.exists(self.sdk_path):
+            raise FileNotFoundError(f"Firebase admin SDK file not found at {self.sdk_path}")
+
+    def _ensure(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self.check()
+            cred = credentials.Certificate(self.sdk_path)
+            app = firebase_admin.initialize_app(cred, {'storageBucket': self.storage_bucket},
+                                                name=f'process-{pid}')
+            self._firestore = firestore.client(app)
+            self._bucket = storage.bucket(app=app)
+            self._pid = pid
+            print(f"Firebase clients initialized in process {pid}")
+
+    def firestore(self):
+        self._ensure()
+        return self._firestore
+
+    def bucket(self):
+        self._ensure()
+        return self._bucket
+
+    def async_firestore(self):
+        """Firestore AsyncClient for the ASGI routes (one per process)."""
+        pid = os.getpid()
+        if self._async_pid != pid:
+            with self._lock:
+                if self._async_pid != pid:
+                    self.check()
+                    cred = credentials.Certificate(self.sdk_path)
+                    self._async_firestore = AsyncClient(project=cred.project_id, credentials=cred.get_credential())
+                    self._async_pid = pid
+        return self._async_firestore
+
+
+class LazyClient:
+    """Stands in for a client object and resolves it on every attribute access."""
+
+    def __init__(self, factory):
+        object.__setattr__(self, '_factory', factory)
+
+    def __getattr__(self, name):
+        return getattr(self._factory(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._factory(), name, value)
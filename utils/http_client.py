@@ -0,0 +1,48 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class UpstreamClient:
+    """Shared keep-alive HTTP client for fetching audio from storage.
+
+    One requests.Session per process, with a connection pool sized for the
+    number of request threads, so repeated fetches reuse the TCP+TLS
+    connection instead of opening a new one per request.
+    """
+
+    def __init__(self, pool_size=32, connect_timeout=5, read_timeout=30,
+                 min_chunk=16 * 1024, max_chunk=1024 * 1024):
+        self.timeout = (connect_timeout, read_timeout)
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=False)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, headers=None, stream=True):
+        return self.session.get(url, headers=headers, stream=stream, timeout=self.timeout)
+
+    def head(self, url, headers=None):
+        return self.session.head(url, headers=headers, allow_redirects=True, timeout=self.timeout)
+
+    def iter_chunks(self, response):
+        """Yield the response body in growing chunks.
+
+        The first read is small so the client gets its first bytes quickly,
+        then the chunk size doubles up to max_chunk, which keeps the Python
+        overhead per byte low for the rest of the transfer.
+        """
+        size = self.min_chunk
+        try:
+            while True:
+                chunk = response.raw.read(size, decode_content=True)
+                if not chunk:
+                    break
+                yield chunk
+                if size < self.max_chunk:
+                    size = min(size * 2, self.max_chunk)
+        finally:
+            # Returns the connection to the pool (or drops it if unread data remains)
+            response.close()
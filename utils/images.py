@@ -0,0 +1,99 @@
+import io
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow missing: uploads keep working, just without variants
+    Image = None
+
+from utils.process_pools import pool_context
+
+# Longest side in pixels for each derivative
+VARIANT_SIZES = {
+    'thumb': 320,
+    'medium': 800
+}
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg')
+}
+
+
+def available():
+    return Image is not None
+
+
+def make_variants(data, sizes=None, quality=80):
+    """Resize an image into the VARIANT_SIZES derivatives.
+
+    Runs in a worker process, so it only takes and returns plain bytes/dicts.
+    Returns {name: {'width', 'height', 'webp': bytes, 'jpeg': bytes}}.
+    """
+    sizes = sizes or VARIANT_SIZES
+    results = {}
+    with Image.open(io.BytesIO(data)) as source:
+        # Respect camera orientation before the EXIF data is dropped
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ('RGB', 'RGBA'):
+            has_alpha = source.mode in ('LA', 'PA') or 'transparency' in source.info
+            source = source.convert('RGBA' if has_alpha else 'RGB')
+
+        for name, max_side in sizes.items():
+            variant = source.copy()
+            variant.thumbnail((max_side, max_side), Image.LANCZOS)
+
+            webp = io.BytesIO()
+            variant.save(webp, 'WEBP', quality=quality, method=4)
+
+            # JPEG has no alpha, flatten transparent images onto white
+            if variant.mode == 'RGBA':
+                flat = Image.new('RGB', variant.size, (255, 255, 255))
+                flat.paste(variant, mask=variant.split()[3])
+                variant = flat
+            jpeg = io.BytesIO()
+            variant.save(jpeg, 'JPEG', quality=quality, optimize=True, progressive=True)
+
+            results[name] = {
+                'width': variant.width,
+                'height': variant.height,
+                'webp': webp.getvalue(),
+                'jpeg': jpeg.getvalue()
+            }
+    return results
+
+
+class ImageProcessor:
+    """Process pool for image resizing, created on first use.
+
+    Resizing is CPU bound, so it runs in separate processes where it can't
+    hold the GIL of the request threads. The pool is created lazily so each
+    gunicorn worker starts its own after fork. Its processes come from a
+    forkserver (spawn where that is unavailable), never a fork of the worker:
+    a forked copy of its live gRPC threads can deadlock.
+    """
+
+    def __init__(self, workers=2, timeout=30):
+        self.workers = workers
+        self.timeout = timeout
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=pool_context())
+            return self._pool
+
+    def variants(self, data):
+        """Return make_variants() output, or None if Pillow is unavailable."""
+        if not available():
+            return None
+        return self._get_pool().submit(make_variants, data).result(timeout=self.timeout)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
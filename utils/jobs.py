@@ -0,0 +1,206 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process runs the recovery itself
+    fcntl = None
+
+QUEUED = 'queued'
+RUNNING = 'running'
+RETRYING = 'retrying'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+# States a job is left in when the process running it goes away
+UNFINISHED = (QUEUED, RUNNING, RETRYING)
+
+# Lock files held by run_as_leader() for the life of the process
+_leader_locks = []
+
+
+class JobQueue:
+    """Background worker pool for slow, retryable work (e.g. song ingest).
+
+    A job is a handler plus a mutable `job` dict. The handler can record
+    progress in job['done'] so a retry skips steps that already succeeded.
+    Failed attempts are retried with exponential backoff; the retry is
+    scheduled on a timer so no worker thread sleeps. `on_update` is called
+    with stored_state() on every transition so it can be persisted (the
+    status endpoint may be served by another process), and so a job whose
+    process exited can be picked up again with resume().
+    """
+
+    def __init__(self, name, workers=2, max_attempts=5, base_delay=1.0, max_delay=60.0,
+                 on_update=None, on_failure=None):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.on_update = on_update
+        self.on_failure = on_failure
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'{name}-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, handler, data, job_id=None, done=None):
+        job = {
+            'id': job_id or str(uuid.uuid4()),
+            'status': QUEUED,
+            'attempts': 0,
+            'error': None,
+            'result': None,
+            'done': list(done or []),
+            'data': data,
+            'owner': process_owner(),
+            'created_at': time.time(),
+            'updated_at': time.time()
+        }
+        return self._enqueue(handler, job)
+
+    def resume(self, handler, state):
+        """Run a job again from its stored_state(), keeping its id, attempts
+        and completed steps."""
+        job = dict(state, status=QUEUED, error=None, owner=process_owner(), updated_at=time.time())
+        job['done'] = list(state.get('done') or [])
+        return self._enqueue(handler, job)
+
+    def _enqueue(self, handler, job):
+        with self._lock:
+            self._jobs[job['id']] = job
+        self._publish(job)
+        self._executor.submit(self._run, handler, job)
+        return job['id']
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return public_state(job) if job else None
+
+    def _run(self, handler, job):
+        job['attempts'] += 1
+        self._transition(job, RUNNING)
+        try:
+            job['result'] = handler(job)
+        except Exception as e:
+            job['error'] = str(e)
+            print(f"[{self.name}] Job {job['id']} attempt {job['attempts']} failed: {e}")
+
+            if job['attempts'] >= self.max_attempts:
+                self._transition(job, FAILED)
+                if self.on_failure:
+                    try:
+                        self.on_failure(job)
+                    except Exception as cleanup_error:
+                        print(f"[{self.name}] Cleanup for job {job['id']} failed: {cleanup_error}")
+                self._forget_later(job)
+                return
+
+            delay = min(self.base_delay * (2 ** (job['attempts'] - 1)), self.max_delay)
+            self._transition(job, RETRYING)
+            timer = threading.Timer(delay, lambda: self._executor.submit(self._run, handler, job))
+            timer.daemon = True
+            timer.start()
+            return
+
+        job['error'] = None
+        self._transition(job, SUCCEEDED)
+        self._forget_later(job)
+
+    def _transition(self, job, status):
+        job['status'] = status
+        job['updated_at'] = time.time()
+        self._publish(job)
+
+    def _publish(self, job):
+        if self.on_update is None:
+            return
+        try:
+            self.on_update(stored_state(job))
+        except Exception as e:
+            print(f"[{self.name}] Could not record state of job {job['id']}: {e}")
+
+    def _forget_later(self, job, after=600):
+        # Finished jobs stay queryable in memory for a while, then only in the store
+        def forget():
+            with self._lock:
+                self._jobs.pop(job['id'], None)
+        timer = threading.Timer(after, forget)
+        timer.daemon = True
+        timer.start()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def process_owner():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def is_orphaned(state, stale_after):
+    """Whether an unfinished stored job has lost the process running it.
+
+    A job owned by this host is orphaned once its process is gone. Other
+    hosts can't be checked, so their jobs count as orphaned when they have
+    not changed state for `stale_after` seconds.
+    """
+    if state.get('status') not in UNFINISHED:
+        return False
+    host, _, pid = (state.get('owner') or '').rpartition(':')
+    if host == socket.gethostname() and pid.isdigit():
+        return not _process_alive(int(pid))
+    return time.time() - (state.get('updated_at') or 0) > stale_after
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def run_as_leader(lock_path, target, name):
+    """Run `target` in a background thread once this process holds the
+    flock on `lock_path`.
+
+    The lock is kept for the life of the process, so exactly one process per
+    host runs it at a time, and another one takes over when it exits.
+    """
+    def lead():
+        try:
+            if fcntl is not None:
+                lock_file = open(lock_path, 'a')
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                _leader_locks.append(lock_file)
+            target()
+        except Exception as e:
+            print(f"[{name}] Leader task failed: {e}")
+
+    thread = threading.Thread(target=lead, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def stored_state(job):
+    """public_state() plus what resume() needs to run the job again."""
+    return dict(public_state(job), owner=job['owner'], done=list(job['done']), data=job['data'])
+
+
+def public_state(job):
+    return {
+        'id': job['id'],
+        'status': job['status'],
+        'attempts': job['attempts'],
+        'error': job['error'],
+        'result': job['result'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at']
+    }
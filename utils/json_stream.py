@@ -0,0 +1,55 @@
+from flask import Response, current_app, stream_with_context
+
+# Encoded elements are buffered up to this size before being sent, so small
+# documents don't each become their own write to the socket
+FLUSH_BYTES = 16 * 1024
+
+
+def iter_json_array(items, prefix='[', suffix=']'):
+    """Encode `items` as a JSON array one element at a time.
+
+    `items` can be any iterable (e.g. a Firestore .stream() generator), so
+    only the element being encoded and the current buffer are held in memory.
+    """
+    dumps = current_app.json.dumps
+    buffer = [prefix]
+    size = len(prefix)
+    first = True
+    try:
+        for item in items:
+            chunk = dumps(item) if first else ',' + dumps(item)
+            first = False
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= FLUSH_BYTES:
+                yield ''.join(buffer)
+                buffer = []
+                size = 0
+    except Exception as e:
+        # Headers are already sent; stop here and leave the body truncated so
+        # the client sees invalid JSON rather than a silently short list
+        print(f"Streaming JSON error: {e}")
+        if buffer:
+            yield ''.join(buffer)
+        return
+
+    buffer.append(suffix)
+    yield ''.join(buffer)
+
+
+def stream_json_array(items, key=None, extra=None):
+    """Streaming counterpart of jsonify(list) / jsonify({..., key: list}).
+
+    With `key` the array is wrapped in an object that also carries the
+    (small) `extra` fields, e.g. {'success': True, 'products': [...]}.
+    """
+    if key is None:
+        prefix, suffix = '[', ']'
+    else:
+        head = current_app.json.dumps(dict(extra or {}))
+        head = head[:-1] + (', ' if len(head) > 2 else '')
+        prefix = head + current_app.json.dumps(key) + ': ['
+        suffix = ']}'
+
+    return Response(stream_with_context(iter_json_array(items, prefix, suffix)),
+                    mimetype='application/json')
@@ -0,0 +1,468 @@
+import contextvars
+import threading
+import time
+
+# Default latency buckets (seconds), as in the Prometheus client libraries
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000, 100000000)
+DOCUMENT_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 100000)
+
+INF_LABEL = 'le="+Inf"'
+
+# Documents read by the current request, see begin_request_reads()
+_request_reads = contextvars.ContextVar('firestore_request_reads', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}']
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self, key, state):
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            le = f'le="{_format_value(float(bound))}"'
+            lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+        lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, INF_LABEL)} {count}')
+        lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}')
+        lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {count}')
+        return lines
+
+
+class AppMetrics:
+    """Request and Firestore/Storage metrics in the Prometheus text format.
+
+    Values are per process: with several gunicorn workers each one exposes
+    its own numbers, so scrape every worker or sum them in the dashboard.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+        self.requests = self._add(Counter(
+            'http_requests_total', 'HTTP requests handled.', ('method', 'route', 'status')))
+        self.request_duration = self._add(Histogram(
+            'http_request_duration_seconds', 'Time until the response was returned to the server.',
+            ('method', 'route')))
+        self.in_progress = self._add(Gauge(
+            'http_requests_in_progress', 'HTTP requests currently being handled.'))
+        self.response_size = self._add(Histogram(
+            'http_response_size_bytes', 'Response body size.', ('method', 'route'), buckets=SIZE_BUCKETS))
+        self.request_documents = self._add(Histogram(
+            'http_request_firestore_documents_read', 'Firestore documents read while handling a request.',
+            ('method', 'route'), buckets=DOCUMENT_BUCKETS))
+
+        self.firestore_operations = self._add(Counter(
+            'firestore_operations_total', 'Firestore calls.', ('collection', 'operation')))
+        self.firestore_duration = self._add(Histogram(
+            'firestore_operation_duration_seconds', 'Time spent waiting on Firestore calls.',
+            ('collection', 'operation')))
+        self.firestore_documents = self._add(Counter(
+            'firestore_documents_read_total', 'Documents returned by Firestore.', ('collection', 'operation')))
+        self.firestore_writes = self._add(Counter(
+            'firestore_writes_total', 'Document writes, including those in batches.', ('collection', 'operation')))
+        self.firestore_errors = self._add(Counter(
+            'firestore_errors_total', 'Firestore calls that raised.', ('collection', 'operation')))
+
+        self.storage_operations = self._add(Counter(
+            'storage_operations_total', 'Cloud Storage calls.', ('operation',)))
+        self.storage_duration = self._add(Histogram(
+            'storage_operation_duration_seconds', 'Time spent waiting on Cloud Storage calls.', ('operation',)))
+        self.storage_errors = self._add(Counter(
+            'storage_errors_total', 'Cloud Storage calls that raised.', ('operation',)))
+
+        self.hash_duration = self._add(Histogram(
+            'password_hash_duration_seconds', 'Time spent hashing or checking a password in the pool.',
+            ('operation',)))
+        self.hash_queue_wait = self._add(Histogram(
+            'password_hash_queue_wait_seconds', 'Time a password hash waited for a pool process.',
+            ('operation',)))
+
+        self.cache_lookups = self._add(Counter(
+            'cache_lookups_total', 'In-process cache lookups.', ('cache', 'result')))
+
+        self.cold_start = self._add(Gauge(
+            'app_cold_start_seconds', 'Time spent in each start-up phase of this process.', ('phase',)))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def observe_firestore(self, collection, operation, seconds, documents=0, error=False):
+        self.firestore_operations.inc(collection=collection, operation=operation)
+        self.firestore_duration.observe(seconds, collection=collection, operation=operation)
+        if documents:
+            self.firestore_documents.inc(documents, collection=collection, operation=operation)
+            reads = _request_reads.get()
+            if reads is not None:
+                reads[0] += documents
+        if error:
+            self.firestore_errors.inc(collection=collection, operation=operation)
+
+    def observe_storage(self, operation, seconds, error=False):
+        self.storage_operations.inc(operation=operation)
+        self.storage_duration.observe(seconds, operation=operation)
+        if error:
+            self.storage_errors.inc(operation=operation)
+
+
+def begin_request_reads():
+    """Start counting Firestore documents read by the current request."""
+    _request_reads.set([0])
+
+
+def request_reads():
+    reads = _request_reads.get()
+    return reads[0] if reads is not None else 0
+
+
+# ---------- Firestore / Storage wrappers ----------
+
+def _unwrap(value):
+    if isinstance(value, _Wrapper):
+        return value._target
+    if isinstance(value, dict):
+        return {k: _unwrap(v) for k, v in value.items()}
+    return value
+
+
+class _Wrapper:
+    """Delegates everything to the wrapped client object."""
+
+    def __init__(self, target, metrics, collection=None):
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_metrics', metrics)
+        object.__setattr__(self, '_collection', collection)
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+    def _call(self, operation, func, *args, **kwargs):
+        started = time.perf_counter()
+        error = False
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            self._observe(operation, time.perf_counter() - started, 0, error)
+
+    def _observe(self, operation, seconds, documents, error, collection=None):
+        self._metrics.observe_firestore(collection or self._collection, operation, seconds, documents, error)
+
+    def _stream(self, operation, iterator, collection=None):
+        # Only time spent waiting on Firestore counts, not the caller's work per document
+        waited = 0.0
+        documents = 0
+        error = False
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    doc = next(iterator)
+                except StopIteration:
+                    waited += time.perf_counter() - started
+                    return
+                waited += time.perf_counter() - started
+                documents += 1
+                yield doc
+        except Exception:
+            error = True
+            raise
+        finally:
+            self._observe(operation, waited, documents, error, collection)
+
+
+class InstrumentedFirestore(_Wrapper):
+    """Firestore client that records every call in AppMetrics."""
+
+    def __init__(self, client, metrics):
+        super().__init__(client, metrics, '*')
+
+    def collection(self, collection_id):
+        return _Collection(self._target.collection(collection_id), self._metrics, collection_id)
+
+    def batch(self):
+        return _Batch(self._target.batch(), self._metrics, '*')
+
+    def get_all(self, references, field_paths=None, **kwargs):
+        references = list(references)
+        collection = references[0]._collection if references and isinstance(references[0], _Wrapper) else '*'
+        iterator = iter(self._target.get_all([_unwrap(r) for r in references], field_paths=field_paths, **kwargs))
+        return self._stream('get_all', iterator, collection)
+
+
+class _Query(_Wrapper):
+    def _chain(self, method, *args, **kwargs):
+        args = [_unwrap(a) for a in args]
+        kwargs = {k: _unwrap(v) for k, v in kwargs.items()}
+        return _Query(getattr(self._target, method)(*args, **kwargs), self._metrics, self._collection)
+
+    def where(self, *args, **kwargs):
+        return self._chain('where', *args, **kwargs)
+
+    def order_by(self, *args, **kwargs):
+        return self._chain('order_by', *args, **kwargs)
+
+    def limit(self, *args, **kwargs):
+        return self._chain('limit', *args, **kwargs)
+
+    def offset(self, *args, **kwargs):
+        return self._chain('offset', *args, **kwargs)
+
+    def select(self, *args, **kwargs):
+        return self._chain('select', *args, **kwargs)
+
+    def start_after(self, *args, **kwargs):
+        return self._chain('start_after', *args, **kwargs)
+
+    def start_at(self, *args, **kwargs):
+        return self._chain('start_at', *args, **kwargs)
+
+    def end_before(self, *args, **kwargs):
+        return self._chain('end_before', *args, **kwargs)
+
+    def end_at(self, *args, **kwargs):
+        return self._chain('end_at', *args, **kwargs)
+
+    def count(self, *args, **kwargs):
+        return _Aggregation(self._target.count(*args, **kwargs), self._metrics, self._collection)
+
+    def stream(self, *args, **kwargs):
+        return self._stream('stream', iter(self._target.stream(*args, **kwargs)))
+
+    def get(self, *args, **kwargs):
+        return list(self.stream(*args, **kwargs))
+
+    def on_snapshot(self, callback):
+        self._metrics.firestore_operations.inc(collection=self._collection, operation='listen')
+        return self._target.on_snapshot(callback)
+
+
+class _Aggregation(_Wrapper):
+    def get(self, *args, **kwargs):
+        return self._call('count', self._target.get, *args, **kwargs)
+
+
+class _Collection(_Query):
+    def document(self, *args, **kwargs):
+        return _Document(self._target.document(*args, **kwargs), self._metrics, self._collection)
+
+    def add(self, *args, **kwargs):
+        self._metrics.firestore_writes.inc(collection=self._collection, operation='add')
+        return self._call('add', self._target.add, *args, **kwargs)
+
+
+class _Document(_Wrapper):
+    def get(self, *args, **kwargs):
+        started = time.perf_counter()
+        error = False
+        snapshot = None
+        try:
+            snapshot = self._target.get(*args, **kwargs)
+            return snapshot
+        except Exception:
+            error = True
+            raise
+        finally:
+            found = 1 if snapshot is not None and snapshot.exists else 0
+            self._observe('get', time.perf_counter() - started, found, error)
+
+    def _write(self, operation, *args, **kwargs):
+        self._metrics.firestore_writes.inc(collection=self._collection, operation=operation)
+        return self._call(operation, getattr(self._target, operation), *args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        return self._write('set', *args, **kwargs)
+
+    def create(self, *args, **kwargs):
+        return self._write('create', *args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        return self._write('update', *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._write('delete', *args, **kwargs)
+
+    def collection(self, collection_id):
+        return _Collection(self._target.collection(collection_id), self._metrics,
+                           f'{self._collection}/{collection_id}')
+
+
+class _Batch(_Wrapper):
+    def __init__(self, target, metrics, collection):
+        super().__init__(target, metrics, collection)
+        object.__setattr__(self, '_writes', [])
+
+    def _queue(self, operation, reference, *args, **kwargs):
+        collection = reference._collection if isinstance(reference, _Wrapper) else '*'
+        self._writes.append((collection, operation))
+        return getattr(self._target, operation)(_unwrap(reference), *args, **kwargs)
+
+    def set(self, reference, *args, **kwargs):
+        return self._queue('set', reference, *args, **kwargs)
+
+    def create(self, reference, *args, **kwargs):
+        return self._queue('create', reference, *args, **kwargs)
+
+    def update(self, reference, *args, **kwargs):
+        return self._queue('update', reference, *args, **kwargs)
+
+    def delete(self, reference, *args, **kwargs):
+        return self._queue('delete', reference, *args, **kwargs)
+
+    def commit(self, *args, **kwargs):
+        collections = {collection for collection, _ in self._writes}
+        object.__setattr__(self, '_collection', collections.pop() if len(collections) == 1 else '*')
+        for collection, operation in self._writes:
+            self._metrics.firestore_writes.inc(collection=collection, operation=operation)
+        self._writes.clear()
+        return self._call('commit', self._target.commit, *args, **kwargs)
+
+
+class InstrumentedBucket(_Wrapper):
+    """Storage bucket whose blobs record their calls in AppMetrics."""
+
+    def __init__(self, bucket, metrics):
+        super().__init__(bucket, metrics)
+
+    def blob(self, *args, **kwargs):
+        return _Blob(self._target.blob(*args, **kwargs), self._metrics)
+
+
+class _Blob(_Wrapper):
+    def _observe(self, operation, seconds, documents, error, collection=None):
+        self._metrics.observe_storage(operation, seconds, error)
+
+    def upload_from_file(self, *args, **kwargs):
+        return self._call('upload', self._target.upload_from_file, *args, **kwargs)
+
+    def upload_from_filename(self, *args, **kwargs):
+        return self._call('upload', self._target.upload_from_filename, *args, **kwargs)
+
+    def upload_from_string(self, *args, **kwargs):
+        return self._call('upload', self._target.upload_from_string, *args, **kwargs)
+
+    def download_as_bytes(self, *args, **kwargs):
+        return self._call('download', self._target.download_as_bytes, *args, **kwargs)
+
+    def download_to_filename(self, *args, **kwargs):
+        return self._call('download', self._target.download_to_filename, *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._call('delete', self._target.delete, *args, **kwargs)
+
+    def exists(self, *args, **kwargs):
+        return self._call('exists', self._target.exists, *args, **kwargs)
+
+    def reload(self, *args, **kwargs):
+        return self._call('reload', self._target.reload, *args, **kwargs)
+
+    def patch(self, *args, **kwargs):
+        return self._call('patch', self._target.patch, *args, **kwargs)
+
+    def make_public(self, *args, **kwargs):
+        return self._call('make_public', self._target.make_public, *args, **kwargs)
+
+    def generate_signed_url(self, *args, **kwargs):
+        return self._call('sign_url', self._target.generate_signed_url, *args, **kwargs)
+
+    def create_resumable_upload_session(self, *args, **kwargs):
+        return self._call('upload_session', self._target.create_resumable_upload_session, *args, **kwargs)
@@ -0,0 +1,125 @@
+import base64
+import json
+from datetime import datetime
+
+# Firestore's name for the document id in order_by / start_after
+DOCUMENT_ID = '__name__'
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# With a Python predicate, each round trip reads at least this many documents
+# so a selective filter doesn't cost one read per scanned document
+MIN_SCAN_BATCH = 50
+
+# Keys every paginate_query() cursor carries
+PAGE_CURSOR_KEYS = ('id',)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(data):
+    """Pack cursor state into an opaque, URL-safe token."""
+    raw = json.dumps(data, separators=(',', ':'), default=_encode_value).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, required=()):
+    """Unpack a cursor token; InvalidCursor when it is malformed or lacks
+    one of the `required` keys."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')), object_hook=_decode_value)
+    except Exception:
+        raise InvalidCursor('Invalid cursor')
+    if not isinstance(data, dict) or any(key not in data for key in required):
+        raise InvalidCursor('Invalid cursor')
+    if 'id' in data and not isinstance(data['id'], str):
+        raise InvalidCursor('Invalid cursor')
+    return data
+
+
+def _encode_value(value):
+    # Firestore timestamps come back as datetime subclasses
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+
+def _decode_value(obj):
+    if set(obj) == {'$dt'}:
+        return datetime.fromisoformat(obj['$dt'])
+    return obj
+
+
+def page_args(args, paginate_by_default=False, default_limit=DEFAULT_PAGE_SIZE,
+              cursor_keys=PAGE_CURSOR_KEYS):
+    """Read ?limit=&cursor= from the request args.
+
+    Returns (paginate, limit, cursor). Paging is switched on by passing a
+    `cursor` (empty for the first page) or, when the server paginates by
+    default, unless the client asks for the old full response with ?all=1.
+    A cursor without `cursor_keys` raises InvalidCursor.
+    """
+    if 'cursor' in args:
+        paginate = True
+    else:
+        paginate = paginate_by_default and args.get('all') != '1'
+
+    limit = args.get('limit', default_limit, type=int)
+    limit = min(max(limit or default_limit, 1), MAX_PAGE_SIZE)
+    cursor = decode_cursor(args.get('cursor', ''), required=cursor_keys) if paginate else None
+    return paginate, limit, cursor
+
+
+def paginate_query(collection_ref, query, limit, cursor=None, order_field=None,
+                   descending=False, predicate=None):
+    """Fetch one page of `query` with order_by + start_after.
+
+    Documents are ordered by `order_field` and then by document id so the
+    order is stable even when sort values repeat. `predicate` filters
+    documents in Python (e.g. text search); pages are topped up from
+    Firestore, MIN_SCAN_BATCH documents or more at a time, until `limit`
+    matching documents are found.
+
+    Returns (documents, next_cursor) where next_cursor is None on the last page.
+    """
+    direction = 'DESCENDING' if descending else 'ASCENDING'
+    if order_field:
+        query = query.order_by(order_field, direction=direction)
+    query = query.order_by(DOCUMENT_ID, direction=direction)
+
+    results = []
+    last = cursor
+    exhausted = False
+    while len(results) <= limit and not exhausted:
+        page_query = query
+        if last:
+            start = {DOCUMENT_ID: collection_ref.document(last['id'])}
+            if order_field:
+                start[order_field] = last.get('v')
+            page_query = page_query.start_after(start)
+
+        batch_size = max(limit + 1, MIN_SCAN_BATCH) if predicate else limit + 1
+        docs = list(page_query.limit(batch_size).stream())
+        exhausted = len(docs) < batch_size
+
+        for doc in docs:
+            last = {'id': doc.id}
+            if order_field:
+                last['v'] = doc.get(order_field)
+            if predicate is None or predicate(doc):
+                results.append(doc)
+
+    if len(results) > limit:
+        results = results[:limit]
+        tail = results[-1]
+        next_cursor = {'id': tail.id}
+        if order_field:
+            next_cursor['v'] = tail.get(order_field)
+        return results, encode_cursor(next_cursor)
+    return results, None
@@ -0,0 +1,122 @@
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from utils.process_pools import pool_context
+
+
+class HashPoolBusy(Exception):
+    """Raised when too many hashes are already waiting for the pool, or the
+    pool could not answer in time."""
+
+
+class PasswordHasher:
+    """Bounded process pool for password hashing.
+
+    Hashing is deliberately slow and CPU bound. Running it in a small process
+    pool keeps a signup burst from holding every request thread's GIL, and the
+    queue limit makes auth requests fail fast (the routes answer 503) instead
+    of piling up behind the pool while cheap reads starve.
+    """
+
+    def __init__(self, workers=2, max_queue=32, timeout=10, metrics=None):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        # AppMetrics that records hash time and queue wait per operation
+        self.metrics = metrics
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.hash_time_total = 0.0
+        self.max_queue_wait = 0.0
+
+    def _get_pool(self):
+        # Created on first use so every gunicorn worker gets its own pool after fork,
+        # with processes started by a forkserver rather than forked from the worker
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=pool_context())
+        return self._pool
+
+    def _run(self, operation, func, *args):
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self.rejected += 1
+                raise HashPoolBusy('Too many sign-in requests, please retry shortly')
+            self._pending += 1
+            pool = self._get_pool()
+
+        submitted = time.perf_counter()
+        try:
+            future = pool.submit(_timed, func, *args)
+        except BrokenProcessPool:
+            self._release()
+            self._discard(pool)
+            raise HashPoolBusy('Sign-in is temporarily unavailable, please retry shortly')
+        # A hash we stop waiting for still occupies the pool, so it stays
+        # pending until it actually finishes
+        future.add_done_callback(lambda _: self._release())
+        try:
+            result, hash_seconds = future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HashPoolBusy('Too many sign-in requests, please retry shortly')
+        except BrokenProcessPool:
+            self._discard(pool)
+            raise HashPoolBusy('Sign-in is temporarily unavailable, please retry shortly')
+
+        total = time.perf_counter() - submitted
+        wait = max(total - hash_seconds, 0.0)
+        with self._lock:
+            self.completed += 1
+            self.hash_time_total += hash_seconds
+            self.queue_wait_total += wait
+            self.max_queue_wait = max(self.max_queue_wait, wait)
+        if self.metrics is not None:
+            self.metrics.hash_duration.observe(hash_seconds, operation=operation)
+            self.metrics.hash_queue_wait.observe(wait, operation=operation)
+        return result
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def _discard(self, pool):
+        # A worker died; the next hash starts a fresh pool
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def generate(self, password):
+        return self._run('generate', generate_password_hash, password)
+
+    def check(self, pwhash, password):
+        return self._run('check', check_password_hash, pwhash, password)
+
+    def stats(self):
+        completed = self.completed
+        return {
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'pending': self._pending,
+            'completed': completed,
+            'rejected': self.rejected,
+            'avg_hash_seconds': round(self.hash_time_total / completed, 4) if completed else 0.0,
+            'avg_queue_wait_seconds': round(self.queue_wait_total / completed, 4) if completed else 0.0,
+            'max_queue_wait_seconds': round(self.max_queue_wait, 4)
+        }
+
+
+def _timed(func, *args):
+    # Runs in the worker process; reports its own time so queue wait can be derived
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
@@ -0,0 +1,12 @@
+import multiprocessing
+
+
+def pool_context():
+    """Start method for the app's process pools.
+
+    Pool processes come from a forkserver (spawn where that is unavailable),
+    never a fork of the worker: a forked copy of its live gRPC threads can
+    deadlock.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
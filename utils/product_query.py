@@ -0,0 +1,143 @@
+from utils.word_search import normalize
+
+# Categories offered by the shop; facet counts are reported for each of them
+PRODUCT_CATEGORIES = ('women', 'men', 'accessories', 'jewelry')
+
+# ?sort= value -> (order field, descending). name / created_at are the older
+# ?sort_by= values and keep working.
+PRODUCT_SORTS = {
+    'price': ('price', False),
+    'price_desc': ('price', True),
+    'newest': ('created_at', True),
+    'created_at': ('created_at', True),
+    'name': ('name', False)
+}
+
+# Fields matched by ?q=, as the shop page searched them in the browser
+SEARCH_FIELDS = ('name', 'description', 'category')
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+def _price_arg(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise InvalidQuery(f'{name} must be a number')
+
+
+class ProductQuery:
+    """Filters, sort and text search of a /api/products request.
+
+    `category` and the price range are executed as indexed filters (SQLite
+    replica columns or Firestore composite indexes). Categories are stored
+    normalize()d by the product write routes, so `category` is compared in
+    that form. `q` is a substring match on SEARCH_FIELDS and is applied as
+    a predicate while paging.
+    """
+
+    def __init__(self, category=None, min_price=None, max_price=None, q='', sort=None):
+        if sort is not None and sort not in PRODUCT_SORTS:
+            raise InvalidQuery(f"sort must be one of {', '.join(PRODUCT_SORTS)}")
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise InvalidQuery('min_price must not be greater than max_price')
+        self.category = normalize(category) or None
+        self.min_price = min_price
+        self.max_price = max_price
+        self.q = normalize(q)
+        self.sort = sort
+
+    @classmethod
+    def from_args(cls, args):
+        category = args.get('category')
+        if category == 'all':
+            category = None
+        return cls(
+            category=category,
+            min_price=_price_arg(args, 'min_price'),
+            max_price=_price_arg(args, 'max_price'),
+            q=args.get('q', ''),
+            sort=args.get('sort') or args.get('sort_by') or None
+        )
+
+    @property
+    def order_field(self):
+        if self.sort:
+            return PRODUCT_SORTS[self.sort][0]
+        # Firestore orders by the range field first; the replica follows suit
+        # so a cursor means the same thing on either path
+        return 'price' if self.has_price_range else None
+
+    @property
+    def descending(self):
+        return PRODUCT_SORTS[self.sort][1] if self.sort else False
+
+    @property
+    def has_price_range(self):
+        return self.min_price is not None or self.max_price is not None
+
+    def where(self, include_category=True):
+        """Equality filters for SQLiteReplica.query()."""
+        where = {'status': 'active'}
+        if include_category and self.category:
+            where['category'] = self.category
+        return where
+
+    def ranges(self):
+        """Range filters for SQLiteReplica.query()."""
+        return {'price': (self.min_price, self.max_price)} if self.has_price_range else None
+
+    def matches_text(self, product_data):
+        if not self.q:
+            return True
+        return any(self.q in normalize(product_data.get(field)) for field in SEARCH_FIELDS)
+
+    def in_price_range(self, product_data):
+        price = product_data.get('price')
+        if not isinstance(price, (int, float)):
+            return False
+        if self.min_price is not None and price < self.min_price:
+            return False
+        if self.max_price is not None and price > self.max_price:
+            return False
+        return True
+
+    def predicate(self, price_in_query=True):
+        """Filter for the conditions not executed by the query, or None."""
+        check_price = self.has_price_range and not price_in_query
+        if not self.q and not check_price:
+            return None
+
+        def matches(product_data):
+            if check_price and not self.in_price_range(product_data):
+                return False
+            return self.matches_text(product_data)
+        return matches
+
+    def firestore_query(self, collection_ref, include_category=True, price_in_query=True):
+        """Indexed Firestore query for the filters.
+
+        Needs composite indexes on (status, category, <sort field>) and
+        (status, <sort field>), listed in firestore.indexes.json. A price range can only be pushed down when
+        results are ordered by price, as Firestore orders by the range field
+        first; otherwise it is left to in_price_range().
+        """
+        query = collection_ref.where('status', '==', 'active')
+        if include_category and self.category:
+            query = query.where('category', '==', self.category)
+        if price_in_query:
+            if self.min_price is not None:
+                query = query.where('price', '>=', self.min_price)
+            if self.max_price is not None:
+                query = query.where('price', '<=', self.max_price)
+        return query
+
+
+def empty_facets():
+    return {category: 0 for category in PRODUCT_CATEGORIES}
+
@@ -0,0 +1,105 @@
+import hashlib
+import threading
+from collections import namedtuple
+from functools import wraps
+
+from cachetools import TTLCache
+from flask import Response, request
+
+CachedBody = namedtuple('CachedBody', ['version', 'etag', 'body', 'mimetype', 'headers'])
+
+
+def make_etag(body):
+    # Content hash, so every worker computes the same tag for the same payload
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def uncacheable(response):
+    """Mark a response (typically an error fallback) as never to be cached."""
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+class ResponseCache:
+    """Serialized JSON bodies of catalog GET endpoints, keyed by data version.
+
+    Each named dataset ('words', 'songs', 'products') has a version that the
+    write routes bump. A body is serialized once per (URL, version) and served
+    with a strong ETag; a matching If-None-Match gets a 304 without calling the
+    view at all. Entries also expire after `ttl` seconds, which bounds how long
+    a worker can serve data another worker has since changed.
+    """
+
+    def __init__(self, maxsize=512, ttl=60):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def version(self, name):
+        return self._versions.get(name, 0)
+
+    def bump(self, name):
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+    def lookup(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def store(self, key, version, body, mimetype, headers=None):
+        entry = CachedBody(version, make_etag(body), body, mimetype, headers or {})
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def conditional(self, name, version_fn=None):
+        """Decorator adding ETag / If-None-Match handling to a JSON GET view."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = (name, request.full_path)
+                try:
+                    version = version_fn() if version_fn else self.version(name)
+                except Exception as e:
+                    print(f"Response cache version lookup failed for {name}: {e}")
+                    return view(*args, **kwargs)
+
+                entry = self.lookup(key, version)
+                if entry is None:
+                    response = view(*args, **kwargs)
+                    if not isinstance(response, Response) or response.status_code != 200 \
+                            or response.is_streamed \
+                            or response.headers.get('Cache-Control') == 'no-store':
+                        return response
+                    # Keep custom headers such as X-Total-Count with the body
+                    headers = {k: v for k, v in response.headers.items() if k.startswith('X-')}
+                    entry = self.store(key, version, response.get_data(), response.mimetype, headers)
+
+                if request.if_none_match.contains_weak(entry.etag):
+                    with self._lock:
+                        self.not_modified += 1
+                    response = Response(status=304)
+                else:
+                    response = Response(entry.body, mimetype=entry.mimetype, headers=entry.headers)
+                response.set_etag(entry.etag)
+                response.headers['Cache-Control'] = 'no-cache'
+                return response
+            return wrapper
+        return decorator
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'size': len(self._entries),
+            'versions': dict(self._versions)
+        }
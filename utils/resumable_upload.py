@@ -0,0 +1,90 @@
+import re
+
+# Cloud Storage requires every chunk except the last to be a multiple of 256 KiB
+CHUNK_ALIGNMENT = 256 * 1024
+
+_RANGE_RE = re.compile(r'bytes=0-(\d+)')
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _committed_offset(response):
+    # 308 Resume Incomplete carries "Range: bytes=0-N" for what was persisted;
+    # no Range header means nothing has been stored yet
+    match = _RANGE_RE.match(response.headers.get('Range', ''))
+    return int(match.group(1)) + 1 if match else 0
+
+
+def put_chunk(http, session_url, stream, offset, length, total, timeout=None):
+    """Stream one chunk of the request body into a resumable upload session.
+
+    `stream` is read directly by the HTTP client, so the chunk is never held
+    in memory or written to disk here. Returns (committed_offset, complete).
+    """
+    if length <= 0:
+        raise UploadError('Empty chunk')
+    end = offset + length - 1
+    if end >= total:
+        raise UploadError('Chunk runs past the declared file size')
+    if end + 1 < total and length % CHUNK_ALIGNMENT:
+        raise UploadError(f'Chunks must be a multiple of {CHUNK_ALIGNMENT} bytes except the last one')
+
+    response = http.put(
+        session_url,
+        data=stream,
+        headers={
+            'Content-Length': str(length),
+            'Content-Range': f'bytes {offset}-{end}/{total}'
+        },
+        timeout=timeout
+    )
+    try:
+        if response.status_code in (200, 201):
+            return total, True
+        if response.status_code == 308:
+            return _committed_offset(response), False
+        if response.status_code in (404, 410):
+            raise UploadError('Upload session expired, start a new upload', status=410)
+        raise UploadError(f'Storage rejected chunk: HTTP {response.status_code}', status=502)
+    finally:
+        response.close()
+
+
+def cancel_session(http, session_url, timeout=None):
+    """Discard a resumable upload session and the bytes it holds.
+
+    Returns False when storage reports an unexpected status.
+    """
+    response = http.delete(session_url, headers={'Content-Length': '0'}, timeout=timeout)
+    try:
+        # 499 is Cloud Storage's answer to a cancelled session; 404/410 means it already expired
+        return response.status_code in (200, 204, 404, 410, 499)
+    finally:
+        response.close()
+
+
+def query_offset(http, session_url, total, timeout=None):
+    """Ask the storage session how many bytes it has persisted.
+
+    Returns (committed_offset, complete).
+    """
+    response = http.put(
+        session_url,
+        data=b'',
+        headers={'Content-Length': '0', 'Content-Range': f'bytes */{total}'},
+        timeout=timeout
+    )
+    try:
+        if response.status_code in (200, 201):
+            return total, True
+        if response.status_code == 308:
+            return _committed_offset(response), False
+        if response.status_code in (404, 410):
+            raise UploadError('Upload session expired, start a new upload', status=410)
+        raise UploadError(f'Storage status check failed: HTTP {response.status_code}', status=502)
+    finally:
+        response.close()
@@ -0,0 +1,87 @@
+import threading
+
+from cachetools import TTLCache
+
+# Fields of a seller document that are shown with a product
+SELLER_INFO_FIELDS = ('business_name', 'whatsapp', 'phone')
+
+UNKNOWN_SELLER = {
+    'business_name': 'Unknown Seller',
+    'whatsapp': '',
+    'phone': ''
+}
+
+# Cached for seller ids that have no document, so they are not re-fetched
+_MISSING = object()
+
+
+def seller_info_from_dict(seller_data):
+    return {
+        'business_name': seller_data.get('business_name', 'Unknown Seller'),
+        'whatsapp': seller_data.get('whatsapp', ''),
+        'phone': seller_data.get('phone', '')
+    }
+
+
+class SellerCache:
+    """TTL + LRU cache of the public seller info joined onto products.
+
+    Misses are fetched together with one batched get_all() call, so joining a
+    page of products costs at most one Firestore round-trip.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, db, seller_ids):
+        """Return {seller_id: seller_info or None} for the given ids."""
+        result = {}
+        missing = []
+        with self._lock:
+            for seller_id in set(seller_ids):
+                if not seller_id:
+                    continue
+                cached = self._cache.get(seller_id)
+                if cached is None:
+                    missing.append(seller_id)
+                else:
+                    result[seller_id] = None if cached is _MISSING else cached
+            self.hits += len(result)
+            self.misses += len(missing)
+
+        if missing:
+            sellers_ref = db.collection('sellers')
+            refs = [sellers_ref.document(seller_id) for seller_id in missing]
+            fetched = {}
+            for seller_doc in db.get_all(refs, field_paths=list(SELLER_INFO_FIELDS)):
+                fetched[seller_doc.id] = seller_info_from_dict(seller_doc.to_dict()) if seller_doc.exists else None
+
+            with self._lock:
+                for seller_id in missing:
+                    info = fetched.get(seller_id)
+                    self._cache[seller_id] = _MISSING if info is None else info
+                    result[seller_id] = info
+
+        return result
+
+    def get(self, db, seller_id):
+        return self.get_many(db, [seller_id]).get(seller_id)
+
+    def invalidate(self, seller_id=None):
+        with self._lock:
+            if seller_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(seller_id, None)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._cache),
+            'maxsize': self._cache.maxsize,
+            'ttl': self._cache.ttl
+        }
@@ -0,0 +1,74 @@
+import threading
+import time
+from datetime import timedelta
+
+from cachetools import TTLCache
+
+
+class SignedUrlCache:
+    """Short-lived V4 signed URLs, minted once per object per TTL window.
+
+    Signing is an RSA operation (or an IAM round-trip on keyless
+    credentials), so a URL is reused until `refresh_margin` seconds before
+    it expires. A URL handed out is therefore valid for at least that long.
+    Keys include the object generation, so replacing a song's audio never
+    serves a URL for the old object.
+    """
+
+    def __init__(self, ttl=900, refresh_margin=120, maxsize=4096):
+        if refresh_margin >= ttl:
+            raise ValueError('refresh_margin must be shorter than ttl')
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl - refresh_margin)
+        self._lock = threading.Lock()
+        self._minting = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.signs = 0
+        self.sign_time_total = 0.0
+
+    def get(self, bucket, file_path, generation=None):
+        key = (file_path, generation)
+        with self._lock:
+            url = self._cache.get(key)
+            if url is not None:
+                self.hits += 1
+                return url
+            self.misses += 1
+            # Concurrent misses for one object wait for a single signature
+            key_lock = self._minting.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                url = self._cache.get(key)
+            if url is None:
+                url = self._sign(bucket, file_path, generation)
+                with self._lock:
+                    self._cache[key] = url
+        with self._lock:
+            self._minting.pop(key, None)
+        return url
+
+    def _sign(self, bucket, file_path, generation):
+        started = time.perf_counter()
+        url = bucket.blob(file_path, generation=generation).generate_signed_url(
+            version='v4',
+            expiration=timedelta(seconds=self.ttl),
+            method='GET'
+        )
+        with self._lock:
+            self.signs += 1
+            self.sign_time_total += time.perf_counter() - started
+        return url
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'signs': self.signs,
+            'avg_sign_seconds': round(self.sign_time_total / self.signs, 4) if self.signs else 0.0,
+            'size': len(self._cache),
+            'ttl': self.ttl
+        }
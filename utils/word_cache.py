@@ -0,0 +1,284 @@
+import bisect
+import threading
+import time
+
+from utils.word_search import WordSearchIndex
+
+# Fields the dictionary can be sorted by (same keys get_words accepts)
+SORT_KEYS = ('tai_khamyang', 'english', 'assamese')
+
+# Stats counters that are also exported as cache_lookups_total results
+LOOKUP_RESULTS = {'hits': 'hit', 'misses': 'miss'}
+
+
+def _sort_value(word, key):
+    return (word.get(key) or '').lower()
+
+
+def _sort_key(word, key):
+    # Document id breaks ties so the order (and page cursors) are stable
+    return _sort_value(word, key), word['id']
+
+
+class WordCache:
+    """Per-process snapshot of the whole `words` collection.
+
+    The snapshot holds the word list pre-sorted for every key in SORT_KEYS so
+    a dictionary read is just a dict lookup, plus a WordSearchIndex for the
+    search box. It is kept fresh by a Firestore on_snapshot listener and, when
+    neither a reload nor a listener callback happened in the last
+    `max_staleness` seconds (no listener, or one that went quiet or failed),
+    by reloading. Admin write routes apply their change with upsert()/remove().
+    """
+
+    def __init__(self, max_staleness=300, use_listener=True, listener_timeout=10, metrics=None):
+        self.max_staleness = max_staleness
+        self.use_listener = use_listener
+        self.listener_timeout = listener_timeout
+        # AppMetrics to report hits and misses to, as cache_lookups_total{cache="words"}
+        self.metrics = metrics
+
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._last_event = 0.0
+        self._listener = None
+        self._listener_ready = threading.Event()
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.reloads = 0
+
+    # ---------- reads ----------
+
+    def get(self, collection_ref):
+        """Return the current snapshot, loading it from Firestore on a miss."""
+        snapshot = self._snapshot
+        if snapshot is not None and self._is_fresh():
+            self._count('hits')
+            return snapshot
+
+        self._count('misses')
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            if self._snapshot is not None and self._is_fresh():
+                return self._snapshot
+
+            listener = self._listener
+            if listener is not None and not getattr(listener, 'is_active', True):
+                self.stop_listener()
+
+            if self.use_listener and self._listener is None:
+                self._start_listener(collection_ref)
+                if self._snapshot is not None and self._is_fresh():
+                    return self._snapshot
+
+            self._install(collection_ref.stream())
+            return self._snapshot
+
+    def sorted_words(self, collection_ref, sort_by):
+        snapshot = self.get(collection_ref)
+        return snapshot['by_sort'].get(sort_by, snapshot['words'])
+
+    def page(self, collection_ref, sort_by, limit, after=None):
+        """Return up to `limit` words sorted by `sort_by` that come after the
+        (sort value, id) position `after`, plus the position of the last one
+        when more words follow.
+        """
+        snapshot = self.get(collection_ref)
+        words = snapshot['by_sort'][sort_by]
+        start = bisect.bisect_right(snapshot['keys'][sort_by], tuple(after)) if after else 0
+        page = words[start:start + limit]
+        has_more = start + limit < len(words)
+        return page, (_sort_key(page[-1], sort_by) if page and has_more else None)
+
+    def search(self, collection_ref, query, sort_by, limit=None, offset=0):
+        """Ranked search, returns (total_matches, page_of_words).
+
+        Exact matches come first, then prefix, then substring matches; ties
+        are ordered by `sort_by`.
+        """
+        snapshot = self.get(collection_ref)
+        by_id = snapshot['by_id']
+        matches = [(rank, by_id[word_id]) for rank, word_id in snapshot['index'].search(query)
+                   if word_id in by_id]
+        matches.sort(key=lambda m: (m[0],) + _sort_key(m[1], sort_by))
+
+        end = None if limit is None else offset + limit
+        return len(matches), [word for _, word in matches[offset:end]]
+
+    def _is_fresh(self):
+        # A live listener pushes every change, but a quiet or broken one looks
+        # the same, so its last callback is held to the same bound as a reload
+        last_update = max(self._loaded_at, self._last_event) if self._listener is not None else self._loaded_at
+        return (time.monotonic() - last_update) < self.max_staleness
+
+    # ---------- writes ----------
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._loaded_at = 0.0
+        self._count('invalidations')
+
+    def upsert(self, word_id, word_data, merge=False):
+        """Add or replace a single word without reloading the collection.
+
+        With merge=True the fields are applied on top of the cached word, the
+        same way a Firestore update() would.
+        """
+        self.apply([(word_id, word_data)], merge=merge)
+
+    def remove(self, word_id):
+        self.apply(removals=[word_id])
+
+    def apply(self, upserts=(), removals=(), merge=False):
+        """Apply a set of changed and removed words as one new snapshot.
+
+        The current snapshot and its search index are left untouched, so a
+        reader holding it never sees a partly applied change.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return
+            by_id = dict(snapshot['by_id'])
+            index = None
+
+            for word_id in removals:
+                if by_id.pop(word_id, None) is None:
+                    continue
+                index = index or snapshot['index'].copy()
+                index.remove(word_id)
+
+            for word_id, word_data in upserts:
+                if merge:
+                    word_data = dict(by_id.get(word_id, {}), **word_data)
+                word_data = dict(word_data, id=word_id)
+                by_id[word_id] = word_data
+                index = index or snapshot['index'].copy()
+                index.upsert(word_id, word_data)
+
+            if index is not None:
+                self._swap(list(by_id.values()), index)
+
+    def _install(self, docs):
+        words = []
+        for doc in docs:
+            word_data = doc.to_dict()
+            word_data['id'] = doc.id
+            words.append(word_data)
+
+        index = WordSearchIndex()
+        index.build(words)
+        self._swap(words, index)
+        self._loaded_at = time.monotonic()
+        self._count('reloads')
+
+    def generation(self, collection_ref):
+        """Version of the current snapshot, bumped on every change."""
+        return self.get(collection_ref)['generation']
+
+    def _swap(self, words, index):
+        by_sort = {key: sorted(words, key=lambda w, k=key: _sort_key(w, k)) for key in SORT_KEYS}
+
+        # Swap in a whole new snapshot so readers never see a half-built one
+        self._generation += 1
+        self._snapshot = {
+            'generation': self._generation,
+            'words': words,
+            'by_id': {w['id']: w for w in words},
+            'by_sort': by_sort,
+            'keys': {key: [_sort_key(w, key) for w in by_sort[key]] for key in SORT_KEYS},
+            'index': index
+        }
+
+    # ---------- snapshot listener ----------
+
+    def _start_listener(self, collection_ref):
+        def on_snapshot(col_snapshot, changes, read_time):
+            self._last_event = time.monotonic()
+            try:
+                if not self._listener_ready.is_set() or self._snapshot is None:
+                    self._install(col_snapshot)
+                    self._listener_ready.set()
+                    return
+
+                # After the initial snapshot only apply the changed documents,
+                # all of them in one swap
+                upserts = []
+                removals = []
+                for change in changes:
+                    doc = change.document
+                    if change.type.name == 'REMOVED':
+                        removals.append(doc.id)
+                    else:
+                        upserts.append((doc.id, doc.to_dict()))
+                self.apply(upserts, removals)
+            except Exception as e:
+                print(f"Word cache listener error: {e}")
+                # The cache may have missed this change; drop the listener so
+                # the next read reloads and subscribes again
+                self._detach_listener()
+
+        try:
+            self._listener = collection_ref.on_snapshot(on_snapshot)
+        except Exception as e:
+            print(f"Warning: Could not start word cache listener - {e}")
+            self._listener = None
+            self.use_listener = False
+            return
+
+        # Wait for the initial snapshot so the first request is served from it
+        if not self._listener_ready.wait(self.listener_timeout):
+            print("Warning: Word cache listener did not deliver an initial snapshot in time")
+
+    def stop_listener(self):
+        listener = self._listener
+        self._listener = None
+        self._listener_ready.clear()
+        if listener is not None:
+            self._unsubscribe(listener)
+
+    def _detach_listener(self):
+        listener = self._listener
+        self._listener = None
+        self._listener_ready.clear()
+        self._loaded_at = 0.0
+        if listener is not None:
+            # unsubscribe() joins the watch thread, which this callback runs on
+            threading.Thread(target=self._unsubscribe, args=(listener,), daemon=True).start()
+
+    @staticmethod
+    def _unsubscribe(listener):
+        try:
+            listener.unsubscribe()
+        except Exception as e:
+            print(f"Warning: Could not stop word cache listener - {e}")
+
+    # ---------- metrics ----------
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+        if self.metrics is not None and name in LOOKUP_RESULTS:
+            self.metrics.cache_lookups.inc(cache='words', result=LOOKUP_RESULTS[name])
+
+    def stats(self):
+        snapshot = self._snapshot
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'reloads': self.reloads,
+            'size': len(snapshot['words']) if snapshot else 0,
+            'age_seconds': round(time.monotonic() - self._loaded_at, 3) if snapshot else None,
+            'max_staleness': self.max_staleness,
+            'listener_active': self._listener is not None,
+            'seconds_since_listener_event': round(time.monotonic() - self._last_event, 3) if self._last_event else None
+        }
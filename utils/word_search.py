@@ -0,0 +1,139 @@
+import threading
+import unicodedata
+
+# Fields of a word document that are searchable
+SEARCH_FIELDS = ('tai_khamyang', 'english', 'assamese')
+
+# Match ranks, lower is better
+RANK_EXACT = 0
+RANK_PREFIX = 1
+RANK_SUBSTRING = 2
+
+GRAM_SIZE = 3
+
+
+def normalize(text):
+    # NFC first so Tai Khamyang / Assamese combining marks compare the same
+    # way no matter how they were typed, then casefold for the Latin fields
+    if not text:
+        return ''
+    return unicodedata.normalize('NFC', str(text)).casefold().strip()
+
+
+def grams(text):
+    """All 1..GRAM_SIZE character n-grams of an already normalized string.
+
+    Short grams are indexed too so one and two character queries are a
+    single posting lookup instead of a scan.
+    """
+    result = set()
+    for size in range(1, GRAM_SIZE + 1):
+        for i in range(len(text) - size + 1):
+            result.add(text[i:i + size])
+    return result
+
+
+def query_grams(query):
+    if len(query) <= GRAM_SIZE:
+        return {query}
+    return {query[i:i + GRAM_SIZE] for i in range(len(query) - GRAM_SIZE + 1)}
+
+
+class WordSearchIndex:
+    """Character n-gram inverted index over the dictionary fields.
+
+    Postings map an n-gram to the ids of words containing it in any field.
+    A search intersects the postings of the query grams (smallest first) and
+    only verifies and ranks the surviving candidates, so the cost follows the
+    number of matches rather than the size of the dictionary.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}
+        self._fields = {}
+
+    def __len__(self):
+        return len(self._fields)
+
+    def build(self, words):
+        with self._lock:
+            self._postings = {}
+            self._fields = {}
+            for word in words:
+                self._add(word['id'], word)
+
+    def copy(self):
+        """Independent copy to apply changes to while readers keep this one."""
+        clone = WordSearchIndex()
+        with self._lock:
+            clone._postings = {gram: set(ids) for gram, ids in self._postings.items()}
+            clone._fields = dict(self._fields)
+        return clone
+
+    def upsert(self, word_id, word):
+        with self._lock:
+            self._remove(word_id)
+            self._add(word_id, word)
+
+    def remove(self, word_id):
+        with self._lock:
+            self._remove(word_id)
+
+    def _add(self, word_id, word):
+        fields = tuple(normalize(word.get(field)) for field in SEARCH_FIELDS)
+        self._fields[word_id] = fields
+        for gram in set().union(*(grams(value) for value in fields)):
+            self._postings.setdefault(gram, set()).add(word_id)
+
+    def _remove(self, word_id):
+        fields = self._fields.pop(word_id, None)
+        if fields is None:
+            return
+        for gram in set().union(*(grams(value) for value in fields)):
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            posting.discard(word_id)
+            if not posting:
+                del self._postings[gram]
+
+    def search(self, query):
+        """Return [(rank, word_id), ...] for every word matching `query`."""
+        query = normalize(query)
+        if not query:
+            return []
+
+        with self._lock:
+            postings = []
+            for gram in query_grams(query):
+                posting = self._postings.get(gram)
+                if not posting:
+                    return []
+                postings.append(posting)
+            postings.sort(key=len)
+
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates &= posting
+                if not candidates:
+                    return []
+
+            results = []
+            for word_id in candidates:
+                rank = self._rank(query, self._fields[word_id])
+                if rank is not None:
+                    results.append((rank, word_id))
+            return results
+
+    @staticmethod
+    def _rank(query, fields):
+        best = None
+        for value in fields:
+            if value == query:
+                return RANK_EXACT
+            if value.startswith(query):
+                best = RANK_PREFIX
+            elif best is None and query in value:
+                best = RANK_SUBSTRING
+        return best